@@ -1,20 +1,160 @@
-from flask import Flask, request, jsonify
+from contextlib import contextmanager
+from datetime import datetime
+import hmac
+import math
+import time
+
+from flask import Flask, Response, g, request, jsonify, url_for
 from flask_cors import CORS
-from db import get_connection
-import bcrypt
+from config import env_bool, env_int, env_str
+from db import pool, PoolTimeout, TimedDictCursor
+from catalog import catalog
+from exercises import get_generator
+from grading import (EXERCISE_TOKEN_TTL, InvalidToken, exercise_curve, generate_public, generate_public_batch,
+                     read_token, rebuild, grade)
+from hashing import hasher, HashingOverloaded
+from plots import (FORMATOS as PLOT_FORMATOS, InvalidPlot, PlotsOverloaded, clave as clave_grafico,
+                   renderer as plot_renderer)
+from sessions import (InvalidSession, emitir_sesion, renovar, requiere_sesion,
+                      respuesta_no_autorizada, usuario_actual)
+from ingest import (liberar_ejercicio, nueva_fila, reclamar_ejercicio, reenviar_pendientes, registrar_resultados,
+                    writer as result_writer)
+from attempts import STATS_LIMIT_DEFAULT, STATS_LIMIT_MAX, filas_intentos, sincronizar_preguntas, tasas_de_error
+from summary import resumen_usuario, version_usuario
+from leaderboard import leaderboard, inicio_semana, PERIODOS
+from progress import NIVELES, recomendar
+from export import FORMATOS, InvalidExport, exportar, parse_fecha, token_valido
+from ratelimit import RateLimited, ip_cliente, limitar
+import ratelimit
+import metrics
+import migrations
+import compression
+import json_provider
+from history import HISTORY_PAGE_DEFAULT, HISTORY_PAGE_MAX, InvalidCursor, pagina_historial, recorrer_historial
 import pymysql.cursors
 
 
 app = Flask(__name__)
 CORS(app)
+json_provider.instalar(app)     # orjson si está instalado (misma salida JSON)
 
 # ---------------------------------------------------
 #  HELPER: obtener conexión con cursor de diccionario
 # ---------------------------------------------------
+@contextmanager
 def get_dict_conn():
-    conn = get_connection()
-    # Muy importante: DictCursor para poder usar user["id"]
-    return conn, conn.cursor(pymysql.cursors.DictCursor)
+    """
+    Presta una conexión del pool (db.pool) junto a un cursor de diccionario.
+    Uso: `with get_dict_conn() as (conn, cursor): ...`
+    La conexión vuelve al pool al salir del bloque (no se cierra).
+    """
+    with pool.connection() as conn:
+        # Muy importante: DictCursor para poder usar user["id"] (TimedDictCursor además mide cada SQL)
+        cursor = conn.cursor(TimedDictCursor)
+        try:
+            yield conn, cursor
+        finally:
+            cursor.close()
+
+
+@app.errorhandler(PoolTimeout)
+def pool_timeout(e):
+    print("Pool de conexiones agotado:", e)
+    return jsonify({"error": "Servidor ocupado, intenta nuevamente"}), 503
+
+
+@app.errorhandler(HashingOverloaded)
+def hashing_overloaded(e):
+    # Respuesta rápida en vez de encolar sin límite detrás de bcrypt
+    response = jsonify({"error": "Servidor ocupado, intenta nuevamente en unos segundos"})
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response, 503
+
+
+@app.errorhandler(RateLimited)
+def rate_limited(e):
+    # Se lanza antes de cualquier consulta o bcrypt: rechazar cuesta casi nada
+    response = jsonify({"error": "Demasiadas solicitudes, intenta nuevamente más tarde"})
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response, 429
+
+
+@app.errorhandler(PlotsOverloaded)
+def plots_overloaded(e):
+    response = jsonify({"error": "Servidor ocupado dibujando gráficos, intenta nuevamente"})
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response, 503
+
+
+# ==========================
+#   MÉTRICAS Y LOG DE ACCESO (ver metrics.py)
+# ==========================
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    metrics.begin_request()
+    metrics.http_in_flight.inc()
+
+
+@app.after_request
+def finish_request_metrics(response):
+    start = g.pop("request_start", None)
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    timings = metrics.end_request()
+
+    # La regla ('/api/user-results/<int:user_id>') y no la URL, para no crear una serie por usuario
+    endpoint = request.url_rule.rule if request.url_rule else "sin_ruta"
+    metrics.http_requests.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+    metrics.http_latency.observe(elapsed, method=request.method, endpoint=endpoint)
+
+    slow = elapsed * 1000 >= metrics.SLOW_REQUEST_MS
+    if slow and metrics.TIMING_HEADER:
+        response.headers["Server-Timing"] = metrics.server_timing(elapsed, timings)
+
+    entry = {
+        "ts": datetime.now().isoformat(timespec="milliseconds"),
+        "method": request.method,
+        "path": request.path,
+        "endpoint": endpoint,
+        "status": response.status_code,
+        "duration_ms": round(elapsed * 1000, 2),
+        "remote": request.remote_addr,
+    }
+    for kind, (seconds, count) in timings.items():
+        entry[f"{kind}_ms"] = round(seconds * 1000, 2)
+        entry[f"{kind}_count"] = count
+    if slow:
+        entry["slow"] = True
+    metrics.log_access(entry)
+    return response
+
+
+@app.after_request
+def compress_response(response):
+    # Registrado después de las métricas, así corre antes (Flask invierte el orden)
+    return compression.comprimir(request, response)
+
+
+@app.teardown_request
+def end_request_metrics(exc):
+    # teardown corre siempre, incluso si falló otro after_request
+    metrics.http_in_flight.dec()
+
+
+@app.get("/metrics")
+def get_metrics():
+    body = metrics.render([
+        ("db_pool", "Estado del pool de conexiones", pool.stats()),
+        ("bcrypt_pool", "Estado del pool de bcrypt", hasher.stats()),
+        ("write_behind", "Estado del buffer write-behind", result_writer.stats()),
+        ("catalog", "Estado del catálogo en memoria", catalog.stats()),
+        ("leaderboard", "Estado de los rankings en memoria", leaderboard.stats()),
+        ("plots", "Estado de la caché de gráficos", plot_renderer.stats()),
+        ("rate_limit", "Estado de los límites de frecuencia", ratelimit.stats()),
+    ])
+    return Response(body, mimetype="text/plain; version=0.0.4")
 
 
 # ==========================
@@ -22,6 +162,7 @@ def get_dict_conn():
 # ==========================
 @app.post("/api/register")
 def register():
+    limitar("register_ip", ip_cliente(request))
     data = request.json or {}
     nombre_usuario = data.get("nombre_usuario")
     correo = data.get("correo")
@@ -32,33 +173,30 @@ def register():
     if not nombre_usuario or not correo or not contraseña:
         return jsonify({"error": "Faltan datos (nombre_usuario, correo, contraseña)"}), 400
 
-    hashed = bcrypt.hashpw(
-        contraseña.encode("utf-8"),
-        bcrypt.gensalt()
-    ).decode("utf-8")
+    # bcrypt corre en el pool de hashing.py (puede lanzar HashingOverloaded -> 503)
+    hashed = hasher.hash(contraseña)
 
-    conn, cursor = get_dict_conn()
     try:
-        cursor.execute(
-            """
-            INSERT INTO usuario (nombre_usuario, correo, contraseña, nivel)
-            VALUES (%s, %s, %s, %s)
-            """,
-            (nombre_usuario, correo, hashed, nivel)
-        )
-        conn.commit()
+        with get_dict_conn() as (conn, cursor):
+            cursor.execute(
+                """
+                INSERT INTO usuario (nombre_usuario, correo, contraseña, nivel)
+                VALUES (%s, %s, %s, %s)
+                """,
+                (nombre_usuario, correo, hashed, nivel)
+            )
+            conn.commit()
     except pymysql.err.IntegrityError as e:
         # 1062 = valor duplicado (correo o usuario)
         if e.args[0] == 1062:
             return jsonify({"error": "El correo o nombre de usuario ya está registrado"}), 400
         print("Error de integridad en register:", e)
         return jsonify({"error": "Error de integridad en el registro"}), 400
+    except PoolTimeout:
+        raise
     except Exception as e:
         print("Error general en register:", e)
         return jsonify({"error": "Error al registrar el usuario en la base de datos"}), 500
-    finally:
-        cursor.close()
-        conn.close()
 
     return jsonify({"message": "Usuario registrado correctamente"}), 201
 
@@ -66,8 +204,21 @@ def register():
 # ==========================
 #   LOGIN
 # ==========================
+def actualizar_hash(user_id, new_hash):
+    try:
+        with get_dict_conn() as (conn, cursor):
+            cursor.execute(
+                "UPDATE usuario SET contraseña = %s WHERE id = %s",
+                (new_hash, user_id)
+            )
+            conn.commit()
+    except Exception as e:
+        print("Error actualizando hash de contraseña:", e)
+
+
 @app.post("/api/login")
 def login():
+    limitar("login_ip", ip_cliente(request))
     data = request.json or {}
 
     identifier = data.get("username")   # puede ser nombre_usuario o correo
@@ -76,9 +227,11 @@ def login():
     if not identifier or not password:
         return jsonify({"error": "Faltan datos (username, password)"}), 400
 
-    conn, cursor = get_dict_conn()
+    # Cada intento cuesta un bcrypt: se limita por cuenta antes de ir a la BD
+    limitar("login_cuenta", str(identifier).strip().lower())
 
-    try:
+    # La conexión se devuelve al pool antes de bcrypt (que es lento)
+    with get_dict_conn() as (conn, cursor):
         cursor.execute(
             """
             SELECT id, nombre_usuario, correo, contraseña, nivel
@@ -89,27 +242,48 @@ def login():
         )
         user = cursor.fetchone()
 
-        if not user:
-            return jsonify({"error": "Usuario no encontrado"}), 404
+    if not user:
+        return jsonify({"error": "Usuario no encontrado"}), 404
+
+    stored_hash = user["contraseña"]
 
-        stored_hash = user["contraseña"]
+    if not hasher.check(password, stored_hash):
+        return jsonify({"error": "Contraseña incorrecta"}), 401
 
-        if not bcrypt.checkpw(password.encode("utf-8"), stored_hash.encode("utf-8")):
-            return jsonify({"error": "Contraseña incorrecta"}), 401
+    # Si cambió BCRYPT_ROUNDS, se actualiza el hash sin que el usuario lo note
+    if hasher.needs_rehash(stored_hash):
+        hasher.rehash_later(password, lambda new_hash: actualizar_hash(user["id"], new_hash))
 
-        return jsonify({
-            "message": "Login exitoso",
-            "user": {
-                "id": user["id"],
-                "nombre_usuario": user["nombre_usuario"],
-                "correo": user["correo"],
-                "nivel": user["nivel"]
-            }
-        }), 200
+    return jsonify({
+        "message": "Login exitoso",
+        "user": {
+            "id": user["id"],
+            "nombre_usuario": user["nombre_usuario"],
+            "correo": user["correo"],
+            "nivel": user["nivel"]
+        },
+        # Tokens firmados (sessions.py): el resto de la API identifica al usuario con ellos
+        "session": emitir_sesion(user["id"])
+    }), 200
 
-    finally:
-        cursor.close()
-        conn.close()
+
+@app.post("/api/session/refresh")
+def refresh_session():
+    """
+    Espera JSON como: {"refresh_token": "<token>"}
+    Devuelve un par nuevo de tokens (sin consultar la BD).
+    """
+    data = request.json or {}
+    try:
+        session = renovar(data.get("refresh_token"))
+    except InvalidSession as e:
+        return respuesta_no_autorizada(e)
+    return jsonify(session), 200
+
+
+def es_otro_usuario(id_usuario):
+    """True si `id_usuario` vino en la petición y no es el de la sesión."""
+    return id_usuario is not None and str(id_usuario) != str(g.id_usuario)
 
 
 # ==========================
@@ -120,43 +294,17 @@ def obtener_id_nivel_por_modulo(modulo: str):
     módulo puede venir como:
     - 'quadratic' / 'Funciones Cuadráticas'
     - 'trigonometric' / 'Funciones Trigonométricas'
+    Se resuelve desde el catálogo en memoria (sin consultar la BD).
     """
-    conn, cursor = get_dict_conn()
-    try:
-        if modulo in ("quadratic", "Funciones Cuadráticas"):
-            nombre_nivel = "Funciones Cuadráticas"
-        elif modulo in ("trigonometric", "Funciones Trigonométricas"):
-            nombre_nivel = "Funciones Trigonométricas"
-        else:
-            return None
-
-        cursor.execute(
-            "SELECT id_nivel FROM niveles WHERE nombre = %s LIMIT 1",
-            (nombre_nivel,)
-        )
-        row = cursor.fetchone()
-        return row["id_nivel"] if row else None
-    finally:
-        cursor.close()
-        conn.close()
+    return catalog.id_nivel(modulo)
 
 
 def obtener_id_ejercicio_por_codigo(codigo: str):
     """
-    Busca en la tabla 'ejercicios' según el campo 'codigo' (quadratic/trigonometric).
+    Busca en el catálogo de 'ejercicios' según el campo 'codigo' (quadratic/trigonometric).
     Si no lo encuentra, devuelve None (se guarda resultado sin ejercicio específico).
     """
-    conn, cursor = get_dict_conn()
-    try:
-        cursor.execute(
-            "SELECT id_ejercicio FROM ejercicios WHERE codigo = %s LIMIT 1",
-            (codigo,)
-        )
-        row = cursor.fetchone()
-        return row["id_ejercicio"] if row else None
-    finally:
-        cursor.close()
-        conn.close()
+    return catalog.id_ejercicio(codigo)
 
 
 # ==========================
@@ -164,398 +312,733 @@ def obtener_id_ejercicio_por_codigo(codigo: str):
 # ==========================
 @app.get("/api/exercise")
 def get_exercise():
+    module = request.args.get("module", "quadratic")
+    nivel = request.args.get("nivel", "basico")
+
+    # Los generadores viven en exercises.py, registrados por (module, nivel)
+    generator = get_generator(module, nivel)
+    if generator is None:
+        return jsonify({"error": "Módulo o nivel inválido"}), 400
+
+    # Sin respuestas: se corrige en /api/exercise-grade con el token
+    return jsonify(con_grafico(generate_public(generator)))
+
 
-    import random, math
+# Máximo de ejercicios por petición en /api/exercises
+MAX_EXERCISES_BATCH = 200
 
+
+@app.get("/api/exercises")
+def get_exercises_batch():
+    """
+    Genera `count` ejercicios del mismo módulo y nivel en una sola respuesta
+    (por ejemplo, una guía para todo el curso). Los cálculos se hacen con NumPy
+    sobre todos los ejercicios a la vez.
+    """
     module = request.args.get("module", "quadratic")
     nivel = request.args.get("nivel", "basico")
+    count = request.args.get("count", 1, type=int)
+
+    if count is None or count < 1 or count > MAX_EXERCISES_BATCH:
+        return jsonify({"error": f"count debe estar entre 1 y {MAX_EXERCISES_BATCH}"}), 400
+
+    generator = get_generator(module, nivel)
+    if generator is None:
+        return jsonify({"error": "Módulo o nivel inválido"}), 400
+
+    return jsonify({
+        "module": module,
+        "nivel": nivel,
+        "count": count,
+        "exercises": [con_grafico(ex) for ex in generate_public_batch(generator, count)],
+    })
+
+
+# ==========================
+#   GRÁFICO DEL EJERCICIO (ver plots.py)
+# ==========================
+PLOT_MAX_AGE = 7 * 24 * 3600    # la imagen de un token no cambia nunca
+
+
+def con_grafico(exercise):
+    """Agrega la URL del gráfico de la función del ejercicio (relativa a la API)."""
+    exercise["image"] = url_for("get_exercise_plot", token=exercise["token"])
+    return exercise
+
+
+def con_cache_publica(response, etag):
+    """ETag = hash del gráfico; cualquiera lo puede guardar (no depende del usuario)."""
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = f"public, max-age={PLOT_MAX_AGE}, immutable"
+    return response
+
+
+@app.get("/api/exercise-plot")
+def get_exercise_plot():
+    """
+    ?token=<token del ejercicio>&format=svg|png
+    La imagen depende solo de los parámetros de la función: se busca por su
+    hash en la caché y el navegador la guarda sin volver a preguntar.
+    """
+    formato = request.args.get("format", "svg")
+    try:
+        curva = exercise_curve(request.args.get("token", ""))
+    except InvalidToken as e:
+        return jsonify({"error": str(e)}), 400
+    if curva is None:
+        return jsonify({"error": "Este ejercicio no tiene gráfico"}), 404
+    key = clave_grafico(curva, formato)
+    if formato in PLOT_FORMATOS and request.if_none_match.contains_weak(key):
+        # El navegador ya la tiene: ni siquiera se busca en la caché
+        # (débil: al comprimirla el ETag se envía como W/"...")
+        return con_cache_publica(Response(status=304), key)
+
+    try:
+        _, data, origen = plot_renderer.obtener(curva, formato)
+    except InvalidPlot as e:
+        return jsonify({"error": str(e)}), 400
+
+    response = con_cache_publica(Response(data, mimetype=PLOT_FORMATOS[formato]), key)
+    response.headers["X-Plot-Cache"] = origen
+    return response
 
-    # ============================================================
-    #                  FUNCIONES CUADRÁTICAS
-    # ============================================================
-    if module == "quadratic":
-
-        # -------------------- NIVEL BÁSICO --------------------
-        if nivel == "basico":
-            a = round(random.uniform(3, 5), 2)
-            b = round(random.uniform(10, 30), 2)
-
-            t_vertex = round(b / (2 * a), 3)
-            h_max = round(-(a * t_vertex ** 2) + b * t_vertex, 3)
-            t_impact = round(b / a, 3)
-            t_mid = round(t_impact / 2, 3)
-            h_t1 = round(-(a * 1 ** 2) + b * 1, 3)
-            h_mid = round(-(a * t_mid ** 2) + b * t_mid, 3)
-
-            contexts = [
-                "Un estudiante lanza una pelota verticalmente en el patio del colegio. La función que describe la altura es:",
-                "En una clase de física, se realiza un experimento donde se lanza una pelota hacia arriba:",
-                "Un niño suelta una pelota con un impulso inicial y la trayectoria queda modelada por:",
-                "Un balón de básquet es lanzado verticalmente en un entrenamiento según la función:",
-                "Una cápsula ligera es lanzada en un laboratorio escolar:",
-            ]
-
-            context = f"{random.choice(contexts)}  h(t) = -{a}t² + {b}t"
-
-            return jsonify({
-                "title": "Lanzamiento Vertical – Básico",
-                "module": "Funciones Cuadráticas",
-                "difficulty": "Básico",
-                "context": context,
-                "questions": [
-                    {"text": "¿Cuál es la altura máxima?", "answer": h_max, "unit": "m"},
-                    {"text": "¿Tiempo en el que alcanza la altura máxima?", "answer": t_vertex, "unit": "s"},
-                    {"text": "¿Cuándo vuelve al suelo?", "answer": t_impact, "unit": "s"},
-                    {"text": "¿Altura a los 1 segundo?", "answer": h_t1, "unit": "m"},
-                    {"text": "¿Altura a la mitad del tiempo total?", "answer": h_mid, "unit": "m"},
-                ]
-            })
-
-
-        # -------------------- NIVEL INTERMEDIO --------------------
-        if nivel == "intermedio":
-            a = round(random.uniform(4, 6), 2)
-            b = round(random.uniform(30, 60), 2)
-
-            t_vertex = round(b / (2 * a), 3)
-            h_max = round(-(a * t_vertex ** 2) + b * t_vertex, 3)
-            t_impact = round(b / a, 3)
-            t_mid = round(t_impact / 2, 3)
-
-            contexts = [
-                "Durante un festival nocturno, un fuego artificial asciende siguiendo la trayectoria:",
-                "Un cohete escolar en una feria científica es lanzado verticalmente. Su altura se describe por:",
-                "Una señal de emergencia es disparada desde un barco siguiendo la función:",
-                "Un dron inicia un ascenso rápido en trayectoria parabólica dada por:",
-                "Una esfera metálica lanzada en un laboratorio sigue la ecuación:"
-            ]
-
-            context = f"{random.choice(contexts)} h(t) = -{a}t² + {b}t"
-
-            return jsonify({
-                "title": "Fuegos Artificiales – Intermedio",
-                "module": "Funciones Cuadráticas",
-                "difficulty": "Intermedio",
-                "context": context,
-                "questions": [
-                    {"text": "¿Altura máxima?", "answer": h_max, "unit": "m"},
-                    {"text": "¿Cuándo ocurre la altura máxima?", "answer": t_vertex, "unit": "s"},
-                    {"text": "¿Cuándo toca el suelo?", "answer": t_impact, "unit": "s"},
-                    {"text": "¿Altura a la mitad del vuelo?", "answer": round(-(a * t_mid ** 2) + b * t_mid, 3), "unit": "m"},
-                    {"text": "¿Altura a los 1 segundo?", "answer": round(-(a * 1 ** 2) + b * 1, 3), "unit": "m"},
-                ]
-            })
-
-
-        # -------------------- NIVEL AVANZADO --------------------
-        if nivel == "avanzado":
-            a = round(random.uniform(2, 5), 2)
-            b = round(random.uniform(20, 60), 2)
-            c = round(random.uniform(5, 20), 2)
-
-            A = -a
-            B = b
-            C = c
-
-            D = round(B ** 2 - 4 * A * C, 3)
-            sqrtD = math.sqrt(abs(D))
-
-            t1 = round((-B + sqrtD) / (2 * A), 3)
-            t2 = round((-B - sqrtD) / (2 * A), 3)
-            t_positive = max(t1, t2)
-
-            t_vertex = round(-B / (2 * A), 3)
-            h_max = round(A * t_vertex ** 2 + B * t_vertex + C, 3)
-
-            contexts = [
-                "Un ingeniero evalúa el arco parabólico de un túnel descrito por:",
-                "El lanzamiento de una catapulta moderna sigue la trayectoria:",
-                "Una antena parabólica de comunicaciones tiene la forma:",
-                "La estructura de un puente incorpora una parábola modelada por:",
-                "Un simulador balístico militar usa la función:"
-            ]
-
-            context = f"{random.choice(contexts)} h(t) = -{a}t² + {b}t + {c}"
-
-            return jsonify({
-                "title": "Parábola Aplicada – Avanzado",
-                "module": "Funciones Cuadráticas",
-                "difficulty": "Avanzado",
-                "context": context,
-                "questions": [
-                    {"text": "¿Altura máxima?", "answer": h_max, "unit": "m"},
-                    {"text": "¿Discriminante?", "answer": D, "unit": ""},
-                    {"text": "¿Raíz positiva?", "answer": t_positive, "unit": "s"},
-                    {"text": "¿Raíz negativa?", "answer": min(t1, t2), "unit": "s"},
-                    {"text": "¿Altura inicial?", "answer": c, "unit": "m"},
-                ]
-            })
-
-    # ============================================================
-    #             FUNCIONES TRIGONOMÉTRICAS
-    # ============================================================
-    if module == "trigonometric":
-
-        # -------------------- BÁSICO --------------------
-        if nivel == "basico":
-            A = random.randint(1, 3)
-            w = random.choice([math.pi, 2 * math.pi])
-            T = round(2 * math.pi / w, 3)
-
-            contexts = [
-                "Un péndulo pequeño oscila suavemente y su movimiento se describe con:",
-                "La vibración de una cuerda de guitarra se modela mediante:",
-                "Un resorte comprimido libera energía siguiendo:",
-                "Una boya en el mar sube y baja según:",
-                "Una brújula digital registra pequeñas oscilaciones descritas por:"
-            ]
-
-            context = f"{random.choice(contexts)} x(t) = {A}·sin({round(w,3)}t)"
-
-            return jsonify({
-                "title": "Oscilación Simple – Básico",
-                "module": "Funciones Trigonométricas",
-                "difficulty": "Básico",
-                "context": context,
-                "questions": [
-                    {"text": "¿Amplitud?", "answer": A, "unit": "cm"},
-                    {"text": "¿Periodo?", "answer": T, "unit": "s"},
-                    {"text": "¿Posición en t = 0?", "answer": 0, "unit": "cm"},
-                    {"text": "¿Posición en t = T/4?", "answer": round(A * math.sin(w * (T/4)), 3), "unit": "cm"},
-                    {"text": "¿Posición en t = T/2?", "answer": round(A * math.sin(w * (T/2)), 3), "unit": "cm"},
-                ]
-            })
-
-        # -------------------- INTERMEDIO --------------------
-        if nivel == "intermedio":
-            A = random.randint(1, 3)
-            B = random.randint(1, 3)
-            w = random.choice([math.pi, 2 * math.pi])
-            t = round(random.uniform(0.3, 2), 2)
-            T = round(2 * math.pi / w, 3)
-
-            contexts = [
-                "Una cuerda de violín vibra en un modo combinado dado por:",
-                "Un oscilador mecánico industrial produce vibraciones descritas por:",
-                "Un sensor mide vibraciones complejas siguiendo:",
-                "Una onda de sonido armónica se modela mediante:",
-                "Un reflector acústico genera una oscilación compuesta representada por:"
-            ]
-
-            context = f"{random.choice(contexts)} x(t) = {A}·sin({round(w,3)}t) + {B}·cos({round(w,3)}t)"
-
-            val1 = round(A * math.sin(w*t) + B * math.cos(w*t), 3)
-            val2 = round(A * math.sin(w*(t+0.5)) + B * math.cos(w*(t+0.5)), 3)
-
-            return jsonify({
-                "title": "Oscilación Compuesta – Intermedio",
-                "module": "Funciones Trigonométricas",
-                "difficulty": "Intermedio",
-                "context": context,
-                "questions": [
-                    {"text": "¿Amplitud combinada?", "answer": round(math.sqrt(A**2 + B**2), 3), "unit": "cm"},
-                    {"text": "¿Periodo?", "answer": T, "unit": "s"},
-                    {"text": f"¿Posición en t = {t}?", "answer": val1, "unit": "cm"},
-                    {"text": f"¿Posición en t = {t+0.5}?", "answer": val2, "unit": "cm"},
-                    {"text": "¿Valor medio de la oscilación?", "answer": 0, "unit": "cm"},
-                ]
-            })
-
-        # -------------------- AVANZADO --------------------
-        if nivel == "avanzado":
-            A = random.randint(1, 3)
-            B = random.randint(0, 3)
-            w = random.choice([math.pi, 2 * math.pi])
-            phi = random.choice([0, math.pi/4, math.pi/2])
-            t = round(random.uniform(0.3, 2), 2)
-
-            T = round(2 * math.pi / w, 3)
-            val = round(A * math.sin(w*t + phi) + B, 3)
-
-            contexts = [
-                "Un cardiólogo analiza una señal biomédica modelada mediante:",
-                "Una estación meteorológica registra variaciones periódicas descritas por:",
-                "Una señal eléctrica modulada con desfase se expresa como:",
-                "Un robot industrial realiza movimientos oscilatorios según:",
-                "Una onda de marea se modela matemáticamente mediante:"
-            ]
-
-            context = f"{random.choice(contexts)} x(t) = {A}·sin({round(w,3)}t + {round(phi,3)}) + {B}"
-
-            return jsonify({
-                "title": "Oscilación con Desfase – Avanzado",
-                "module": "Funciones Trigonométricas",
-                "difficulty": "Avanzado",
-                "context": context,
-                "questions": [
-                    {"text": "¿Amplitud?", "answer": A, "unit": "cm"},
-                    {"text": "¿Periodo?", "answer": T, "unit": "s"},
-                    {"text": "¿Desfase?", "answer": round(phi, 3), "unit": "rad"},
-                    {"text": f"¿Posición en t = {t}?", "answer": val, "unit": "cm"},
-                    {"text": "¿Posición máxima posible?", "answer": A + B, "unit": "cm"},
-                ]
-            })
-
-    # ---------------------------------
-    #   FUNCIONES TRIGONOMÉTRICAS
-    # ---------------------------------
-    if module == "trigonometric":
-
-        # ---------- BÁSICO ----------
-        if nivel == "basico":
-            A = random.randint(1, 3)
-            w = random.choice([math.pi, 2*math.pi])
-
-            T = round(2*math.pi / w, 3)
-
-            return jsonify({
-                "title": "Oscilación Simple - Básico",
-                "module": "Funciones Trigonométricas",
-                "difficulty": "Básico",
-                "context": f"x(t) = {A}·sin({round(w,3)}t)",
-                "questions": [
-                    {"text": "Amplitud", "answer": A, "unit": "cm"},
-                    {"text": "Periodo", "answer": T, "unit": "s"},
-                    {"text": "Posición en t=0", "answer": 0, "unit": "cm"},
-                    {"text": "Posición en t=T/4", "answer": round(A*math.sin(w*(T/4)),3), "unit": "cm"},
-                    {"text": "Posición en t=T/2", "answer": round(A*math.sin(w*(T/2)),3), "unit": "cm"}
-                ]
-            })
-
-        # ---------- INTERMEDIO ----------
-        if nivel == "intermedio":
-            A = random.randint(1, 3)
-            B = random.randint(1, 3)
-            w = random.choice([math.pi, 2*math.pi])
-            t = round(random.uniform(0.3, 2), 2)
-
-            T = round(2*math.pi/w, 3)
-            val1 = round(A*math.sin(w*t) + B*math.cos(w*t), 3)
-            val2 = round(A*math.sin(w*(t+0.5)) + B*math.cos(w*(t+0.5)), 3)
-
-            return jsonify({
-                "title": "Oscilación Compuesta - Intermedio",
-                "module": "Funciones Trigonométricas",
-                "difficulty": "Intermedio",
-                "context": f"x(t) = {A}·sin({round(w,3)}t) + {B}·cos({round(w,3)}t)",
-                "questions": [
-                    {"text": "Amplitud combinada", "answer": round(math.sqrt(A**2+B**2),3), "unit": "cm"},
-                    {"text": "Periodo", "answer": T, "unit": "s"},
-                    {"text": f"Posición en t={t}", "answer": val1, "unit": "cm"},
-                    {"text": f"Posición en t={t+0.5}", "answer": val2, "unit": "cm"},
-                    {"text": "Valor medio", "answer": 0, "unit": "cm"}
-                ]
-            })
-
-        # ---------- AVANZADO ----------
-        if nivel == "avanzado":
-            A = random.randint(1, 3)
-            B = random.randint(0, 3)
-            w = random.choice([math.pi, 2*math.pi])
-            phi = random.choice([0, math.pi/4, math.pi/2])
-            t = round(random.uniform(0.3, 2), 2)
-
-            T = round(2*math.pi / w, 3)
-            val = round(A*math.sin(w*t + phi) + B, 3)
-
-            return jsonify({
-                "title": "Oscilación con Desfase – Avanzado",
-                "module": "Funciones Trigonométricas",
-                "difficulty": "Avanzado",
-                "context": f"x(t) = {A}·sin({round(w,3)}t + {round(phi,3)}) + {B}",
-                "questions": [
-                    {"text": "Amplitud", "answer": A, "unit": "cm"},
-                    {"text": "Periodo", "answer": T, "unit": "s"},
-                    {"text": "Desfase", "answer": round(phi,3), "unit": "rad"},
-                    {"text": f"Posición en t={t}", "answer": val, "unit": "cm"},
-                    {"text": "Valor máximo", "answer": A+B, "unit": "cm"}
-                ]
-            })
-
-    return jsonify({"error": "Módulo o nivel inválido"}), 400
 
 # ==========================
 #   GUARDAR RESULTADO
 # ==========================
+def preparar_resultado(id_usuario, module, puntaje, total_preguntas, fecha=None, nivel=None, corregido=False):
+    """
+    Arma la fila para 'resultados' resolviendo el nivel desde el catálogo.
+    `nivel` es la dificultad del ejercicio (basico/intermedio/avanzado), si se conoce;
+    `corregido`, si el puntaje lo calculó el servidor (solo esos van al ranking).
+    Lanza ValueError si el módulo no corresponde a ningún nivel.
+    """
+    # id_nivel según módulo
+    id_nivel = obtener_id_nivel_por_modulo(module)
+    if not id_nivel:
+        raise ValueError(f"Módulo desconocido: {module}")
+
+    # id_ejercicio (opcional, si existe un ejercicio "plantilla" en la tabla ejercicios)
+    id_ejercicio = obtener_id_ejercicio_por_codigo(module)  # puede ser None
+
+    return nueva_fila(id_usuario, id_nivel, id_ejercicio, puntaje, total_preguntas, fecha,
+                      nivel if nivel in NIVELES else None, corregido)
+
+
+# Preguntas máximas de un resultado (los ejercicios generados tienen menos de 10)
+MAX_PREGUNTAS = 100
+
+
+def _es_numero(valor):
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool) and math.isfinite(valor)
+
+
+def validar_resultado(puntaje, total_preguntas):
+    """
+    Puntaje y total enviados por el cliente, como enteros. Lanza ValueError
+    (con el mensaje para el 400) si el puntaje no es un número entre 0 y 100
+    o el total no es un entero entre 1 y MAX_PREGUNTAS.
+    """
+    if not _es_numero(puntaje) or not 0 <= puntaje <= 100:
+        raise ValueError("puntaje debe ser un número entre 0 y 100")
+    if not _es_numero(total_preguntas) or total_preguntas != int(total_preguntas) \
+            or not 1 <= total_preguntas <= MAX_PREGUNTAS:
+        raise ValueError(f"total_preguntas debe ser un entero entre 1 y {MAX_PREGUNTAS}")
+    return int(round(puntaje)), int(total_preguntas)
+
+
+def guardar_resultado(id_usuario, module, puntaje, total_preguntas, nivel=None, graded_results=None,
+                      nonce=None):
+    """
+    Guarda un resultado (directo o en el buffer write-behind, ver ingest.py).
+    Si vienen las respuestas corregidas (grading.grade) también se guarda
+    un intento por pregunta en la misma transacción; `nonce` es el del
+    ejercicio corregido en el servidor (guardar_corregido), que se libera
+    si el buffer descarta la fila. Solo esos resultados van al ranking.
+    Devuelve True si quedó en el buffer para escribirse después.
+    """
+    # Las búsquedas salen del catálogo: aquí solo se ejecutan los INSERT
+    fila = preparar_resultado(id_usuario, module, puntaje, total_preguntas, nivel=nivel,
+                              corregido=nonce is not None)
+    intentos = filas_intentos(id_usuario, module, nivel, graded_results, fila[5]) if graded_results else ()
+    return registrar_resultados([fila], intentos, nonce)
+
+
+def guardar_corregido(id_usuario, module, nivel, nonce, graded):
+    """
+    guardar_resultado para un ejercicio corregido en el servidor, una sola
+    vez por token. Devuelve None si ese ejercicio ya tenía un resultado; si
+    no, lo mismo que guardar_resultado.
+    """
+    if not reclamar_ejercicio(nonce, EXERCISE_TOKEN_TTL):
+        return None
+    try:
+        return guardar_resultado(id_usuario, module, graded["score"], graded["totalQuestions"],
+                                 nivel, graded["results"], nonce)
+    except Exception:
+        # Sin resultado guardado el ejercicio se puede volver a enviar
+        liberar_ejercicio(nonce)
+        raise
+
+
 @app.post("/api/exercise-result")
+@requiere_sesion
 def save_exercise_result():
     """
-    Espera JSON como:
+    Requiere "Authorization: Bearer <access_token>". Espera JSON como:
     {
-        "id_usuario": 1,
         "module": "quadratic" | "trigonometric",
-        "puntaje": 80,
-        "total_preguntas": 3
+        "puntaje": 80,              (número de 0 a 100)
+        "total_preguntas": 3,       (entero, al menos 1)
+        "nivel": "basico"           (opcional: cuenta para la dificultad adaptativa)
     }
+    El usuario sale del token; si además viene "id_usuario" debe coincidir.
     """
+    limitar("resultados_ip", ip_cliente(request))
+    limitar("resultados_usuario", g.id_usuario)
     data = request.json or {}
 
-    id_usuario = data.get("id_usuario")
+    if es_otro_usuario(data.get("id_usuario")):
+        return jsonify({"error": "No puedes guardar resultados de otro usuario"}), 403
+
+    id_usuario = g.id_usuario
     module = data.get("module")           # 'quadratic' o 'trigonometric'
     puntaje = data.get("puntaje")
     total_preguntas = data.get("total_preguntas")
+    nivel = data.get("nivel")
 
-    if not id_usuario or not module or puntaje is None or not total_preguntas:
+    if not module or puntaje is None or not total_preguntas:
         return jsonify({"error": "Faltan datos para guardar el resultado"}), 400
+    if nivel is not None and nivel not in NIVELES:
+        return jsonify({"error": "Nivel inválido"}), 400
+    try:
+        puntaje, total_preguntas = validar_resultado(puntaje, total_preguntas)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    # id_nivel según módulo
-    id_nivel = obtener_id_nivel_por_modulo(module)
-    if not id_nivel:
-        return jsonify({"error": "No se pudo determinar el nivel para este módulo"}), 400
-
-    # id_ejercicio (opcional, si existe un ejercicio "plantilla" en la tabla ejercicios)
-    id_ejercicio = obtener_id_ejercicio_por_codigo(module)  # puede ser None
-
-    conn, cursor = get_dict_conn()
     try:
-        cursor.execute(
-            """
-            INSERT INTO resultados (id_usuario, id_nivel, id_ejercicio, puntaje, total_preguntas)
-            VALUES (%s, %s, %s, %s, %s)
-            """,
-            (id_usuario, id_nivel, id_ejercicio, puntaje, total_preguntas)
-        )
-        conn.commit()
+        queued = guardar_resultado(id_usuario, module, puntaje, total_preguntas, nivel)
+    except ValueError:
+        return jsonify({"error": "No se pudo determinar el nivel para este módulo"}), 400
+    except PoolTimeout:
+        raise
     except Exception as e:
         print("Error guardando resultado:", e)
         return jsonify({"error": "No se pudo guardar el resultado"}), 500
-    finally:
-        cursor.close()
-        conn.close()
 
+    if queued:
+        return jsonify({"message": "Resultado recibido"}), 202
     return jsonify({"message": "Resultado guardado correctamente"}), 201
 
 
+# Máximo de resultados por petición en /api/exercise-results/batch
+MAX_RESULTS_BATCH = 500
+
+
+@app.post("/api/exercise-results/batch")
+@requiere_sesion
+def save_exercise_results_batch():
+    """
+    Sube de una vez los intentos que el cliente acumuló sin conexión.
+    Requiere sesión; todos los resultados son del usuario del token.
+    Espera JSON como:
+    {
+        "results": [
+            {"module": "quadratic", "puntaje": 80, "total_preguntas": 5,
+             "fecha": "2025-05-10T10:15:00", "nivel": "basico"},      (fecha y nivel opcionales)
+            ...
+        ]
+    }
+    Todos los válidos se escriben con un solo INSERT multi-fila; los
+    inválidos se informan por índice en "rejected".
+    """
+    limitar("lote_usuario", g.id_usuario)
+    data = request.json or {}
+    items = data.get("results")
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Faltan datos (results)"}), 400
+    if len(items) > MAX_RESULTS_BATCH:
+        return jsonify({"error": f"Máximo {MAX_RESULTS_BATCH} resultados por petición"}), 400
+
+    rows = []
+    rejected = []
+    now = datetime.now()
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            rejected.append({"index": index, "error": "Formato inválido"})
+            continue
+
+        if es_otro_usuario(item.get("id_usuario")):
+            rejected.append({"index": index, "error": "Usuario distinto al de la sesión"})
+            continue
+
+        id_usuario = g.id_usuario
+        module = item.get("module")
+        puntaje = item.get("puntaje")
+        total_preguntas = item.get("total_preguntas")
+
+        if not module or puntaje is None or not total_preguntas:
+            rejected.append({"index": index, "error": "Faltan datos"})
+            continue
+        if item.get("nivel") is not None and item["nivel"] not in NIVELES:
+            rejected.append({"index": index, "error": "Nivel inválido"})
+            continue
+        try:
+            puntaje, total_preguntas = validar_resultado(puntaje, total_preguntas)
+        except ValueError as e:
+            rejected.append({"index": index, "error": str(e)})
+            continue
+
+        fecha = None
+        if item.get("fecha"):
+            try:
+                fecha = datetime.fromisoformat(str(item["fecha"])).replace(tzinfo=None)
+            except ValueError:
+                rejected.append({"index": index, "error": "Fecha inválida"})
+                continue
+            fecha = min(fecha, now)
+
+        try:
+            rows.append(preparar_resultado(id_usuario, module, puntaje, total_preguntas, fecha, item.get("nivel")))
+        except ValueError:
+            rejected.append({"index": index, "error": "Módulo desconocido"})
+
+    queued = False
+    if rows:
+        try:
+            queued = registrar_resultados(rows)
+        except PoolTimeout:
+            raise
+        except Exception as e:
+            print("Error guardando lote de resultados:", e)
+            return jsonify({"error": "No se pudo guardar el lote de resultados"}), 500
+
+    return jsonify({
+        "accepted": len(rows),
+        "rejected": rejected,
+        "queued": queued,
+    }), 202 if queued else 201
+
+
+# ==========================
+#   CORREGIR EJERCICIO (EN EL SERVIDOR)
+# ==========================
+@app.post("/api/exercise-grade")
+def grade_exercise():
+    """
+    Espera JSON como:
+    {
+        "token": "<token recibido con el ejercicio>",
+        "answers": ["12.5", "3", ...]
+    }
+    Con "Authorization: Bearer <access_token>" el resultado se guarda para
+    el usuario de la sesión; sin token solo se corrige.
+    Las respuestas correctas se reconstruyen desde la semilla del token,
+    así el puntaje guardado no depende de lo que diga el navegador.
+    Cada ejercicio guarda solo su primera corrección; las siguientes
+    responden "alreadyGraded": true y no se guardan.
+    """
+    limitar("resultados_ip", ip_cliente(request))
+    data = request.json or {}
+
+    token = data.get("token")
+    answers = data.get("answers")
+
+    if not token or not isinstance(answers, list):
+        return jsonify({"error": "Faltan datos (token, answers)"}), 400
+
+    try:
+        id_usuario = usuario_actual()
+    except InvalidSession as e:
+        return respuesta_no_autorizada(e)
+    if id_usuario is None and data.get("id_usuario"):
+        # Antes se aceptaba cualquier id enviado por el navegador
+        return jsonify({"error": "Inicia sesión para guardar el resultado"}), 401
+    if id_usuario is not None and data.get("id_usuario") not in (None, id_usuario, str(id_usuario)):
+        return jsonify({"error": "No puedes guardar resultados de otro usuario"}), 403
+    # Sin sesión (id_usuario None) solo cuenta el límite por IP
+    limitar("resultados_usuario", id_usuario)
+
+    try:
+        module, nivel, exercise = rebuild(token)
+        _, _, nonce = read_token(token)
+    except InvalidToken as e:
+        return jsonify({"error": f"Ejercicio inválido: {e}"}), 400
+
+    graded = grade(exercise, answers)
+
+    if id_usuario:
+        try:
+            queued = guardar_corregido(id_usuario, module, nivel, nonce, graded)
+        except ValueError:
+            return jsonify({"error": "No se pudo determinar el nivel para este módulo"}), 400
+        except PoolTimeout:
+            raise
+        except Exception as e:
+            print("Error guardando resultado corregido:", e)
+            return jsonify({"error": "No se pudo guardar el resultado"}), 500
+        if queued is None:
+            graded["alreadyGraded"] = True
+        else:
+            graded["queued"] = queued
+
+    graded["module"] = module
+    graded["nivel"] = nivel
+    return jsonify(graded)
+
+
+# ==========================
+#   TASA DE ERROR POR PREGUNTA
+# ==========================
+@app.get("/api/question-stats")
+@requiere_sesion
+def get_question_stats():
+    """
+    Intentos y tasa de error por pregunta del usuario de la sesión, de la
+    más fallada a la menos. Filtros opcionales: ?module=quadratic&nivel=basico
+    y ?limit=100 (?id_usuario= solo se acepta si es el propio).
+    """
+    if es_otro_usuario(request.args.get("id_usuario")):
+        return jsonify({"error": "No puedes ver las estadísticas de otro usuario"}), 403
+    module = request.args.get("module") or None
+    nivel = request.args.get("nivel") or None
+    limit = request.args.get("limit", STATS_LIMIT_DEFAULT, type=int)
+    if limit is None or limit < 1:
+        return jsonify({"error": "limit debe ser un entero positivo"}), 400
+
+    try:
+        rows = tasas_de_error(module, nivel, g.id_usuario, min(limit, STATS_LIMIT_MAX))
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        print("Error obteniendo estadísticas por pregunta:", e)
+        return jsonify({"error": "No se pudieron obtener las estadísticas"}), 500
+
+    return jsonify(rows)
+
+
 # ==========================
 #   RESULTADOS POR USUARIO (HISTORIAL + DASHBOARD)
 # ==========================
+def _json_array_stream(rows, chunk_rows=100):
+    """Genera un arreglo JSON por partes (respuesta chunked, memoria constante)."""
+    yield "["
+    buffer = []
+    first = True
+    for row in rows:
+        buffer.append(app.json.dumps(row))
+        if len(buffer) >= chunk_rows:
+            yield ("" if first else ",") + ",".join(buffer)
+            first = False
+            buffer = []
+    if buffer:
+        yield ("" if first else ",") + ",".join(buffer)
+    yield "]"
+
+
+def con_validador(response, etag):
+    """ETag débil + revalidar siempre (private: la respuesta depende del token)."""
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def no_modificado(etag):
+    return con_validador(Response(status=304), etag)
+
+
 @app.get("/api/user-results/<int:user_id>")
+@requiere_sesion
 def get_user_results(user_id):
-    conn, cursor = get_dict_conn()
+    """
+    Paginado por cursor:  ?limit=50&before=<next_before de la página anterior>
+      -> {"results": [...], "next_before": "<cursor>" | null}
+    Historial completo:   ?all=1
+      -> arreglo JSON transmitido por partes
+    Solo el propio usuario (según su token) puede ver su historial.
+    """
+    if es_otro_usuario(user_id):
+        return jsonify({"error": "No puedes ver el historial de otro usuario"}), 403
+
+    # Sin resultados nuevos desde la última visita: 304 sin leer el historial
+    etag = version_usuario(user_id, request.query_string)
+    if request.if_none_match.contains_weak(etag):
+        return no_modificado(etag)
+
+    if request.args.get("all") in ("1", "true"):
+        response = Response(_json_array_stream(recorrer_historial(user_id)), mimetype="application/json")
+        return con_validador(response, etag)
+
+    limit = request.args.get("limit", HISTORY_PAGE_DEFAULT, type=int)
+    if limit is None or limit < 1:
+        return jsonify({"error": "limit debe ser un entero positivo"}), 400
+    limit = min(limit, HISTORY_PAGE_MAX)
+
     try:
-        cursor.execute(
-            """
-            SELECT 
-                r.id_resultado,
-                r.puntaje,
-                r.total_preguntas,
-                r.fecha,
-                n.nombre AS nombre_nivel,
-                e.titulo AS titulo_ejercicio
-            FROM resultados r
-            JOIN niveles n ON r.id_nivel = n.id_nivel
-            LEFT JOIN ejercicios e ON r.id_ejercicio = e.id_ejercicio
-            WHERE r.id_usuario = %s
-            ORDER BY r.fecha DESC
-            """,
-            (user_id,)
+        results, next_before = pagina_historial(user_id, limit, request.args.get("before"))
+    except InvalidCursor:
+        return jsonify({"error": "Parámetro before inválido"}), 400
+
+    return con_validador(jsonify({"results": results, "next_before": next_before}), etag)
+
+
+# ==========================
+#   EXPORTACIÓN PARA DOCENTES (CSV / JSONL)
+# ==========================
+@app.get("/api/export/results")
+def export_results():
+    """
+    Resultados de todo el curso, transmitidos por partes (ver export.py).
+    Requiere el header "X-Export-Token: <EXPORT_TOKEN>".
+    ?format=csv|jsonl&desde=2025-03-01&hasta=2025-06-30&module=quadratic   (todo opcional)
+    """
+    if not token_valido(request.headers.get("X-Export-Token")):
+        return jsonify({"error": "Token de exportación inválido o exportación deshabilitada"}), 403
+
+    formato = request.args.get("format", "csv")
+    try:
+        chunks = exportar(
+            formato,
+            parse_fecha(request.args.get("desde")),
+            parse_fecha(request.args.get("hasta"), fin=True),
+            request.args.get("module") or None,
         )
-        results = cursor.fetchall()
-        return jsonify(results)
-    finally:
-        cursor.close()
-        conn.close()
+    except InvalidExport as e:
+        return jsonify({"error": str(e)}), 400
+
+    response = Response(chunks, mimetype=FORMATOS[formato])
+    nombre = f"resultados_{datetime.now():%Y%m%d_%H%M}.{formato}"
+    response.headers["Content-Disposition"] = f'attachment; filename="{nombre}"'
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+# ==========================
+#   RESUMEN DEL USUARIO (MÉTRICAS DEL DASHBOARD)
+# ==========================
+@app.get("/api/user-summary/<int:user_id>")
+@requiere_sesion
+def get_user_summary(user_id):
+    """
+    Participación, precisión y promedio por módulo desde 'resumen_usuario_nivel'
+    (una fila por nivel, no se recorre el historial).
+    """
+    if es_otro_usuario(user_id):
+        return jsonify({"error": "No puedes ver el resumen de otro usuario"}), 403
+
+    etag = version_usuario(user_id, b"summary")
+    if request.if_none_match.contains_weak(etag):
+        return no_modificado(etag)
+    return con_validador(jsonify(resumen_usuario(user_id)), etag)
+
+
+# ==========================
+#   DIFICULTAD ADAPTATIVA
+# ==========================
+@app.get("/api/user-recommendation/<int:user_id>")
+@requiere_sesion
+def get_user_recommendation(user_id):
+    """
+    Próximo módulo y nivel recomendados según la precisión reciente (EWMA).
+    ?module=quadratic para pedir solo el nivel de ese módulo.
+      -> {"nivel_usuario", "module", "nivel", "motivo", "modules": [...]}
+    """
+    if es_otro_usuario(user_id):
+        return jsonify({"error": "No puedes ver la recomendación de otro usuario"}), 403
+
+    try:
+        rec = recomendar(user_id, request.args.get("module") or None)
+    except ValueError:
+        return jsonify({"error": "Módulo inválido"}), 400
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        print("Error calculando la recomendación:", e)
+        return jsonify({"error": "No se pudo calcular la recomendación"}), 500
+
+    if rec is None:
+        return jsonify({"error": "Usuario no encontrado"}), 404
+    return jsonify(rec)
+
+
+# ==========================
+#   RANKING POR MÓDULO
+# ==========================
+@app.get("/api/leaderboard")
+def get_leaderboard():
+    """
+    ?module=quadratic&nivel=basico|intermedio|avanzado&period=week|all&limit=10
+      -> {"module", "nivel", "period", "since", "total", "top": [...], "me": {...} | null}
+    Un ranking por módulo y dificultad (por defecto basico).
+    Con "Authorization: Bearer <access_token>" se incluye el puesto propio en "me".
+    """
+    module = request.args.get("module")
+    nivel = request.args.get("nivel", "basico")
+    period = request.args.get("period", "all")
+    limit = request.args.get("limit", 10, type=int)
+
+    if nivel not in NIVELES:
+        return jsonify({"error": "Nivel inválido"}), 400
+    if period not in PERIODOS:
+        return jsonify({"error": "period debe ser 'week' o 'all'"}), 400
+    if limit is None or limit < 1:
+        return jsonify({"error": "limit debe ser un entero positivo"}), 400
+    try:
+        id_usuario = usuario_actual()
+    except InvalidSession as e:
+        return respuesta_no_autorizada(e)
+
+    id_nivel = obtener_id_nivel_por_modulo(module) if module else None
+    if not id_nivel:
+        return jsonify({"error": "Módulo inválido"}), 400
+
+    try:
+        top, total = leaderboard.top(id_nivel, nivel, period, limit)
+        me = leaderboard.posicion(id_nivel, nivel, period, id_usuario) if id_usuario else None
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        print("Error obteniendo el ranking:", e)
+        return jsonify({"error": "No se pudo obtener el ranking"}), 500
+
+    return jsonify({
+        "module": module,
+        "nivel": nivel,
+        "period": period,
+        "since": inicio_semana().isoformat() if period == "week" else None,
+        "total": total,
+        "top": top,
+        "me": me,
+    })
+
+
+@app.get("/api/leaderboard-stats")
+def get_leaderboard_stats():
+    return jsonify(leaderboard.stats())
+
+
+# ==========================
+#   ESTADÍSTICAS DEL POOL DE CONEXIONES
+# ==========================
+@app.get("/api/pool-stats")
+def get_pool_stats():
+    return jsonify(pool.stats())
+
+
+@app.get("/api/plot-stats")
+def get_plot_stats():
+    return jsonify(plot_renderer.stats())
+
+
+@app.get("/api/hashing-stats")
+def get_hashing_stats():
+    return jsonify(hasher.stats())
+
+
+@app.get("/api/rate-limit-stats")
+def get_rate_limit_stats():
+    return jsonify(ratelimit.stats())
+
+
+@app.get("/api/ingest-stats")
+def get_ingest_stats():
+    return jsonify(result_writer.stats())
+
+
+# ==========================
+#   CATÁLOGO EN MEMORIA (NIVELES / EJERCICIOS)
+# ==========================
+@app.get("/api/catalog-stats")
+def get_catalog_stats():
+    return jsonify(catalog.stats())
+
+
+# Secreto para operaciones de administración desde otra máquina (header X-Admin-Token);
+# sin él solo se aceptan desde el mismo servidor
+ADMIN_TOKEN = env_str("ADMIN_TOKEN", "")
+
+
+def es_admin():
+    """
+    True si la petición trae "X-Admin-Token: <ADMIN_TOKEN>". Sin ADMIN_TOKEN
+    nadie es admin: la IP no sirve, detrás de un nginx local todas las
+    peticiones llegan desde 127.0.0.1.
+    """
+    token = request.headers.get("X-Admin-Token", "")
+    return bool(ADMIN_TOKEN and token
+                and hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")))
+
+
+@app.post("/api/catalog-reload")
+def reload_catalog():
+    """
+    Recarga el catálogo después de modificar 'niveles' o 'ejercicios'.
+    Solo con "X-Admin-Token: <ADMIN_TOKEN>" (sin ADMIN_TOKEN, deshabilitado;
+    el catálogo igual se relee solo cada CATALOG_TTL segundos).
+    """
+    if not es_admin():
+        return jsonify({"error": "No autorizado"}), 403
+    catalog.invalidate()
+    try:
+        catalog.load()
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        print("Error recargando catálogo:", e)
+        return jsonify({"error": "No se pudo recargar el catálogo"}), 500
+    return jsonify({"message": "Catálogo recargado", "stats": catalog.stats()})
+
+# ==========================
+#   ARRANQUE Y APAGADO (FÁBRICA WSGI)
+# ==========================
+# En producción: gunicorn -c gunicorn.conf.py wsgi:application
+# gunicorn carga la app una vez en el proceso maestro (preload_app) y
+# luego hace fork de los workers, que heredan el registro de ejercicios y
+# el catálogo ya cargados.
+def precargar():
+    """
+    Abre el pool, revisa las migraciones, reenvía los resultados que quedaron
+    en disco, carga el catálogo y los rankings y sincroniza las preguntas de
+    los generadores.
+    """
+    try:
+        pool.warmup()
+        migrations.revisar_al_arrancar()
+        reenviar_pendientes()   # lo que un apagado anterior no pudo escribir (ver ingest.py)
+        catalog.load()
+        sincronizar_preguntas()
+        catalog.load()      # incluye las preguntas recién creadas; los workers lo heredan ya cargado
+        leaderboard.load()
+    except migrations.MigracionesPendientes:
+        raise       # con el esquema viejo fallaría cada petición: mejor no arrancar
+    except Exception as e:
+        # Sin BD se arranca igual: el catálogo se carga en la primera petición
+        print("No se pudo precalentar el pool / catálogo:", e)
+
+
+def cerrar_recursos():
+    """Escribe lo pendiente del write-behind y cierra los pools (apagado ordenado)."""
+    try:
+        result_writer.stop()
+    except Exception as e:
+        print("Error deteniendo el write-behind:", e)
+    hasher.shutdown(wait=True)
+    plot_renderer.shutdown(wait=False)
+    pool.close()
+
+
+def create_app():
+    """Fábrica WSGI: deja la aplicación precargada y lista para servir."""
+    precargar()
+    return app
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    # Servidor de desarrollo (un proceso). Para producción ver gunicorn.conf.py
+    create_app().run(
+        host="0.0.0.0",
+        port=env_int("PORT", 5000),
+        debug=env_bool("FLASK_DEBUG", True),
+    )
@@ -0,0 +1,238 @@
+import argparse
+from datetime import date, datetime
+
+from config import env_int
+from db import DB_BACKEND, pool
+from migrations import (PARTICIONES_ADELANTE, definiciones_particiones, esta_particionada,
+                        mes_siguiente, primer_dia, tiene_tabla)
+
+# ============================================================
+#   ARCHIVO DE RESULTADOS E INTENTOS VIEJOS
+# ============================================================
+# Si 'resultados' e 'intentos' están particionadas por mes (opcional:
+# python migrations.py partition), este trabajo, pensado para correr una
+# vez por día o por semana (cron):
+#   1. crea por adelantado las particiones de los próximos meses
+#      (REORGANIZE de 'pmax', que está vacía y es instantáneo)
+#   2. cada partición con todos sus datos anteriores a ARCHIVE_MONTHS meses
+#      se saca de la tabla con EXCHANGE PARTITION (solo metadatos: no
+#      bloquea a quien está insertando), se suma a los agregados mensuales
+#      ('resultados_mensual', 'intentos_mensual'), se copia a la tabla de
+#      archivo comprimida y se borra la partición vacía.
+# El resumen del dashboard, el ranking histórico, /api/question-stats y la
+# vista 'resultados_por_mes' siguen incluyendo lo archivado.
+#
+# Sin particiones (SQLite, o MySQL sin 'partition') se mueven las filas con
+# INSERT ... SELECT y DELETE en una transacción.
+#
+# También borra de 'ejercicios_corregidos' las marcas de tokens ya vencidos
+# (ver grading.py).
+#
+# Desde backend/:
+#     python archive.py [--meses 12] [--dry-run]
+
+ARCHIVE_MONTHS = env_int("ARCHIVE_MONTHS", 12)     # meses que quedan en las tablas vivas
+
+_MES = {
+    # '%%' porque pymysql formatea la consulta con los parámetros
+    "mysql": "CAST(DATE_FORMAT({col}, '%%Y-%%m-01') AS DATE)",
+    "sqlite": "strftime('%Y-%m-01', {col})",
+}
+
+TABLAS = {
+    "resultados": {
+        "fecha": "fecha",
+        "archivo": "resultados_archivo",
+        "columnas": "id_resultado, id_usuario, id_nivel, id_ejercicio, puntaje, total_preguntas, fecha, dificultad, corregido",
+        "agregado": """
+            INSERT INTO resultados_mensual (mes, id_usuario, id_nivel, intentos, suma_puntaje, ultima_actividad)
+            SELECT {mes}, id_usuario, id_nivel, COUNT(*), SUM(puntaje), MAX(fecha)
+            FROM {origen}
+            WHERE {filtro}
+            GROUP BY {mes}, id_usuario, id_nivel
+            ON DUPLICATE KEY UPDATE
+                intentos = intentos + VALUES(intentos),
+                suma_puntaje = suma_puntaje + VALUES(suma_puntaje),
+                ultima_actividad = GREATEST(ultima_actividad, VALUES(ultima_actividad))
+        """,
+    },
+    "intentos": {
+        "fecha": "fecha_hora",
+        "archivo": "intentos_archivo",
+        "columnas": "id_intento, id_usuario, id_pregunta, id_opcion, respuesta_usuario, es_correcta, fecha_hora",
+        "agregado": """
+            INSERT INTO intentos_mensual (mes, id_pregunta, id_usuario, intentos, errores)
+            SELECT {mes}, id_pregunta, id_usuario, COUNT(*), SUM(1 - es_correcta)
+            FROM {origen}
+            WHERE {filtro}
+            GROUP BY {mes}, id_pregunta, id_usuario
+            ON DUPLICATE KEY UPDATE
+                intentos = intentos + VALUES(intentos),
+                errores = errores + VALUES(errores)
+        """,
+    },
+}
+
+
+def restar_meses(mes, n):
+    total = mes.year * 12 + mes.month - 1 - n
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def fecha_corte(meses=ARCHIVE_MONTHS, hoy=None):
+    """Primer día del mes más viejo que se conserva: lo anterior se archiva."""
+    return restar_meses(primer_dia(hoy or date.today()), meses)
+
+
+def _volcar(conn, tabla, origen, filtro="1 = 1", params=()):
+    """
+    Agrega, copia al archivo y borra de `origen` las filas del filtro, en
+    una sola transacción: si se corta a la mitad no queda nada contado dos veces.
+    """
+    conf = TABLAS[tabla]
+    mes = _MES["sqlite" if DB_BACKEND == "sqlite" else "mysql"].format(col=conf["fecha"])
+    with conn.cursor() as cursor:
+        cursor.execute(conf["agregado"].format(mes=mes, origen=origen, filtro=filtro), params)
+        cursor.execute(
+            f"""
+            INSERT INTO {conf['archivo']} ({conf['columnas']})
+            SELECT {conf['columnas']} FROM {origen} WHERE {filtro}
+            """,
+            params
+        )
+        movidas = cursor.rowcount
+        cursor.execute(f"DELETE FROM {origen} WHERE {filtro}", params)
+    conn.commit()
+    return movidas
+
+
+# ---------- MySQL: particiones ----------
+def particiones(cursor, tabla):
+    """[(nombre, límite superior como date o None para MAXVALUE, filas estimadas)] en orden."""
+    cursor.execute(
+        """
+        SELECT PARTITION_NAME AS nombre, PARTITION_DESCRIPTION AS limite, TABLE_ROWS AS filas
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+        """,
+        (tabla,)
+    )
+    resultado = []
+    for row in cursor.fetchall():
+        limite = row["limite"]
+        limite = None if limite == "MAXVALUE" else date.fromisoformat(limite.strip("'")[:10])
+        resultado.append((row["nombre"], limite, row["filas"]))
+    return resultado
+
+
+def asegurar_particiones(conn, tabla, adelante=PARTICIONES_ADELANTE):
+    """Crea las particiones mensuales que falten hasta `adelante` meses en el futuro."""
+    with conn.cursor() as cursor:
+        if not esta_particionada(cursor, tabla):
+            return []
+        limites = [limite for _, limite, _ in particiones(cursor, tabla) if limite is not None]
+        hasta = primer_dia(date.today())
+        for _ in range(adelante):
+            hasta = mes_siguiente(hasta)
+        if not limites or limites[-1] > hasta:
+            return []
+        nuevas = definiciones_particiones(limites[-1], hasta)
+        cursor.execute(
+            f"""
+            ALTER TABLE {tabla} REORGANIZE PARTITION pmax INTO (
+                {', '.join(nuevas)}, PARTITION pmax VALUES LESS THAN (MAXVALUE)
+            )
+            """
+        )
+    return nuevas
+
+
+def _archivar_particiones(conn, tabla, corte):
+    swap = f"{tabla}_swap"
+    total = 0
+    with conn.cursor() as cursor:
+        viejas = [(nombre, limite) for nombre, limite, _ in particiones(cursor, tabla)
+                  if limite is not None and limite <= corte]
+        if not viejas:
+            return 0
+        if not tiene_tabla(cursor, swap):
+            # Misma estructura e índices, sin particiones: requisito de EXCHANGE PARTITION
+            cursor.execute(f"CREATE TABLE {swap} LIKE {tabla}")
+            cursor.execute(f"ALTER TABLE {swap} REMOVE PARTITIONING")
+
+    # Filas que quedaron en la tabla intermedia si una corrida anterior se cortó
+    total += _volcar(conn, tabla, swap)
+
+    for nombre, _ in viejas:
+        with conn.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {tabla} EXCHANGE PARTITION {nombre} WITH TABLE {swap}")
+        total += _volcar(conn, tabla, swap)
+        with conn.cursor() as cursor:
+            # Un resultado con fecha vieja (subido sin conexión) pudo entrar después del EXCHANGE:
+            # en ese caso la partición queda y se archiva en la próxima corrida
+            cursor.execute(f"SELECT 1 FROM {tabla} PARTITION ({nombre}) LIMIT 1")
+            if cursor.fetchone() is None:
+                cursor.execute(f"ALTER TABLE {tabla} DROP PARTITION {nombre}")
+        print(f"{tabla}: partición {nombre} archivada")
+
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {swap}")
+    return total
+
+
+# ---------- trabajo completo ----------
+def purgar_corregidos(conn):
+    """Borra las marcas de ejercicios cuyo token ya venció. Devuelve cuántas."""
+    with conn.cursor() as cursor:
+        if not tiene_tabla(cursor, "ejercicios_corregidos"):
+            return 0
+        cursor.execute("DELETE FROM ejercicios_corregidos WHERE expira < %s", (datetime.now(),))
+        borradas = cursor.rowcount
+    conn.commit()
+    return borradas
+
+
+def archivar(meses=ARCHIVE_MONTHS, dry_run=False):
+    """Archiva lo anterior a `meses` meses en ambas tablas. Devuelve {tabla: filas movidas}."""
+    corte = fecha_corte(meses)
+    movidas = {}
+    with pool.connection() as conn:
+        for tabla, conf in TABLAS.items():
+            with conn.cursor() as cursor:
+                particionada = esta_particionada(cursor, tabla)
+                if dry_run:
+                    if particionada:
+                        viejas = [(n, f) for n, limite, f in particiones(cursor, tabla)
+                                  if limite is not None and limite <= corte]
+                        print(f"{tabla}: se archivarían las particiones {viejas or 'ninguna'} (filas estimadas)")
+                    else:
+                        cursor.execute(f"SELECT COUNT(*) AS n FROM {tabla} WHERE {conf['fecha']} < %s", (corte,))
+                        print(f"{tabla}: se archivarían {cursor.fetchone()['n']} fila(s) anteriores a {corte}")
+                    continue
+
+            if particionada:
+                nuevas = asegurar_particiones(conn, tabla)
+                if nuevas:
+                    print(f"{tabla}: {len(nuevas)} partición(es) nueva(s)")
+                movidas[tabla] = _archivar_particiones(conn, tabla, corte)
+            else:
+                movidas[tabla] = _volcar(conn, tabla, tabla, f"{conf['fecha']} < %s", (corte,))
+
+        if not dry_run:
+            vencidas = purgar_corregidos(conn)
+            if vencidas:
+                print(f"ejercicios_corregidos: {vencidas} marca(s) vencida(s) borrada(s)")
+    return movidas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archiva resultados e intentos viejos")
+    parser.add_argument("--meses", type=int, default=ARCHIVE_MONTHS,
+                        help=f"meses que quedan en las tablas vivas (por defecto {ARCHIVE_MONTHS})")
+    parser.add_argument("--dry-run", action="store_true", help="solo mostrar qué se archivaría")
+    args = parser.parse_args()
+
+    resultado = archivar(args.meses, args.dry_run)
+    for tabla, filas in resultado.items():
+        print(f"{tabla}: {filas} fila(s) archivada(s) (anteriores a {fecha_corte(args.meses)})")
@@ -0,0 +1,386 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import wraps
+from urllib.parse import urlencode
+
+import pymysql
+from a2wsgi import WSGIMiddleware
+from quart import Quart, Response, g, jsonify, request
+from werkzeug.exceptions import MethodNotAllowed, NotFound
+
+import app as flask_app
+import json_provider
+import metrics
+from config import env_int, env_str
+from db import DB_POOL_MAX, PoolTimeout
+from db_async import apool
+from exercises import get_generator
+from grading import generate_public
+from hashing import HashingOverloaded, hasher
+from history import (HISTORY_PAGE_DEFAULT, HISTORY_PAGE_MAX, InvalidCursor, pagina_historial_async,
+                     recorrer_historial_async)
+from progress import NIVELES
+from ratelimit import RateLimited, ip_cliente, limitar
+from sessions import InvalidSession, SessionExpired, emitir_sesion, verificar
+from summary import version_usuario_async
+
+# ============================================================
+#   MODO ASYNCIO (ASGI): LAS RUTAS MÁS CONCURRIDAS SIN BLOQUEAR HILOS
+# ============================================================
+# Con la app Flask cada petición ocupa un hilo mientras espera a MySQL;
+# los dashboards que consultan seguido el historial de muchos alumnos
+# agotan los hilos de gunicorn aunque el servidor esté casi sin CPU.
+#
+# Aquí las rutas calientes (/api/exercise, /api/exercise-result,
+# /api/user-results, /api/login, /api/register) son corrutinas de Quart
+# que leen con aiomysql (db_async.py): miles de conexiones abiertas cuestan
+# memoria, no hilos. Mismos parámetros, códigos y JSON que en app.py.
+#   - bcrypt sigue en el pool de hashing.py (se espera con await)
+#   - guardar un resultado reutiliza ingest.py (resumen, progreso, ranking
+#     en una transacción) en un pool acotado de hilos: esa escritura sigue
+#     siendo sincrónica (pymysql) y ocupa un hilo de _escrituras mientras dura
+#   - las respuestas de las rutas de Quart no pasan por compression.py (es
+#     un after_request de Flask): comprimirlas en el proxy (gzip de nginx)
+#   - todas las demás rutas (y los preflight CORS) las atiende la app Flask
+#     detrás de un adaptador WSGI, así la API completa sigue en un solo puerto
+#
+# Desde backend/ (solo con DB_BACKEND=mysql):
+#     uvicorn asgi:application --host 0.0.0.0 --port 5000 --workers 4
+#     python asgi.py                                  (WEB_BIND y WEB_WORKERS de .env)
+
+ASYNC_FALLBACK_THREADS = env_int("ASYNC_FALLBACK_THREADS", 8)   # hilos para las rutas de Flask
+
+quart_app = Quart(__name__, static_folder=None)
+json_provider.instalar(quart_app)
+
+# INSERT + resumen + progreso: el mismo código sincrónico de ingest.py, fuera del event loop
+_escrituras = ThreadPoolExecutor(max_workers=DB_POOL_MAX, thread_name_prefix="escritura")
+
+
+# ==========================
+#   SESIÓN, ERRORES Y MÉTRICAS
+# ==========================
+def respuesta_no_autorizada(e):
+    response = jsonify({"error": str(e), "expired": isinstance(e, SessionExpired)})
+    response.headers["WWW-Authenticate"] = 'Bearer error="invalid_token"'
+    return response, 401
+
+
+def requiere_sesion(fn):
+    """sessions.requiere_sesion para corrutinas: deja el usuario en g.id_usuario."""
+    @wraps(fn)
+    async def wrapper(*args, **kwargs):
+        header = request.headers.get("Authorization", "")
+        scheme, _, token = header.partition(" ")
+        token = token.strip() if scheme.lower() == "bearer" else ""
+        if not token:
+            return respuesta_no_autorizada(InvalidSession("Falta el token de sesión"))
+        try:
+            g.id_usuario = verificar(token)
+        except InvalidSession as e:
+            return respuesta_no_autorizada(e)
+        return await fn(*args, **kwargs)
+    return wrapper
+
+
+def es_otro_usuario(id_usuario):
+    return id_usuario is not None and str(id_usuario) != str(g.id_usuario)
+
+
+@quart_app.errorhandler(PoolTimeout)
+async def pool_timeout(e):
+    print("Pool de conexiones agotado:", e)
+    return jsonify({"error": "Servidor ocupado, intenta nuevamente"}), 503
+
+
+@quart_app.errorhandler(HashingOverloaded)
+async def hashing_overloaded(e):
+    response = jsonify({"error": "Servidor ocupado, intenta nuevamente en unos segundos"})
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response, 503
+
+
+@quart_app.errorhandler(RateLimited)
+async def rate_limited(e):
+    response = jsonify({"error": "Demasiadas solicitudes, intenta nuevamente más tarde"})
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response, 429
+
+
+@quart_app.before_request
+async def start_request_metrics():
+    g.request_start = time.perf_counter()
+    metrics.http_in_flight.inc()
+
+
+@quart_app.after_request
+async def finish_request_metrics(response):
+    # Igual que app.py, sin el desglose por tipo (es por hilo y aquí todas comparten el mismo)
+    start = g.pop("request_start", None)
+    response.headers.setdefault("Access-Control-Allow-Origin", "*")     # lo mismo que flask_cors
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    endpoint = request.url_rule.rule if request.url_rule else "sin_ruta"
+    metrics.http_requests.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+    metrics.http_latency.observe(elapsed, method=request.method, endpoint=endpoint)
+    metrics.log_access({
+        "ts": datetime.now().isoformat(timespec="milliseconds"),
+        "method": request.method,
+        "path": request.path,
+        "endpoint": endpoint,
+        "status": response.status_code,
+        "duration_ms": round(elapsed * 1000, 2),
+        "remote": request.remote_addr,
+        "async": True,
+    })
+    return response
+
+
+@quart_app.teardown_request
+async def end_request_metrics(exc):
+    metrics.http_in_flight.dec()
+
+
+# ==========================
+#   REGISTRO Y LOGIN
+# ==========================
+@quart_app.post("/api/register")
+async def register():
+    limitar("register_ip", ip_cliente(request))
+    data = await request.get_json(silent=True) or {}
+    nombre_usuario = data.get("nombre_usuario")
+    correo = data.get("correo")
+    contraseña = data.get("contraseña")
+
+    if not nombre_usuario or not correo or not contraseña:
+        return jsonify({"error": "Faltan datos (nombre_usuario, correo, contraseña)"}), 400
+
+    hashed = await hasher.hash_async(contraseña)
+
+    try:
+        async with apool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    """
+                    INSERT INTO usuario (nombre_usuario, correo, contraseña, nivel)
+                    VALUES (%s, %s, %s, %s)
+                    """,
+                    (nombre_usuario, correo, hashed, "basico")
+                )
+            await conn.commit()
+    except pymysql.err.IntegrityError as e:
+        if e.args[0] == 1062:
+            return jsonify({"error": "El correo o nombre de usuario ya está registrado"}), 400
+        print("Error de integridad en register:", e)
+        return jsonify({"error": "Error de integridad en el registro"}), 400
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        print("Error general en register:", e)
+        return jsonify({"error": "Error al registrar el usuario en la base de datos"}), 500
+
+    return jsonify({"message": "Usuario registrado correctamente"}), 201
+
+
+@quart_app.post("/api/login")
+async def login():
+    limitar("login_ip", ip_cliente(request))
+    data = await request.get_json(silent=True) or {}
+    identifier = data.get("username")
+    password = data.get("password")
+
+    if not identifier or not password:
+        return jsonify({"error": "Faltan datos (username, password)"}), 400
+    limitar("login_cuenta", str(identifier).strip().lower())
+
+    async with apool.connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                """
+                SELECT id, nombre_usuario, correo, contraseña, nivel
+                FROM usuario
+                WHERE nombre_usuario = %s OR correo = %s
+                """,
+                (identifier, identifier)
+            )
+            user = await cursor.fetchone()
+
+    if not user:
+        return jsonify({"error": "Usuario no encontrado"}), 404
+
+    stored_hash = user["contraseña"]
+    if not await hasher.check_async(password, stored_hash):
+        return jsonify({"error": "Contraseña incorrecta"}), 401
+
+    if hasher.needs_rehash(stored_hash):
+        hasher.rehash_later(password, lambda new_hash: flask_app.actualizar_hash(user["id"], new_hash))
+
+    return jsonify({
+        "message": "Login exitoso",
+        "user": {
+            "id": user["id"],
+            "nombre_usuario": user["nombre_usuario"],
+            "correo": user["correo"],
+            "nivel": user["nivel"]
+        },
+        "session": emitir_sesion(user["id"])
+    }), 200
+
+
+# ==========================
+#   EJERCICIOS Y RESULTADOS
+# ==========================
+@quart_app.get("/api/exercise")
+async def get_exercise():
+    module = request.args.get("module", "quadratic")
+    nivel = request.args.get("nivel", "basico")
+
+    generator = get_generator(module, nivel)
+    if generator is None:
+        return jsonify({"error": "Módulo o nivel inválido"}), 400
+
+    # Generar cuesta microsegundos: no vale la pena salir del event loop
+    exercise = generate_public(generator)
+    exercise["image"] = "/api/exercise-plot?" + urlencode({"token": exercise["token"]})
+    return jsonify(exercise)
+
+
+@quart_app.post("/api/exercise-result")
+@requiere_sesion
+async def save_exercise_result():
+    limitar("resultados_ip", ip_cliente(request))
+    limitar("resultados_usuario", g.id_usuario)
+    data = await request.get_json(silent=True) or {}
+
+    if es_otro_usuario(data.get("id_usuario")):
+        return jsonify({"error": "No puedes guardar resultados de otro usuario"}), 403
+
+    module = data.get("module")
+    puntaje = data.get("puntaje")
+    total_preguntas = data.get("total_preguntas")
+    nivel = data.get("nivel")
+
+    if not module or puntaje is None or not total_preguntas:
+        return jsonify({"error": "Faltan datos para guardar el resultado"}), 400
+    if nivel is not None and nivel not in NIVELES:
+        return jsonify({"error": "Nivel inválido"}), 400
+    try:
+        puntaje, total_preguntas = flask_app.validar_resultado(puntaje, total_preguntas)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    loop = asyncio.get_running_loop()
+    try:
+        queued = await loop.run_in_executor(
+            _escrituras, flask_app.guardar_resultado, g.id_usuario, module, puntaje, total_preguntas, nivel)
+    except ValueError:
+        return jsonify({"error": "No se pudo determinar el nivel para este módulo"}), 400
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        print("Error guardando resultado:", e)
+        return jsonify({"error": "No se pudo guardar el resultado"}), 500
+
+    if queued:
+        return jsonify({"message": "Resultado recibido"}), 202
+    return jsonify({"message": "Resultado guardado correctamente"}), 201
+
+
+# ==========================
+#   HISTORIAL DEL USUARIO
+# ==========================
+def con_validador(response, etag):
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+async def _json_array_stream(rows, chunk_rows=100):
+    yield "["
+    buffer = []
+    first = True
+    async for row in rows:
+        buffer.append(quart_app.json.dumps(row))
+        if len(buffer) >= chunk_rows:
+            yield ("" if first else ",") + ",".join(buffer)
+            first = False
+            buffer = []
+    if buffer:
+        yield ("" if first else ",") + ",".join(buffer)
+    yield "]"
+
+
+@quart_app.get("/api/user-results/<int:user_id>")
+@requiere_sesion
+async def get_user_results(user_id):
+    if es_otro_usuario(user_id):
+        return jsonify({"error": "No puedes ver el historial de otro usuario"}), 403
+
+    etag = await version_usuario_async(user_id, request.query_string)
+    if request.if_none_match.contains_weak(etag):
+        return con_validador(Response("", status=304), etag)
+
+    if request.args.get("all") in ("1", "true"):
+        response = Response(_json_array_stream(recorrer_historial_async(user_id)), mimetype="application/json")
+        return con_validador(response, etag)
+
+    limit = request.args.get("limit", HISTORY_PAGE_DEFAULT, type=int)
+    if limit is None or limit < 1:
+        return jsonify({"error": "limit debe ser un entero positivo"}), 400
+    limit = min(limit, HISTORY_PAGE_MAX)
+
+    try:
+        results, next_before = await pagina_historial_async(user_id, limit, request.args.get("before"))
+    except InvalidCursor:
+        return jsonify({"error": "Parámetro before inválido"}), 400
+
+    return con_validador(jsonify({"results": results, "next_before": next_before}), etag)
+
+
+# ==========================
+#   ARRANQUE Y DESPACHO ENTRE QUART Y FLASK
+# ==========================
+@quart_app.before_serving
+async def abrir_pool():
+    # Catálogo, migraciones, ranking y pool sincrónico (lo usan las escrituras y las rutas de Flask)
+    flask_app.precargar()
+    await apool.open()
+
+
+@quart_app.after_serving
+async def cerrar_pool():
+    await apool.close()
+    _escrituras.shutdown(wait=True)
+    flask_app.cerrar_recursos()
+
+
+_flask = WSGIMiddleware(flask_app.app, workers=ASYNC_FALLBACK_THREADS)
+_rutas = quart_app.url_map.bind("localhost")
+
+
+def _es_nativa(scope):
+    if scope["method"] == "OPTIONS":
+        return False    # preflight CORS: lo responde flask_cors
+    try:
+        _rutas.match(scope["path"], method=scope["method"])
+    except (NotFound, MethodNotAllowed):
+        return False
+    return True
+
+
+async def application(scope, receive, send):
+    """Punto de entrada ASGI: rutas de este archivo con Quart, el resto con la app Flask."""
+    if scope["type"] == "http" and not _es_nativa(scope):
+        await _flask(scope, receive, send)
+    else:
+        await quart_app(scope, receive, send)     # incluye 'lifespan' (arranque/apagado)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    host, _, port = env_str("WEB_BIND", "0.0.0.0:5000").rpartition(":")
+    uvicorn.run("asgi:application", host=host, port=int(port), workers=env_int("WEB_WORKERS", 1))
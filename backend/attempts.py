@@ -0,0 +1,166 @@
+import threading
+
+from catalog import catalog
+from db import pool
+from exercises import REGISTRY
+from migrations import existe_tabla
+
+# ============================================================
+#   INTENTOS POR PREGUNTA (TABLA 'intentos')
+# ============================================================
+# Cada pregunta de un ejercicio generado corresponde a una fila fija de
+# 'preguntas_ejercicio', identificada por su clave 'module/nivel/n'.
+# Al corregir un ejercicio se registran todas sus respuestas con un solo
+# INSERT multi-fila, en la misma transacción que el resultado (ver ingest.py).
+
+RESPUESTA_MAX = 255     # largo de intentos.respuesta_usuario
+STATS_LIMIT_DEFAULT = 100   # preguntas por respuesta de tasas_de_error
+STATS_LIMIT_MAX = 1000
+
+_sync_lock = threading.Lock()
+_synced = False
+
+
+def clave_pregunta(module, nivel, numero):
+    return f"{module}/{nivel}/{numero}"
+
+
+def sincronizar_preguntas():
+    """
+    Crea en 'preguntas_ejercicio' las filas que falten para las preguntas de
+    los generadores registrados (INSERT IGNORE: las existentes no cambian).
+    """
+    global _synced
+
+    rows = []
+    for (module, nivel), generator in REGISTRY.items():
+        id_ejercicio = catalog.id_ejercicio(module)
+        if id_ejercicio is None:
+            continue
+        for numero, label in enumerate(generator.question_labels, start=1):
+            rows.append((
+                id_ejercicio,
+                f"{generator.title}: {label}",
+                "numeric",
+                "generada",     # la respuesta depende de la semilla de cada ejercicio
+                clave_pregunta(module, nivel, numero),
+            ))
+
+    if rows:
+        with pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.executemany(
+                    """
+                    INSERT IGNORE INTO preguntas_ejercicio (id_ejercicio, enunciado, tipo, respuesta_correcta, clave)
+                    VALUES (%s, %s, %s, %s, %s)
+                    """,
+                    rows
+                )
+            conn.commit()
+        catalog.invalidate()
+
+    _synced = True
+
+
+def filas_intentos(id_usuario, module, nivel, graded_results, fecha):
+    """
+    Filas para 'intentos' a partir del resultado de grading.grade().
+    Si falta alguna pregunta en el catálogo se sincroniza una vez por proceso.
+    """
+    claves = [clave_pregunta(module, nivel, i) for i in range(1, len(graded_results) + 1)]
+
+    if not _synced and any(catalog.id_pregunta(c) is None for c in claves):
+        with _sync_lock:
+            if not _synced:
+                sincronizar_preguntas()
+
+    rows = []
+    for clave, r in zip(claves, graded_results):
+        id_pregunta = catalog.id_pregunta(clave)
+        if id_pregunta is None:
+            continue
+        rows.append((
+            id_usuario,
+            id_pregunta,
+            str(r["userAnswer"])[:RESPUESTA_MAX],
+            1 if r["isCorrect"] else 0,
+            fecha,
+        ))
+    return rows
+
+
+def insertar_intentos(cursor, rows):
+    """Un único INSERT multi-fila; se llama dentro de la transacción del resultado."""
+    if not rows:
+        return
+    cursor.executemany(
+        """
+        INSERT INTO intentos (id_usuario, id_pregunta, respuesta_usuario, es_correcta, fecha_hora)
+        VALUES (%s, %s, %s, %s, %s)
+        """,
+        rows
+    )
+
+
+def tasas_de_error(module=None, nivel=None, id_usuario=None, limit=STATS_LIMIT_DEFAULT):
+    """
+    Intentos, errores y tasa de error por pregunta, calculados y ordenados
+    en SQL (de la más fallada a la menos; las `limit` primeras).
+    Suma los intentos vivos y los ya archivados ('intentos_mensual', ver
+    archive.py; sin esa tabla, solo los vivos); los filtros se aplican
+    dentro de cada rama del UNION.
+    """
+    filtro = ""
+    params = []
+    if module:
+        prefix = f"{module}/{nivel}/" if nivel else f"{module}/"
+        # ESCAPE explícito: MySQL y SQLite no comparten el carácter por defecto
+        filtro += """ AND id_pregunta IN (
+            SELECT id_pregunta FROM preguntas_ejercicio WHERE clave LIKE %s ESCAPE '!'
+        )"""
+        params.append(prefix.replace("!", "!!").replace("%", "!%").replace("_", "!_") + "%")
+    if id_usuario is not None:
+        filtro += " AND id_usuario = %s"
+        params.append(id_usuario)
+
+    ramas = [f"""
+            SELECT id_pregunta, COUNT(*) AS intentos, SUM(1 - es_correcta) AS errores
+            FROM intentos
+            WHERE 1 = 1 {filtro}
+            GROUP BY id_pregunta
+    """]
+
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            # La crea la migración 3: una base MySQL sin migrar no la tiene
+            if existe_tabla(cursor, "intentos_mensual"):
+                ramas.append(f"""
+            SELECT id_pregunta, SUM(intentos), SUM(errores)
+            FROM intentos_mensual
+            WHERE 1 = 1 {filtro}
+            GROUP BY id_pregunta
+                """)
+            sql = f"""
+                SELECT
+                    p.id_pregunta,
+                    p.clave,
+                    p.enunciado,
+                    SUM(t.intentos) AS intentos,
+                    SUM(t.errores) AS errores,
+                    -- 1.0 *: en SQLite la división de enteros trunca
+                    COALESCE(1.0 * SUM(t.errores) / NULLIF(SUM(t.intentos), 0), 0) AS tasa_error
+                FROM ({" UNION ALL ".join(ramas)}) t
+                JOIN preguntas_ejercicio p ON p.id_pregunta = t.id_pregunta
+                GROUP BY p.id_pregunta, p.clave, p.enunciado
+                ORDER BY tasa_error DESC, intentos DESC, p.id_pregunta
+                LIMIT %s
+            """
+            cursor.execute(sql, params * len(ramas) + [limit])
+            rows = cursor.fetchall()
+
+    for row in rows:
+        # SUM y la división llegan como Decimal desde MySQL
+        row["intentos"] = int(row["intentos"])
+        row["errores"] = int(row["errores"])
+        row["tasa_error"] = round(float(row["tasa_error"]), 4)
+    return rows
@@ -0,0 +1,254 @@
+"""
+Capacidad de conexiones simultáneas: N clientes con una conexión
+keep-alive abierta cada uno consultan el historial cada --interval
+segundos (lo que hace un dashboard docente abierto) y a veces guardan un
+resultado, para N creciente. Con las mismas peticiones se compara el
+servidor sincrónico (gunicorn + app.py) con el modo asyncio (uvicorn +
+asgi.py).
+
+Los alumnos se insertan en la BD configurada en backend/.env (como
+loadtest.py) y los tokens de sesión se firman aquí con SESSION_KEYS: los
+servidores probados deben usar esa misma configuración.
+
+Por nivel informa conexiones logradas, peticiones/s, latencia p50/p95/p99
+y errores; la capacidad es el mayor nivel con menos de --max-errors de
+errores y p95 bajo --slo-ms.
+
+Uso (desde backend/):
+    gunicorn -c gunicorn.conf.py wsgi:application                     # :5000
+    WEB_BIND=0.0.0.0:5001 python asgi.py                               # :5001
+    python bench/bench_concurrency.py --url http://127.0.0.1:5000 --url http://127.0.0.1:5001
+    python bench/bench_concurrency.py --levels 50,100 --duration 5     # app Flask en proceso (SQLite)
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from urllib.parse import urlsplit
+
+# Todo el curso sale de una misma IP: los límites de ratelimit.py frenarían la prueba.
+# Un servidor probado con --url también debe correr con RATE_LIMIT_ENABLED=0.
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loadtest import MODULES, percentil, sembrar, servidor_local  # noqa: E402
+
+try:
+    import resource
+except ImportError:     # Windows
+    resource = None
+
+
+# ============================================================
+#   CLIENTE HTTP/1.1 MÍNIMO SOBRE ASYNCIO
+# ============================================================
+async def _leer_respuesta(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("El servidor cerró la conexión")
+    version, status = status_line.split()[:2]
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif int(status) not in (204, 304):
+        await reader.read()     # sin largo: hasta que el servidor cierre
+
+    keep_alive = version == b"HTTP/1.1" and headers.get("connection", "").lower() != "close"
+    return int(status), keep_alive
+
+
+class Conexion:
+    def __init__(self, host, port, token):
+        self.host, self.port, self.token = host, port, token
+        self._reader = self._writer = None
+
+    async def abrir(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    def cerrar(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def pedir(self, method, path, body=None):
+        if self._writer is None:
+            await self.abrir()
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                f"Authorization: Bearer {self.token}\r\nAccept-Encoding: identity\r\n")
+        if body is not None:
+            head += f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+        self._writer.write(head.encode("latin-1") + b"\r\n" + payload)
+        await self._writer.drain()
+        status, keep_alive = await _leer_respuesta(self._reader)
+        if not keep_alive:
+            self.cerrar()
+        return status
+
+
+# ============================================================
+#   UN NIVEL DE CONCURRENCIA
+# ============================================================
+async def _cliente(conexion, rng, id_usuario, args, deadline, latencias, estados):
+    # Cada dashboard arranca en un momento distinto del intervalo
+    await asyncio.sleep(rng.uniform(0, args.interval))
+    while time.monotonic() < deadline:
+        if rng.random() < args.write_ratio:
+            method, path = "POST", "/api/exercise-result"
+            body = {"module": rng.choice(MODULES), "puntaje": rng.choice((0, 40, 80, 100)), "total_preguntas": 5}
+        else:
+            method, path, body = "GET", f"/api/user-results/{id_usuario}?limit=50", None
+        start = time.perf_counter()
+        try:
+            status = await asyncio.wait_for(conexion.pedir(method, path, body), args.timeout)
+        except (OSError, ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            conexion.cerrar()
+            status = 0
+        latencias.append(time.perf_counter() - start)
+        estados[status] = estados.get(status, 0) + 1
+        await asyncio.sleep(args.interval)
+
+
+async def nivel(url, alumnos, tokens, n, args):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    rng = random.Random(args.seed * 7919 + n)
+    elegidos = [alumnos[i % len(alumnos)][0] for i in range(n)]
+    conexiones = [Conexion(host, port, tokens[id_usuario]) for id_usuario in elegidos]
+
+    # Abrir todas primero: si el servidor no acepta más conexiones se nota aquí
+    abiertas = await asyncio.gather(*(asyncio.wait_for(c.abrir(), args.timeout) for c in conexiones),
+                                    return_exceptions=True)
+    conectadas = sum(1 for r in abiertas if not isinstance(r, BaseException))
+
+    latencias, estados = [], {}
+    start = time.monotonic()
+    deadline = start + args.duration
+    await asyncio.gather(*(
+        _cliente(c, random.Random(rng.random()), id_usuario, args, deadline, latencias, estados)
+        for c, id_usuario, r in zip(conexiones, elegidos, abiertas) if not isinstance(r, BaseException)
+    ))
+    elapsed = time.monotonic() - start
+    for c in conexiones:
+        c.cerrar()
+
+    latencias.sort()
+    errores = sum(count for status, count in estados.items() if status == 0 or status >= 500)
+    return {
+        "connections": n,
+        "connected": conectadas,
+        "requests": len(latencias),
+        "rps": len(latencias) / elapsed,
+        "errors": errores + (n - conectadas),
+        "p50_ms": percentil(latencias, 50) * 1000,
+        "p95_ms": percentil(latencias, 95) * 1000,
+        "p99_ms": percentil(latencias, 99) * 1000,
+        "statuses": {str(s): c for s, c in sorted(estados.items())},
+    }
+
+
+def capacidad(niveles, args):
+    """Mayor cantidad de conexiones que cumplió el objetivo (0 si ninguna)."""
+    mejor = 0
+    for r in niveles:
+        total = r["requests"] + (r["connections"] - r["connected"])
+        tasa = r["errors"] / total if total else 1.0
+        if tasa <= args.max_errors and r["p95_ms"] <= args.slo_ms:
+            mejor = max(mejor, r["connections"])
+    return mejor
+
+
+def imprimir(url, niveles, cap):
+    print(f"\n{url}")
+    print(f"{'conexiones':>11}{'abiertas':>10}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'err':>7}  estados")
+    for r in niveles:
+        statuses = " ".join(f"{s}:{c}" for s, c in r["statuses"].items())
+        print(f"{r['connections']:>11}{r['connected']:>10}{r['rps']:>9.1f}{r['p50_ms']:>9.1f}"
+              f"{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['errors']:>7}  {statuses}")
+    print(f"Capacidad: {cap} conexiones simultáneas")
+
+
+def _subir_limite_archivos():
+    # Cada conexión es un descriptor de archivo; el límite blando suele ser 1024
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard if hard != resource.RLIM_INFINITY else 65536, hard))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Capacidad de conexiones simultáneas (sync vs asyncio)")
+    parser.add_argument("--url", action="append",
+                        help="servidor a probar (repetible); por defecto la app Flask en proceso")
+    parser.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite",
+                        help="BD de la app en proceso (sin --url)")
+    parser.add_argument("--levels", default="50,100,250,500,1000", help="conexiones simultáneas por nivel")
+    parser.add_argument("--duration", type=float, default=15.0, help="segundos por nivel")
+    parser.add_argument("--interval", type=float, default=1.0, help="segundos entre consultas de cada dashboard")
+    parser.add_argument("--write-ratio", type=float, default=0.1, help="fracción de peticiones que guardan un resultado")
+    parser.add_argument("--users", type=int, default=200, help="alumnos sembrados (las conexiones se reparten entre ellos)")
+    parser.add_argument("--history", type=int, default=200, help="resultados previos por alumno")
+    parser.add_argument("--timeout", type=float, default=10.0, help="segundos máximos por petición")
+    parser.add_argument("--slo-ms", type=float, default=500.0, help="p95 máximo aceptable")
+    parser.add_argument("--max-errors", type=float, default=0.01, help="fracción de errores aceptable")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    from hashing import BCRYPT_ROUNDS
+    from sessions import emitir_sesion
+
+    _subir_limite_archivos()
+    levels = [int(x) for x in args.levels.split(",") if x.strip()]
+
+    urls, detener = args.url, None
+    if not urls:
+        url, detener = servidor_local(BCRYPT_ROUNDS, args.backend)
+        urls = [url]
+
+    resultados = {}
+    try:
+        print(f"Sembrando {args.users} alumnos x {args.history} resultados...")
+        alumnos = sembrar(args.users, args.history, 4, args.seed)
+        tokens = {id_usuario: emitir_sesion(id_usuario)["access_token"] for id_usuario, _ in alumnos}
+
+        for url in urls:
+            niveles = []
+            for n in levels:
+                print(f"{url}: {n} conexiones durante {args.duration:g}s...")
+                niveles.append(asyncio.run(nivel(url, alumnos, tokens, n, args)))
+            resultados[url] = {"levels": niveles, "capacity": capacidad(niveles, args)}
+    finally:
+        if detener:
+            detener()
+
+    for url, r in resultados.items():
+        imprimir(url, r["levels"], r["capacity"])
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"args": {k: v for k, v in vars(args).items() if k != "save"}, "results": resultados},
+                      f, indent=2, ensure_ascii=False)
+        print(f"Resultados guardados en {args.save}")
+
+
+if __name__ == "__main__":
+    main()
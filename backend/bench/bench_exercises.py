@@ -0,0 +1,63 @@
+"""
+Micro-benchmark: ejercicios por segundo con el camino escalar (`build` uno
+por uno) versus el camino en lote con NumPy (`build_batch`), y lo mismo a
+través de Flask: `count` llamadas a /api/exercise versus una a /api/exercises.
+
+Uso (desde backend/):
+    python bench/bench_exercises.py [--count 40] [--repeat 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exercises import REGISTRY  # noqa: E402
+
+
+def _rate(fn, count, repeat):
+    fn()  # calentamiento
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = time.perf_counter() - start
+    return count * repeat / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=40, help="ejercicios por lote")
+    parser.add_argument("--repeat", type=int, default=200, help="lotes por medición")
+    args = parser.parse_args()
+
+    print(f"{'module':<15}{'nivel':<12}{'escalar/s':>14}{'lote/s':>14}{'x':>8}")
+    for (module, nivel), generator in sorted(REGISTRY.items()):
+        ps = [generator.draw(random.Random(i)) for i in range(args.count)]
+
+        if [generator.build(p) for p in ps] != generator.build_batch(ps):
+            raise SystemExit(f"El lote no coincide con el camino escalar en {module}/{nivel}")
+
+        scalar = _rate(lambda: [generator.build(p) for p in ps], args.count, args.repeat)
+        batch = _rate(lambda: generator.build_batch(ps), args.count, args.repeat)
+        print(f"{module:<15}{nivel:<12}{scalar:>14,.0f}{batch:>14,.0f}{batch / scalar:>8.2f}")
+
+    # Mismo contraste pasando por Flask (sin servidor: cliente de pruebas)
+    from app import app
+
+    client = app.test_client()
+    repeat = max(1, args.repeat // 10)
+
+    print(f"\n{'HTTP':<27}{'/exercise/s':>14}{'/exercises/s':>14}{'x':>8}")
+    for module, nivel in sorted(REGISTRY):
+        single_url = f"/api/exercise?module={module}&nivel={nivel}"
+        batch_url = f"/api/exercises?module={module}&nivel={nivel}&count={args.count}"
+
+        single = _rate(lambda: [client.get(single_url) for _ in range(args.count)], args.count, repeat)
+        batch = _rate(lambda: client.get(batch_url), args.count, repeat)
+        print(f"{module:<15}{nivel:<12}{single:>14,.0f}{batch:>14,.0f}{batch / single:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Micro-benchmark: costo de emitir y verificar los tokens de sesión
+(sessions.py), comparado con el costo de un bcrypt del login.
+
+Uso (desde backend/):
+    python bench/bench_sessions.py [--repeat 200000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hashing import BCRYPT_ROUNDS, PasswordHasher  # noqa: E402
+from sessions import emitir_sesion, verificar  # noqa: E402
+
+
+def _per_call(fn, repeat):
+    fn()  # calentamiento
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200000, help="llamadas por medición")
+    args = parser.parse_args()
+
+    token = emitir_sesion(12345)["access_token"]
+    issue = _per_call(lambda: emitir_sesion(12345), args.repeat // 4)
+    verify = _per_call(lambda: verificar(token), args.repeat)
+
+    stored = PasswordHasher._hash_sync("benchmark", BCRYPT_ROUNDS)
+    bcrypt = _per_call(lambda: PasswordHasher._check_sync("benchmark", stored), 3)
+
+    print(f"token: {token} ({len(token)} caracteres)")
+    print(f"{'emitir par de tokens':<28}{issue * 1e6:>10.2f} µs")
+    print(f"{'verificar access token':<28}{verify * 1e6:>10.2f} µs  ({1 / verify:,.0f}/s por núcleo)")
+    print(f"{'bcrypt (login)':<28}{bcrypt * 1e6:>10.0f} µs  ({bcrypt / verify:,.0f}x verificar)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""
+Prueba de carga de la API con tráfico tipo sala de clases: un curso entero
+inicia sesión casi al mismo tiempo y luego cada alumno pide ejercicios, los
+envía a corregir y de vez en cuando revisa su historial y su dashboard.
+
+Por defecto levanta la app en este mismo proceso sobre una base SQLite
+temporal (backend SQLite, ver sqlite_backend.py) con usuarios e historiales
+de ejemplo; --backend mysql usa la BD MySQL configurada en backend/.env. Con
+--url se prueba un servidor ya levantado (MySQL/MariaDB local): los datos
+de ejemplo se insertan en la BD configurada en backend/.env.
+
+Informa peticiones/s y latencia p50/p95/p99 por endpoint. Con --save se
+guarda el resultado como línea base (JSON) y con --compare se compara
+contra una; el proceso termina con código 1 si algo empeoró más que
+--threshold.
+
+Uso (desde backend/):
+    python bench/loadtest.py [--users 60] [--rounds 10] [--seed 1]
+    python bench/loadtest.py --save bench/baselines/sqlite.json
+    python bench/loadtest.py --compare bench/baselines/sqlite.json --threshold 0.25
+    python bench/loadtest.py --url http://127.0.0.1:5000
+"""
+import argparse
+import http.client
+import json
+import logging
+import math
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+# Todo el curso sale de una misma IP: los límites de ratelimit.py frenarían la prueba.
+# Un servidor probado con --url también debe correr con RATE_LIMIT_ENABLED=0.
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exercises import REGISTRY  # noqa: E402
+
+PASSWORD = "bench-password"
+MODULES = sorted({module for module, _ in REGISTRY})
+SLOTS = sorted(REGISTRY)
+
+
+# ============================================================
+#   DATOS DE EJEMPLO
+# ============================================================
+def sembrar(users, history, rounds, seed):
+    """
+    Inserta `users` alumnos con `history` resultados cada uno (últimos 90 días).
+    Devuelve [(id, correo)]. Todos comparten la misma contraseña, hasheada una vez.
+    """
+    from db import pool
+    from hashing import hasher
+    from ingest import insertar_resultados, nueva_fila
+    from catalog import catalog
+
+    rng = random.Random(seed)
+    tag = f"b{int(time.time())}"
+    stored_hash = hasher._hash_sync(PASSWORD, rounds)
+
+    rows = [(f"alumno{i}_{tag}", f"alumno{i}@{tag}.bench", stored_hash, "basico") for i in range(users)]
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO usuario (nombre_usuario, correo, contraseña, nivel) VALUES (%s, %s, %s, %s)",
+                rows
+            )
+            cursor.execute("SELECT id, correo FROM usuario WHERE correo LIKE %s ORDER BY id", (f"%@{tag}.bench",))
+            alumnos = [(row["id"], row["correo"]) for row in cursor.fetchall()]
+        conn.commit()
+
+    niveles = {module: catalog.id_nivel(module) for module in MODULES}
+    ejercicios = {module: catalog.id_ejercicio(module) for module in MODULES}
+    now = datetime.now()
+    batch = []
+    for id_usuario, _ in alumnos:
+        for _ in range(history):
+            module = rng.choice(MODULES)
+            fecha = now - timedelta(seconds=rng.randint(0, 90 * 86400))
+            puntaje = rng.choice((0, 20, 40, 60, 80, 100))
+            batch.append(nueva_fila(id_usuario, niveles[module], ejercicios[module], puntaje, 5, fecha))
+            if len(batch) >= 1000:
+                insertar_resultados(batch)
+                batch = []
+    insertar_resultados(batch)
+    return alumnos
+
+
+# ============================================================
+#   CLIENTE HTTP Y REGISTRO DE LATENCIAS
+# ============================================================
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def add(self, endpoint, seconds, status):
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][status] += 1
+
+
+class Client:
+    """Una conexión HTTP por alumno (keep-alive si el servidor lo permite)."""
+
+    def __init__(self, base_url, recorder):
+        parts = urlsplit(base_url)
+        self._host, self._port = parts.hostname, parts.port or 80
+        self._conn = http.client.HTTPConnection(self._host, self._port, timeout=60)
+        self._recorder = recorder
+        self.access_token = None
+
+    def request(self, endpoint, method, path, body=None):
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        if self.access_token:
+            headers["Authorization"] = f"Bearer {self.access_token}"
+        start = time.perf_counter()
+        try:
+            self._conn.request(method, path, body=payload, headers=headers)
+            response = self._conn.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self._conn.close()
+            self._conn = http.client.HTTPConnection(self._host, self._port, timeout=60)
+            data, status = b"", 0
+        self._recorder.add(endpoint, time.perf_counter() - start, status)
+        try:
+            return status, json.loads(data) if data else None
+        except ValueError:
+            return status, None
+
+    def close(self):
+        self._conn.close()
+
+
+# ============================================================
+#   TRÁFICO DE UN ALUMNO
+# ============================================================
+def alumno(client, rng, id_usuario, correo, args, start_at):
+    # Todo el curso entra dentro de los primeros `ramp` segundos
+    time.sleep(max(0.0, start_at - time.monotonic()))
+
+    if rng.random() < args.new_users:
+        nombre = f"nuevo{rng.randrange(10**9)}"
+        status, body = client.request("/api/register", "POST", "/api/register", {
+            "nombre_usuario": nombre, "correo": f"{nombre}@nuevo.bench", "contraseña": PASSWORD,
+        })
+        if status == 201:
+            correo = f"{nombre}@nuevo.bench"
+
+    # Con el curso entero entrando a la vez bcrypt puede responder 503: se reintenta como un navegador
+    for _ in range(5):
+        status, body = client.request("/api/login", "POST", "/api/login", {"username": correo, "password": PASSWORD})
+        if status != 503:
+            break
+        time.sleep(rng.uniform(1.0, 3.0))
+    if status == 200 and body:
+        id_usuario = body["user"]["id"]
+        client.access_token = body["session"]["access_token"]
+
+    for n in range(args.rounds):
+        module, nivel = rng.choice(SLOTS)
+        status, exercise = client.request(
+            "/api/exercise", "GET", f"/api/exercise?module={module}&nivel={nivel}")
+        time.sleep(rng.expovariate(1 / args.think) if args.think > 0 else 0)
+
+        if status == 200 and exercise and exercise.get("token") and rng.random() < 0.8:
+            answers = [str(rng.randint(0, 50)) for _ in exercise.get("questions", [])]
+            client.request("/api/exercise-grade", "POST", "/api/exercise-grade", {
+                "token": exercise["token"], "answers": answers,
+            })
+        else:
+            client.request("/api/exercise-result", "POST", "/api/exercise-result", {
+                "module": module,
+                "puntaje": rng.choice((0, 20, 40, 60, 80, 100)), "total_preguntas": 5,
+            })
+
+        if n % 3 == 2:
+            client.request("/api/user-results/<id>", "GET", f"/api/user-results/{id_usuario}?limit=50")
+            client.request("/api/user-summary/<id>", "GET", f"/api/user-summary/{id_usuario}")
+
+
+# ============================================================
+#   REPORTE Y LÍNEA BASE
+# ============================================================
+def percentil(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    # Rango más cercano: el menor valor que cubre el p% de las muestras
+    k = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[k]
+
+
+def resumir(recorder, elapsed):
+    endpoints = {}
+    total = errors = 0
+    for endpoint, values in sorted(recorder.latencies.items()):
+        values = sorted(values)
+        statuses = dict(recorder.statuses[endpoint])
+        failed = sum(c for s, c in statuses.items() if s == 0 or s >= 500)
+        endpoints[endpoint] = {
+            "count": len(values),
+            "errors": failed,
+            "rps": len(values) / elapsed,
+            "p50_ms": percentil(values, 50) * 1000,
+            "p95_ms": percentil(values, 95) * 1000,
+            "p99_ms": percentil(values, 99) * 1000,
+            "statuses": {str(s): c for s, c in sorted(statuses.items())},
+        }
+        total += len(values)
+        errors += failed
+    return {"elapsed_s": elapsed, "requests": total, "errors": errors, "rps": total / elapsed, "endpoints": endpoints}
+
+
+def imprimir(summary):
+    print(f"\n{'endpoint':<28}{'n':>7}{'err':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  estados")
+    for endpoint, e in summary["endpoints"].items():
+        statuses = " ".join(f"{s}:{c}" for s, c in e["statuses"].items())
+        print(f"{endpoint:<28}{e['count']:>7}{e['errors']:>6}{e['rps']:>9.1f}"
+              f"{e['p50_ms']:>9.1f}{e['p95_ms']:>9.1f}{e['p99_ms']:>9.1f}  {statuses}")
+    print(f"\nTotal: {summary['requests']} peticiones en {summary['elapsed_s']:.1f}s "
+          f"= {summary['rps']:.1f} req/s, {summary['errors']} errores")
+
+
+def comparar(summary, baseline, threshold):
+    """Lista de regresiones: p95 más alto, menos req/s o más errores que la línea base."""
+    problems = []
+    for endpoint, base in baseline["endpoints"].items():
+        cur = summary["endpoints"].get(endpoint)
+        if cur is None:
+            problems.append(f"{endpoint}: no se ejecutó")
+            continue
+        if base["p95_ms"] > 0 and cur["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            problems.append(f"{endpoint}: p95 {base['p95_ms']:.1f} -> {cur['p95_ms']:.1f} ms")
+        if cur["rps"] < base["rps"] * (1 - threshold):
+            problems.append(f"{endpoint}: {base['rps']:.1f} -> {cur['rps']:.1f} req/s")
+        base_rate = base["errors"] / base["count"] if base["count"] else 0
+        cur_rate = cur["errors"] / cur["count"] if cur["count"] else 0
+        if cur_rate > base_rate + 0.01:
+            problems.append(f"{endpoint}: errores {base_rate:.1%} -> {cur_rate:.1%}")
+    return problems
+
+
+# ============================================================
+#   SERVIDOR EN PROCESO
+# ============================================================
+def servidor_local(rounds, backend):
+    """App en un servidor WSGI con hilos. Devuelve (url, detener)."""
+    import tempfile
+
+    from werkzeug.serving import make_server
+
+    import db
+    import metrics
+
+    path = None
+    if backend == "sqlite":
+        # Base temporal nueva en cada corrida, para que los resultados sean comparables
+        fd, path = tempfile.mkstemp(prefix="infinite_afo_bench_", suffix=".sqlite3")
+        os.close(fd)
+        os.remove(path)
+        db.DB_PATH = path
+    db.DB_BACKEND = backend
+
+    from app import create_app
+    from hashing import hasher
+
+    metrics.ACCESS_LOG_JSON = False
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    hasher.rounds = rounds
+
+    server = make_server("127.0.0.1", 0, create_app(), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def detener():
+        server.shutdown()
+        from app import cerrar_recursos
+        cerrar_recursos()
+        if path:
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.remove(path + suffix)
+                except FileNotFoundError:
+                    pass
+
+    return f"http://127.0.0.1:{server.server_port}", detener
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API")
+    parser.add_argument("--url", help="servidor ya levantado (por defecto: app en este proceso)")
+    parser.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite",
+                        help="BD de la app en proceso (sqlite: archivo temporal)")
+    parser.add_argument("--users", type=int, default=60, help="alumnos simultáneos (dos cursos de 30)")
+    parser.add_argument("--history", type=int, default=200, help="resultados previos por alumno")
+    parser.add_argument("--rounds", type=int, default=10, help="ejercicios por alumno")
+    parser.add_argument("--think", type=float, default=0.05, help="segundos promedio entre peticiones")
+    parser.add_argument("--ramp", type=float, default=2.0, help="segundos en que entra todo el curso")
+    parser.add_argument("--new-users", type=float, default=0.1, help="fracción que se registra primero")
+    parser.add_argument("--bcrypt-rounds", type=int, default=None,
+                        help="costo de bcrypt (solo en proceso; por defecto BCRYPT_ROUNDS)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="guardar el resultado como línea base JSON")
+    parser.add_argument("--compare", help="línea base JSON contra la cual comparar")
+    parser.add_argument("--threshold", type=float, default=0.25, help="empeoramiento tolerado (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    from hashing import BCRYPT_ROUNDS
+    rounds = args.bcrypt_rounds or BCRYPT_ROUNDS
+
+    detener = None
+    if args.url:
+        base_url = args.url
+    else:
+        base_url, detener = servidor_local(rounds, args.backend)
+
+    try:
+        print(f"Sembrando {args.users} alumnos x {args.history} resultados...")
+        alumnos = sembrar(args.users, args.history, rounds, args.seed)
+
+        recorder = Recorder()
+        threads = []
+        start = time.monotonic()
+        for i, (id_usuario, correo) in enumerate(alumnos):
+            rng = random.Random(args.seed * 100003 + i)
+            client = Client(base_url, recorder)
+            start_at = start + rng.uniform(0, args.ramp)
+            t = threading.Thread(target=alumno, args=(client, rng, id_usuario, correo, args, start_at))
+            t.start()
+            threads.append((t, client))
+        for t, client in threads:
+            t.join()
+            client.close()
+        elapsed = time.monotonic() - start
+    finally:
+        if detener:
+            detener()
+
+    summary = resumir(recorder, elapsed)
+    summary["meta"] = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "target": args.url or args.backend,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "args": {k: v for k, v in vars(args).items() if k not in ("save", "compare")},
+    }
+    imprimir(summary)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        print(f"Línea base guardada en {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        problems = comparar(summary, baseline, args.threshold)
+        if problems:
+            print(f"\nRegresiones respecto de {args.compare} (umbral {args.threshold:.0%}):")
+            for p in problems:
+                print("  -", p)
+            raise SystemExit(1)
+        print(f"\nSin regresiones respecto de {args.compare} (umbral {args.threshold:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import threading
+import time
+
+from db import pool
+
+# Segundos que se confía en el catálogo antes de volver a leerlo
+CATALOG_TTL = 300
+
+# Alias que manda el frontend -> nombre del nivel en la tabla 'niveles'
+MODULOS = {
+    "quadratic": "Funciones Cuadráticas",
+    "trigonometric": "Funciones Trigonométricas",
+}
+
+
+class CatalogCache:
+    """
+    Copia en memoria de las tablas 'niveles' y 'ejercicios'.
+
+    Estas tablas casi nunca cambian, así que se leen completas una vez
+    y se consultan desde diccionarios. Pasado `ttl` segundos se recargan
+    en la siguiente consulta; `invalidate()` fuerza la recarga.
+    """
+
+    def __init__(self, ttl=CATALOG_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._loaded_at = None      # None = nunca cargado o invalidado
+
+        self._niveles = {}          # nombre -> {"id_nivel", "nombre", "orden"}
+        self._ejercicios = {}       # codigo -> {"id_ejercicio", "codigo", "titulo", "modulo"}
+        self._niveles_id = {}       # id_nivel -> misma fila
+        self._ejercicios_id = {}    # id_ejercicio -> misma fila
+        self._preguntas = {}        # clave de pregunta generada -> id_pregunta
+
+        self._stats = {"hits": 0, "misses": 0, "reloads": 0, "reload_errors": 0}
+
+    # ---------- carga ----------
+    def load(self):
+        """Lee ambas tablas con una sola conexión y reemplaza el contenido."""
+        with pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT id_nivel, nombre, orden FROM niveles")
+                niveles = {row["nombre"]: row for row in cursor.fetchall()}
+
+                cursor.execute("SELECT id_ejercicio, codigo, titulo, modulo FROM ejercicios")
+                ejercicios = {row["codigo"]: row for row in cursor.fetchall()}
+
+                # Preguntas de los ejercicios generados (clave 'module/nivel/n')
+                cursor.execute("SELECT id_pregunta, clave FROM preguntas_ejercicio WHERE clave IS NOT NULL")
+                preguntas = {row["clave"]: row["id_pregunta"] for row in cursor.fetchall()}
+
+        with self._lock:
+            self._niveles = niveles
+            self._ejercicios = ejercicios
+            self._niveles_id = {row["id_nivel"]: row for row in niveles.values()}
+            self._ejercicios_id = {row["id_ejercicio"]: row for row in ejercicios.values()}
+            self._preguntas = preguntas
+            self._loaded_at = time.monotonic()
+            self._stats["reloads"] += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def _is_fresh(self):
+        loaded_at = self._loaded_at
+        return loaded_at is not None and time.monotonic() - loaded_at < self.ttl
+
+    def _ensure_fresh(self):
+        if self._is_fresh():
+            return
+        # Un solo hilo recarga; los demás esperan y luego usan lo recién leído
+        with self._reload_lock:
+            if self._is_fresh():
+                return
+            try:
+                self.load()
+            except Exception as e:
+                with self._lock:
+                    self._stats["reload_errors"] += 1
+                    has_data = bool(self._niveles)
+                    # Se sigue usando la copia anterior hasta que la BD responda
+                    if has_data:
+                        self._loaded_at = time.monotonic()
+                if not has_data:
+                    raise
+                print("No se pudo recargar el catálogo, se usa la copia anterior:", e)
+
+    def _lookup(self, table, key):
+        self._ensure_fresh()
+        row = table().get(key)
+        with self._lock:
+            self._stats["hits" if row is not None else "misses"] += 1
+        return row
+
+    # ---------- consultas ----------
+    def nivel(self, modulo):
+        """Fila de 'niveles' para un módulo ('quadratic' o el nombre del nivel)."""
+        nombre = MODULOS.get(modulo, modulo)
+        return self._lookup(lambda: self._niveles, nombre)
+
+    def ejercicio(self, codigo):
+        """Fila de 'ejercicios' por su código."""
+        return self._lookup(lambda: self._ejercicios, codigo)
+
+    def nivel_por_id(self, id_nivel):
+        return self._lookup(lambda: self._niveles_id, id_nivel)
+
+    def ejercicio_por_id(self, id_ejercicio):
+        if id_ejercicio is None:
+            return None
+        return self._lookup(lambda: self._ejercicios_id, id_ejercicio)
+
+    def id_pregunta(self, clave):
+        return self._lookup(lambda: self._preguntas, clave)
+
+    def id_nivel(self, modulo):
+        row = self.nivel(modulo)
+        return row["id_nivel"] if row else None
+
+    def id_ejercicio(self, codigo):
+        row = self.ejercicio(codigo)
+        return row["id_ejercicio"] if row else None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["niveles"] = len(self._niveles)
+            stats["ejercicios"] = len(self._ejercicios)
+            stats["preguntas"] = len(self._preguntas)
+            stats["age"] = (time.monotonic() - self._loaded_at) if self._loaded_at is not None else None
+            stats["ttl"] = self.ttl
+        return stats
+
+
+# Catálogo compartido por toda la aplicación
+catalog = CatalogCache()
@@ -0,0 +1,89 @@
+import zlib
+
+from config import env_int
+
+try:
+    import brotli
+except ImportError:     # opcional: sin el paquete solo se ofrece gzip
+    brotli = None
+
+# ============================================================
+#   COMPRESIÓN DE RESPUESTAS (BROTLI / GZIP)
+# ============================================================
+# Se comprimen las respuestas JSON/texto de más de COMPRESS_MIN_SIZE
+# bytes según el Accept-Encoding del navegador (brotli si está instalado,
+# si no gzip). Las respuestas transmitidas por partes (?all=1 del
+# historial) se comprimen trozo a trozo, sin juntarlas en memoria.
+
+COMPRESS_MIN_SIZE = env_int("COMPRESS_MIN_SIZE", 1024)   # bytes; lo chico no vale la pena
+GZIP_LEVEL = env_int("GZIP_LEVEL", 6)
+BROTLI_QUALITY = env_int("BROTLI_QUALITY", 5)            # 11 es el máximo pero muy lento para respuestas en vivo
+
+_COMPRESSIBLE = ("application/json", "application/x-ndjson", "text/", "image/svg+xml")
+
+
+def _elegir(accept_encodings):
+    if brotli is not None and accept_encodings["br"]:
+        return "br"
+    if accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+
+def _compresor(encoding):
+    """Par de funciones (comprimir trozo, terminar) para la codificación pedida."""
+    if encoding == "br":
+        c = brotli.Compressor(quality=BROTLI_QUALITY)
+        return c.process, c.finish
+    c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)   # 16+: formato gzip
+    return c.compress, c.flush
+
+
+def _stream(chunks, encoding):
+    compress, finish = _compresor(encoding)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            data = compress(chunk)
+            if data:
+                yield data
+        yield finish()
+    finally:
+        # Si el cliente corta, el generador original también se cierra (libera su conexión)
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def comprimir(request, response):
+    """after_request: comprime `response` si conviene y el cliente lo acepta."""
+    if (response.direct_passthrough
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or "Content-Encoding" in response.headers
+            or not response.mimetype.startswith(_COMPRESSIBLE)):
+        return response
+
+    encoding = _elegir(request.accept_encodings)
+    response.vary.add("Accept-Encoding")
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        length = response.content_length
+        if length is not None and length < COMPRESS_MIN_SIZE:
+            return response
+        response.response = _stream(response.response, encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        body = response.get_data()
+        if len(body) < COMPRESS_MIN_SIZE:
+            return response
+        compress, finish = _compresor(encoding)
+        response.set_data(compress(body) + finish())
+
+    response.headers["Content-Encoding"] = encoding
+    # El ETag fuerte describe los bytes sin comprimir: se debilita al comprimir
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,68 @@
+import os
+
+# ============================================================
+#   CONFIGURACIÓN DESDE EL ENTORNO / backend/.env
+# ============================================================
+# Cada ajuste se lee primero de las variables de entorno y, si no está,
+# del archivo backend/.env (líneas CLAVE=valor, '#' para comentarios).
+# Si no aparece en ninguno se usa el valor por defecto del módulo que lo pide.
+
+ENV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+
+
+def cargar_env(path=ENV_FILE):
+    """Copia las claves del archivo .env a os.environ sin pisar las que ya existen."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return
+
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        key = key.strip()
+        if key.startswith("export "):
+            key = key[len("export "):].strip()
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+            value = value[1:-1]
+        os.environ.setdefault(key, value)
+
+
+def env_str(name, default=""):
+    return os.environ.get(name, default)
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        print(f"Valor inválido para {name}: {value!r}, se usa {default}")
+        return default
+
+
+def env_float(name, default):
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        print(f"Valor inválido para {name}: {value!r}, se usa {default}")
+        return default
+
+
+def env_bool(name, default=False):
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "si", "sí", "on")
+
+
+cargar_env()
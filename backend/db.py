@@ -1,15 +1,305 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
 import pymysql
+from pymysql.constants import SERVER_STATUS
+
+import sqlite_backend
+from config import env_int, env_str
+from metrics import observe_query
+
+# Se pueden cambiar con variables de entorno o en backend/.env (ver config.py)
+DB_BACKEND = env_str("DB_BACKEND", "mysql").lower()   # "mysql" o "sqlite" (ver sqlite_backend.py)
+DB_PATH = env_str("DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "infinite_afo.sqlite3"))
+
+DB_HOST = env_str("DB_HOST", "localhost")
+DB_PORT = env_int("DB_PORT", 3306)
+DB_USER = env_str("DB_USER", "root")
+DB_PASSWORD = env_str("DB_PASSWORD", "")
+DB_NAME = env_str("DB_NAME", "infinite_afo")
+
+# Pool de conexiones (por proceso: con N workers hay hasta N * DB_POOL_MAX conexiones)
+DB_POOL_MIN = env_int("DB_POOL_MIN", 2)              # conexiones que se mantienen abiertas siempre
+DB_POOL_MAX = env_int("DB_POOL_MAX", 10)             # máximo de conexiones simultáneas hacia MySQL
+DB_POOL_TIMEOUT = env_int("DB_POOL_TIMEOUT", 5)      # segundos que se espera por una conexión libre
+DB_POOL_RECYCLE = env_int("DB_POOL_RECYCLE", 1800)   # segundos de vida máxima de una conexión
+DB_POOL_PING_IDLE = env_int("DB_POOL_PING_IDLE", 30) # si lleva más de esto sin usarse, se hace ping al sacarla
+
+
+class _TimedExecute:
+    """Mide cada sentencia (ver metrics.observe_query)."""
+
+    def execute(self, query, args=None):
+        # executemany también pasa por aquí (una vez por INSERT multi-fila)
+        start = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            observe_query(query, time.perf_counter() - start)
+
+
+class TimedDictCursor(_TimedExecute, pymysql.cursors.DictCursor):
+    """DictCursor que mide cada sentencia."""
+
+
+class TimedSSDictCursor(_TimedExecute, pymysql.cursors.SSDictCursor):
+    """
+    Cursor sin buffer: las filas se leen del socket a medida que se piden
+    (exportaciones grandes con memoria constante). Mientras no se lean
+    todas, la conexión no sirve para otra consulta.
+    """
 
-DB_HOST = "localhost"
-DB_USER = "root"
-DB_PASSWORD = ""
-DB_NAME = "infinite_afo"
 
 def get_connection():
+    if DB_BACKEND == "sqlite":
+        return sqlite_backend.connect(DB_PATH)
     return pymysql.connect(
         host=DB_HOST,
+        port=DB_PORT,
         user=DB_USER,
         password=DB_PASSWORD,
         database=DB_NAME,
-        cursorclass=pymysql.cursors.DictCursor
+        cursorclass=TimedDictCursor
     )
+
+
+def _in_transaction(conn):
+    """True si el servidor reporta una transacción abierta en esta conexión."""
+    status = getattr(conn, "server_status", None)
+    if status is None:
+        return True
+    return bool(status & SERVER_STATUS.SERVER_STATUS_IN_TRANS)
+
+
+class PoolTimeout(Exception):
+    """No hubo una conexión libre dentro de DB_POOL_TIMEOUT segundos."""
+
+
+class _PooledConnection:
+    __slots__ = ("conn", "created", "last_used")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created = time.monotonic()
+        self.last_used = self.created
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones thread-safe.
+
+    - Mantiene entre `min_size` y `max_size` conexiones abiertas.
+    - Al sacar una conexión inactiva se le hace ping (health check).
+    - Las conexiones con más de `recycle` segundos se cierran y se reemplazan.
+    - Uso: `with pool.connection() as conn: ...`
+    """
+
+    def __init__(self, factory=get_connection, min_size=DB_POOL_MIN, max_size=DB_POOL_MAX,
+                 timeout=DB_POOL_TIMEOUT, recycle=DB_POOL_RECYCLE, ping_idle=DB_POOL_PING_IDLE):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Tamaños de pool inválidos")
+
+        self._factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_idle = ping_idle
+
+        self._idle = []            # pila LIFO: la conexión más reciente se reutiliza primero
+        self._size = 0             # conexiones abiertas (libres + prestadas)
+        self._cond = threading.Condition(threading.Lock())
+        self._closed = False
+
+        self._stats = {
+            "checkouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "failed_pings": 0,
+            "timeouts": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+        }
+
+    # ---------- creación / cierre de conexiones ----------
+    def _new_connection(self):
+        conn = _PooledConnection(self._factory())
+        with self._cond:
+            self._stats["created"] += 1
+        return conn
+
+    def _discard(self, pooled):
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def warmup(self):
+        """Abre conexiones hasta llegar a `min_size`."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                pooled = self._new_connection()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.append(pooled)
+                self._cond.notify()
+
+    # ---------- préstamo / devolución ----------
+    def acquire(self):
+        start = time.monotonic()
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeout("El pool de conexiones está cerrado")
+                if self._idle:
+                    pooled = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    pooled = None
+                    break
+
+                waited = True
+                remaining = self.timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout("No hay conexiones libres en el pool")
+                self._cond.wait(remaining)
+
+        if pooled is None:
+            try:
+                pooled = self._new_connection()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+        else:
+            pooled = self._check(pooled)
+
+        wait = time.monotonic() - start
+        with self._cond:
+            self._stats["checkouts"] += 1
+            if waited:
+                self._stats["waits"] += 1
+            self._stats["wait_time_total"] += wait
+            if wait > self._stats["wait_time_max"]:
+                self._stats["wait_time_max"] = wait
+
+        return pooled
+
+    def _check(self, pooled):
+        """Recicla conexiones viejas y hace ping a las que llevan rato sin usarse."""
+        now = time.monotonic()
+
+        if self.recycle and now - pooled.created > self.recycle:
+            with self._cond:
+                self._stats["recycled"] += 1
+            return self._replace(pooled)
+
+        if now - pooled.last_used > self.ping_idle:
+            try:
+                pooled.conn.ping(reconnect=False)
+            except Exception:
+                with self._cond:
+                    self._stats["failed_pings"] += 1
+                return self._replace(pooled)
+
+        return pooled
+
+    def _replace(self, pooled):
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+        try:
+            return self._new_connection()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, pooled, broken=False):
+        if broken or self._closed:
+            self._discard(pooled)
+            return
+
+        pooled.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Presta una conexión del pool y la devuelve al salir.
+        Al devolverla se hace rollback de lo que no se haya confirmado, para
+        que la siguiente petición no herede una transacción abierta (ni un
+        snapshot viejo de REPEATABLE READ). Si el rollback falla la conexión
+        se descarta en vez de volver al pool.
+        """
+        pooled = self.acquire()
+        try:
+            yield pooled.conn
+        finally:
+            broken = False
+            try:
+                # Tras un commit no queda nada abierto: se evita el viaje extra a MySQL
+                if _in_transaction(pooled.conn):
+                    pooled.conn.rollback()
+            except Exception:
+                broken = True
+            self.release(pooled, broken=broken)
+
+    # ---------- administración ----------
+    def close(self):
+        """Cierra todas las conexiones libres; las prestadas se cierran al devolverse."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for pooled in idle:
+            self._discard(pooled)
+
+    def after_fork(self):
+        """
+        Llamar en el proceso hijo después de un fork (workers de gunicorn).
+        Las conexiones heredadas comparten el socket con el padre: se olvidan
+        sin cerrarlas y el hijo abre las suyas.
+        """
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = []
+        self._size = 0
+        self._closed = False
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["size"] = self._size
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._size - len(self._idle)
+            stats["min_size"] = self.min_size
+            stats["max_size"] = self.max_size
+        checkouts = stats["checkouts"]
+        stats["wait_time_avg"] = stats["wait_time_total"] / checkouts if checkouts else 0.0
+        return stats
+
+
+# Pool compartido por toda la aplicación
+pool = ConnectionPool()
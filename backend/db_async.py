@@ -0,0 +1,120 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from db import (DB_BACKEND, DB_HOST, DB_NAME, DB_PASSWORD, DB_POOL_MAX, DB_POOL_MIN, DB_POOL_RECYCLE,
+                DB_POOL_TIMEOUT, DB_PORT, DB_USER, PoolTimeout)
+from metrics import observe_query
+
+try:
+    import aiomysql
+except ImportError:     # solo lo necesita el modo asyncio (asgi.py)
+    aiomysql = None
+
+# ============================================================
+#   POOL DE CONEXIONES ASÍNCRONO (AIOMYSQL) PARA EL MODO ASYNCIO
+# ============================================================
+# Mismo uso que db.pool pero con await:
+#     async with apool.connection() as conn:
+#         async with conn.cursor() as cursor:
+#             await cursor.execute(...)
+# Mientras MySQL responde, el event loop atiende otras peticiones en vez
+# de dejar un hilo bloqueado. Los tamaños, el timeout y el reciclaje son
+# los mismos ajustes DB_POOL_* del pool sincrónico (ver db.py).
+
+if aiomysql is not None:
+    class TimedAsyncDictCursor(aiomysql.DictCursor):
+        """DictCursor de aiomysql que mide cada sentencia (ver metrics.observe_query)."""
+
+        async def execute(self, query, args=None):
+            start = time.perf_counter()
+            try:
+                return await super().execute(query, args)
+            finally:
+                observe_query(query, time.perf_counter() - start)
+
+
+class AsyncConnectionPool:
+    def __init__(self, min_size=DB_POOL_MIN, max_size=DB_POOL_MAX, timeout=DB_POOL_TIMEOUT,
+                 recycle=DB_POOL_RECYCLE):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self._pool = None
+        self._stats = {"checkouts": 0, "timeouts": 0, "discarded": 0, "waiting": 0}
+
+    async def open(self):
+        """Crea el pool (dentro del event loop que lo va a usar) con `min_size` conexiones."""
+        if DB_BACKEND == "sqlite":
+            raise RuntimeError("El modo asyncio necesita MySQL (DB_BACKEND=mysql)")
+        if aiomysql is None:
+            raise RuntimeError("Falta aiomysql: pip install aiomysql")
+        self._pool = await aiomysql.create_pool(
+            host=DB_HOST,
+            port=DB_PORT,
+            user=DB_USER,
+            password=DB_PASSWORD,
+            db=DB_NAME,
+            minsize=self.min_size,
+            maxsize=self.max_size,
+            pool_recycle=self.recycle,
+            autocommit=False,
+            cursorclass=TimedAsyncDictCursor,
+        )
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+
+    @asynccontextmanager
+    async def connection(self):
+        """
+        Presta una conexión y la devuelve al salir, con rollback de lo que no
+        se haya confirmado (igual que db.pool.connection). Si la petición se
+        cancela a mitad de una consulta (el cliente cortó) o el rollback
+        falla, la conexión se cierra en vez de volver al pool.
+        """
+        if self._pool is None:
+            raise PoolTimeout("El pool asíncrono no está abierto")
+        self._stats["waiting"] += 1
+        try:
+            conn = await asyncio.wait_for(self._pool.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            raise PoolTimeout("No hay conexiones libres en el pool")
+        finally:
+            self._stats["waiting"] -= 1
+        self._stats["checkouts"] += 1
+
+        try:
+            yield conn
+        except asyncio.CancelledError:
+            # La respuesta de la consulta en curso quedaría en el socket
+            conn.close()
+            self._stats["discarded"] += 1
+            raise
+        finally:
+            if not conn.closed and conn.get_transaction_status():
+                try:
+                    await conn.rollback()
+                except Exception:
+                    conn.close()
+                    self._stats["discarded"] += 1
+            await self._pool.release(conn)
+
+    def stats(self):
+        stats = dict(self._stats)
+        if self._pool is not None:
+            stats["size"] = self._pool.size
+            stats["idle"] = self._pool.freesize
+            stats["in_use"] = self._pool.size - self._pool.freesize
+        stats["min_size"] = self.min_size
+        stats["max_size"] = self.max_size
+        return stats
+
+
+# Pool asíncrono compartido (se abre en asgi.py al arrancar el servidor)
+apool = AsyncConnectionPool()
@@ -0,0 +1,544 @@
+import math
+import random
+
+import numpy as np
+
+# ============================================================
+#   REGISTRO DE GENERADORES DE EJERCICIOS
+# ============================================================
+# Cada generador se registra con (module, nivel) y /api/exercise lo busca
+# en un diccionario. Para agregar un módulo o nivel nuevo basta con
+# escribir otra clase con @register; la ruta no cambia.
+
+REGISTRY = {}
+
+
+def register(cls):
+    """Decorador: instancia el generador y lo deja disponible por (module, nivel)."""
+    key = (cls.module, cls.nivel)
+    if key in REGISTRY:
+        raise ValueError(f"Generador duplicado para {key}")
+    REGISTRY[key] = cls()
+    return cls
+
+
+def get_generator(module, nivel):
+    return REGISTRY.get((module, nivel))
+
+
+# ------------------------------------------------------------
+#   Apoyo para generar ejercicios en lote con NumPy
+# ------------------------------------------------------------
+def _round(x, ndigits):
+    """
+    round() de Python aplicado a un arreglo, con el mismo resultado bit a bit.
+    np.round (x·10^n -> rint -> /10^n) solo puede diferir de round() cuando
+    x·10^n queda prácticamente en un .5; esos pocos casos se redondean con round().
+    """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.round(x, ndigits)
+    scaled = x * (10.0 ** ndigits)
+    dudosos = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    for i in dudosos:
+        out[i] = round(float(x[i]), ndigits)
+    return out
+
+
+def _column(ps, name, dtype=np.float64):
+    return np.fromiter((p[name] for p in ps), dtype=dtype, count=len(ps))
+
+
+class ExerciseGenerator:
+    """
+    Base de los generadores.
+
+    - `draw(rng)` sortea los parámetros (y el contexto) del ejercicio.
+    - `build(p)` arma el ejercicio a partir de esos parámetros.
+    - `curve(p)` describe la función del ejercicio para graficarla (plots.py).
+    Separar ambos pasos permite reconstruir un ejercicio con los mismos
+    parámetros sin volver a sortear.
+    """
+
+    module = None           # 'quadratic' / 'trigonometric'
+    nivel = None            # 'basico' / 'intermedio' / 'avanzado'
+
+    title = ""
+    module_name = ""
+    difficulty = ""
+    contexts = ()
+    question_labels = ()    # nombre fijo de cada pregunta (para 'preguntas_ejercicio')
+
+    def draw(self, rng):
+        raise NotImplementedError
+
+    def build(self, p):
+        raise NotImplementedError
+
+    def curve(self, p):
+        """Solo los parámetros numéricos de la función (sin contexto): None si no hay gráfico."""
+        return None
+
+    def generate(self, rng=random):
+        return self.build(self.draw(rng))
+
+    def build_batch(self, ps):
+        """
+        Arma varios ejercicios a la vez. Los generadores que lo necesiten lo
+        reescriben con NumPy; el resultado debe ser idéntico a `build`.
+        """
+        return [self.build(p) for p in ps]
+
+    def generate_batch(self, count, rng=random):
+        # Se sortea en el mismo orden que `generate`, ejercicio por ejercicio
+        return self.build_batch([self.draw(rng) for _ in range(count)])
+
+    def _exercise(self, context, questions):
+        return {
+            "title": self.title,
+            "module": self.module_name,
+            "difficulty": self.difficulty,
+            "context": context,
+            "questions": questions,
+        }
+
+
+# ============================================================
+#                  FUNCIONES CUADRÁTICAS
+# ============================================================
+class QuadraticGenerator(ExerciseGenerator):
+    module = "quadratic"
+    module_name = "Funciones Cuadráticas"
+
+    def curve(self, p):
+        # h(t) = -a·t² + b·t + c
+        return {"kind": "quadratic", "a": -p["a"], "b": p["b"], "c": p.get("c", 0)}
+
+
+# -------------------- NIVEL BÁSICO --------------------
+@register
+class QuadraticBasico(QuadraticGenerator):
+    nivel = "basico"
+    title = "Lanzamiento Vertical – Básico"
+    difficulty = "Básico"
+    question_labels = (
+        "Altura máxima",
+        "Tiempo de la altura máxima",
+        "Tiempo de impacto",
+        "Altura en t = 1 s",
+        "Altura a la mitad del vuelo",
+    )
+    contexts = (
+        "Un estudiante lanza una pelota verticalmente en el patio del colegio. La función que describe la altura es:",
+        "En una clase de física, se realiza un experimento donde se lanza una pelota hacia arriba:",
+        "Un niño suelta una pelota con un impulso inicial y la trayectoria queda modelada por:",
+        "Un balón de básquet es lanzado verticalmente en un entrenamiento según la función:",
+        "Una cápsula ligera es lanzada en un laboratorio escolar:",
+    )
+
+    def draw(self, rng):
+        a = round(rng.uniform(3, 5), 2)
+        b = round(rng.uniform(10, 30), 2)
+        return {"a": a, "b": b, "context": rng.choice(self.contexts)}
+
+    def build(self, p):
+        a, b = p["a"], p["b"]
+
+        t_vertex = round(b / (2 * a), 3)
+        h_max = round(-(a * t_vertex ** 2) + b * t_vertex, 3)
+        t_impact = round(b / a, 3)
+        t_mid = round(t_impact / 2, 3)
+        h_t1 = round(-(a * 1 ** 2) + b * 1, 3)
+        h_mid = round(-(a * t_mid ** 2) + b * t_mid, 3)
+
+        return self._exercise(f"{p['context']}  h(t) = -{a}t² + {b}t", [
+            {"text": "¿Cuál es la altura máxima?", "answer": h_max, "unit": "m"},
+            {"text": "¿Tiempo en el que alcanza la altura máxima?", "answer": t_vertex, "unit": "s"},
+            {"text": "¿Cuándo vuelve al suelo?", "answer": t_impact, "unit": "s"},
+            {"text": "¿Altura a los 1 segundo?", "answer": h_t1, "unit": "m"},
+            {"text": "¿Altura a la mitad del tiempo total?", "answer": h_mid, "unit": "m"},
+        ])
+
+    def build_batch(self, ps):
+        a, b = _column(ps, "a"), _column(ps, "b")
+
+        t_vertex = _round(b / (2 * a), 3)
+        h_max = _round(-(a * t_vertex ** 2) + b * t_vertex, 3)
+        t_impact = _round(b / a, 3)
+        t_mid = _round(t_impact / 2, 3)
+        h_t1 = _round(-(a * 1 ** 2) + b * 1, 3)
+        h_mid = _round(-(a * t_mid ** 2) + b * t_mid, 3)
+
+        return [
+            self._exercise(f"{p['context']}  h(t) = -{p['a']}t² + {p['b']}t", [
+                {"text": "¿Cuál es la altura máxima?", "answer": hm, "unit": "m"},
+                {"text": "¿Tiempo en el que alcanza la altura máxima?", "answer": tv, "unit": "s"},
+                {"text": "¿Cuándo vuelve al suelo?", "answer": ti, "unit": "s"},
+                {"text": "¿Altura a los 1 segundo?", "answer": h1, "unit": "m"},
+                {"text": "¿Altura a la mitad del tiempo total?", "answer": hmid, "unit": "m"},
+            ])
+            for p, hm, tv, ti, h1, hmid in zip(
+                ps, h_max.tolist(), t_vertex.tolist(), t_impact.tolist(), h_t1.tolist(), h_mid.tolist()
+            )
+        ]
+
+
+# -------------------- NIVEL INTERMEDIO --------------------
+@register
+class QuadraticIntermedio(QuadraticGenerator):
+    nivel = "intermedio"
+    title = "Fuegos Artificiales – Intermedio"
+    difficulty = "Intermedio"
+    question_labels = (
+        "Altura máxima",
+        "Tiempo de la altura máxima",
+        "Tiempo de impacto",
+        "Altura a la mitad del vuelo",
+        "Altura en t = 1 s",
+    )
+    contexts = (
+        "Durante un festival nocturno, un fuego artificial asciende siguiendo la trayectoria:",
+        "Un cohete escolar en una feria científica es lanzado verticalmente. Su altura se describe por:",
+        "Una señal de emergencia es disparada desde un barco siguiendo la función:",
+        "Un dron inicia un ascenso rápido en trayectoria parabólica dada por:",
+        "Una esfera metálica lanzada en un laboratorio sigue la ecuación:",
+    )
+
+    def draw(self, rng):
+        a = round(rng.uniform(4, 6), 2)
+        b = round(rng.uniform(30, 60), 2)
+        return {"a": a, "b": b, "context": rng.choice(self.contexts)}
+
+    def build(self, p):
+        a, b = p["a"], p["b"]
+
+        t_vertex = round(b / (2 * a), 3)
+        h_max = round(-(a * t_vertex ** 2) + b * t_vertex, 3)
+        t_impact = round(b / a, 3)
+        t_mid = round(t_impact / 2, 3)
+
+        return self._exercise(f"{p['context']} h(t) = -{a}t² + {b}t", [
+            {"text": "¿Altura máxima?", "answer": h_max, "unit": "m"},
+            {"text": "¿Cuándo ocurre la altura máxima?", "answer": t_vertex, "unit": "s"},
+            {"text": "¿Cuándo toca el suelo?", "answer": t_impact, "unit": "s"},
+            {"text": "¿Altura a la mitad del vuelo?", "answer": round(-(a * t_mid ** 2) + b * t_mid, 3), "unit": "m"},
+            {"text": "¿Altura a los 1 segundo?", "answer": round(-(a * 1 ** 2) + b * 1, 3), "unit": "m"},
+        ])
+
+    def build_batch(self, ps):
+        a, b = _column(ps, "a"), _column(ps, "b")
+
+        t_vertex = _round(b / (2 * a), 3)
+        h_max = _round(-(a * t_vertex ** 2) + b * t_vertex, 3)
+        t_impact = _round(b / a, 3)
+        t_mid = _round(t_impact / 2, 3)
+        h_mid = _round(-(a * t_mid ** 2) + b * t_mid, 3)
+        h_t1 = _round(-(a * 1 ** 2) + b * 1, 3)
+
+        return [
+            self._exercise(f"{p['context']} h(t) = -{p['a']}t² + {p['b']}t", [
+                {"text": "¿Altura máxima?", "answer": hm, "unit": "m"},
+                {"text": "¿Cuándo ocurre la altura máxima?", "answer": tv, "unit": "s"},
+                {"text": "¿Cuándo toca el suelo?", "answer": ti, "unit": "s"},
+                {"text": "¿Altura a la mitad del vuelo?", "answer": hmid, "unit": "m"},
+                {"text": "¿Altura a los 1 segundo?", "answer": h1, "unit": "m"},
+            ])
+            for p, hm, tv, ti, hmid, h1 in zip(
+                ps, h_max.tolist(), t_vertex.tolist(), t_impact.tolist(), h_mid.tolist(), h_t1.tolist()
+            )
+        ]
+
+
+# -------------------- NIVEL AVANZADO --------------------
+@register
+class QuadraticAvanzado(QuadraticGenerator):
+    nivel = "avanzado"
+    title = "Parábola Aplicada – Avanzado"
+    difficulty = "Avanzado"
+    question_labels = (
+        "Altura máxima",
+        "Discriminante",
+        "Raíz positiva",
+        "Raíz negativa",
+        "Altura inicial",
+    )
+    contexts = (
+        "Un ingeniero evalúa el arco parabólico de un túnel descrito por:",
+        "El lanzamiento de una catapulta moderna sigue la trayectoria:",
+        "Una antena parabólica de comunicaciones tiene la forma:",
+        "La estructura de un puente incorpora una parábola modelada por:",
+        "Un simulador balístico militar usa la función:",
+    )
+
+    def draw(self, rng):
+        a = round(rng.uniform(2, 5), 2)
+        b = round(rng.uniform(20, 60), 2)
+        c = round(rng.uniform(5, 20), 2)
+        return {"a": a, "b": b, "c": c, "context": rng.choice(self.contexts)}
+
+    def build(self, p):
+        a, b, c = p["a"], p["b"], p["c"]
+
+        A = -a
+        B = b
+        C = c
+
+        D = round(B ** 2 - 4 * A * C, 3)
+        sqrtD = math.sqrt(abs(D))
+
+        t1 = round((-B + sqrtD) / (2 * A), 3)
+        t2 = round((-B - sqrtD) / (2 * A), 3)
+        t_positive = max(t1, t2)
+
+        t_vertex = round(-B / (2 * A), 3)
+        h_max = round(A * t_vertex ** 2 + B * t_vertex + C, 3)
+
+        return self._exercise(f"{p['context']} h(t) = -{a}t² + {b}t + {c}", [
+            {"text": "¿Altura máxima?", "answer": h_max, "unit": "m"},
+            {"text": "¿Discriminante?", "answer": D, "unit": ""},
+            {"text": "¿Raíz positiva?", "answer": t_positive, "unit": "s"},
+            {"text": "¿Raíz negativa?", "answer": min(t1, t2), "unit": "s"},
+            {"text": "¿Altura inicial?", "answer": c, "unit": "m"},
+        ])
+
+    def build_batch(self, ps):
+        a, b, c = _column(ps, "a"), _column(ps, "b"), _column(ps, "c")
+
+        A = -a
+        B = b
+        C = c
+
+        D = _round(B ** 2 - 4 * A * C, 3)
+        sqrtD = np.sqrt(np.abs(D))
+
+        t1 = _round((-B + sqrtD) / (2 * A), 3)
+        t2 = _round((-B - sqrtD) / (2 * A), 3)
+        t_positive = np.maximum(t1, t2)
+        t_negative = np.minimum(t1, t2)
+
+        t_vertex = _round(-B / (2 * A), 3)
+        h_max = _round(A * t_vertex ** 2 + B * t_vertex + C, 3)
+
+        return [
+            self._exercise(f"{p['context']} h(t) = -{p['a']}t² + {p['b']}t + {p['c']}", [
+                {"text": "¿Altura máxima?", "answer": hm, "unit": "m"},
+                {"text": "¿Discriminante?", "answer": d, "unit": ""},
+                {"text": "¿Raíz positiva?", "answer": tp, "unit": "s"},
+                {"text": "¿Raíz negativa?", "answer": tn, "unit": "s"},
+                {"text": "¿Altura inicial?", "answer": p["c"], "unit": "m"},
+            ])
+            for p, hm, d, tp, tn in zip(
+                ps, h_max.tolist(), D.tolist(), t_positive.tolist(), t_negative.tolist()
+            )
+        ]
+
+
+# ============================================================
+#             FUNCIONES TRIGONOMÉTRICAS
+# ============================================================
+class TrigonometricGenerator(ExerciseGenerator):
+    module = "trigonometric"
+    module_name = "Funciones Trigonométricas"
+
+    # Valores posibles de ω y φ (se calculan una sola vez)
+    omegas = (math.pi, 2 * math.pi)
+    phases = (0, math.pi / 4, math.pi / 2)
+
+    # round(ω, 3) y round(φ, 3) ya calculados, para los textos y respuestas en lote
+    omegas_txt = {w: round(w, 3) for w in omegas}
+    phases_txt = {phi: round(phi, 3) for phi in phases}
+
+    def curve(self, p):
+        # x(t) = sin·sin(ωt + φ) + cos·cos(ωt) + offset
+        return {"kind": "sinusoid", "sin": p["A"], "cos": 0, "w": p["w"], "phi": 0, "offset": 0}
+
+
+# -------------------- BÁSICO --------------------
+@register
+class TrigonometricBasico(TrigonometricGenerator):
+    nivel = "basico"
+    title = "Oscilación Simple – Básico"
+    difficulty = "Básico"
+    question_labels = (
+        "Amplitud",
+        "Periodo",
+        "Posición en t = 0",
+        "Posición en t = T/4",
+        "Posición en t = T/2",
+    )
+    contexts = (
+        "Un péndulo pequeño oscila suavemente y su movimiento se describe con:",
+        "La vibración de una cuerda de guitarra se modela mediante:",
+        "Un resorte comprimido libera energía siguiendo:",
+        "Una boya en el mar sube y baja según:",
+        "Una brújula digital registra pequeñas oscilaciones descritas por:",
+    )
+
+    def draw(self, rng):
+        A = rng.randint(1, 3)
+        w = rng.choice(self.omegas)
+        return {"A": A, "w": w, "context": rng.choice(self.contexts)}
+
+    def build(self, p):
+        A, w = p["A"], p["w"]
+        T = round(2 * math.pi / w, 3)
+
+        return self._exercise(f"{p['context']} x(t) = {A}·sin({round(w,3)}t)", [
+            {"text": "¿Amplitud?", "answer": A, "unit": "cm"},
+            {"text": "¿Periodo?", "answer": T, "unit": "s"},
+            {"text": "¿Posición en t = 0?", "answer": 0, "unit": "cm"},
+            {"text": "¿Posición en t = T/4?", "answer": round(A * math.sin(w * (T/4)), 3), "unit": "cm"},
+            {"text": "¿Posición en t = T/2?", "answer": round(A * math.sin(w * (T/2)), 3), "unit": "cm"},
+        ])
+
+    def build_batch(self, ps):
+        A, w = _column(ps, "A"), _column(ps, "w")
+        T = _round(2 * math.pi / w, 3)
+
+        x_quarter = _round(A * np.sin(w * (T/4)), 3)
+        x_half = _round(A * np.sin(w * (T/2)), 3)
+
+        return [
+            self._exercise(f"{p['context']} x(t) = {p['A']}·sin({self.omegas_txt[p['w']]}t)", [
+                {"text": "¿Amplitud?", "answer": p["A"], "unit": "cm"},
+                {"text": "¿Periodo?", "answer": period, "unit": "s"},
+                {"text": "¿Posición en t = 0?", "answer": 0, "unit": "cm"},
+                {"text": "¿Posición en t = T/4?", "answer": xq, "unit": "cm"},
+                {"text": "¿Posición en t = T/2?", "answer": xh, "unit": "cm"},
+            ])
+            for p, period, xq, xh in zip(ps, T.tolist(), x_quarter.tolist(), x_half.tolist())
+        ]
+
+
+# -------------------- INTERMEDIO --------------------
+@register
+class TrigonometricIntermedio(TrigonometricGenerator):
+    nivel = "intermedio"
+    title = "Oscilación Compuesta – Intermedio"
+    difficulty = "Intermedio"
+    question_labels = (
+        "Amplitud combinada",
+        "Periodo",
+        "Posición en t",
+        "Posición en t + 0.5",
+        "Valor medio",
+    )
+    contexts = (
+        "Una cuerda de violín vibra en un modo combinado dado por:",
+        "Un oscilador mecánico industrial produce vibraciones descritas por:",
+        "Un sensor mide vibraciones complejas siguiendo:",
+        "Una onda de sonido armónica se modela mediante:",
+        "Un reflector acústico genera una oscilación compuesta representada por:",
+    )
+
+    def draw(self, rng):
+        A = rng.randint(1, 3)
+        B = rng.randint(1, 3)
+        w = rng.choice(self.omegas)
+        t = round(rng.uniform(0.3, 2), 2)
+        return {"A": A, "B": B, "w": w, "t": t, "context": rng.choice(self.contexts)}
+
+    def curve(self, p):
+        return dict(super().curve(p), cos=p["B"])
+
+    def build(self, p):
+        A, B, w, t = p["A"], p["B"], p["w"], p["t"]
+        T = round(2 * math.pi / w, 3)
+
+        val1 = round(A * math.sin(w*t) + B * math.cos(w*t), 3)
+        val2 = round(A * math.sin(w*(t+0.5)) + B * math.cos(w*(t+0.5)), 3)
+
+        return self._exercise(f"{p['context']} x(t) = {A}·sin({round(w,3)}t) + {B}·cos({round(w,3)}t)", [
+            {"text": "¿Amplitud combinada?", "answer": round(math.sqrt(A**2 + B**2), 3), "unit": "cm"},
+            {"text": "¿Periodo?", "answer": T, "unit": "s"},
+            {"text": f"¿Posición en t = {t}?", "answer": val1, "unit": "cm"},
+            {"text": f"¿Posición en t = {t+0.5}?", "answer": val2, "unit": "cm"},
+            {"text": "¿Valor medio de la oscilación?", "answer": 0, "unit": "cm"},
+        ])
+
+    def build_batch(self, ps):
+        A, B = _column(ps, "A"), _column(ps, "B")
+        w, t = _column(ps, "w"), _column(ps, "t")
+        T = _round(2 * math.pi / w, 3)
+
+        amplitude = _round(np.sqrt(A**2 + B**2), 3)
+        val1 = _round(A * np.sin(w*t) + B * np.cos(w*t), 3)
+        val2 = _round(A * np.sin(w*(t+0.5)) + B * np.cos(w*(t+0.5)), 3)
+
+        exercises = []
+        for p, amp, period, v1, v2 in zip(ps, amplitude.tolist(), T.tolist(), val1.tolist(), val2.tolist()):
+            w_txt = self.omegas_txt[p["w"]]
+            exercises.append(self._exercise(f"{p['context']} x(t) = {p['A']}·sin({w_txt}t) + {p['B']}·cos({w_txt}t)", [
+                {"text": "¿Amplitud combinada?", "answer": amp, "unit": "cm"},
+                {"text": "¿Periodo?", "answer": period, "unit": "s"},
+                {"text": f"¿Posición en t = {p['t']}?", "answer": v1, "unit": "cm"},
+                {"text": f"¿Posición en t = {p['t']+0.5}?", "answer": v2, "unit": "cm"},
+                {"text": "¿Valor medio de la oscilación?", "answer": 0, "unit": "cm"},
+            ]))
+        return exercises
+
+
+# -------------------- AVANZADO --------------------
+@register
+class TrigonometricAvanzado(TrigonometricGenerator):
+    nivel = "avanzado"
+    title = "Oscilación con Desfase – Avanzado"
+    difficulty = "Avanzado"
+    question_labels = (
+        "Amplitud",
+        "Periodo",
+        "Desfase",
+        "Posición en t",
+        "Posición máxima",
+    )
+    contexts = (
+        "Un cardiólogo analiza una señal biomédica modelada mediante:",
+        "Una estación meteorológica registra variaciones periódicas descritas por:",
+        "Una señal eléctrica modulada con desfase se expresa como:",
+        "Un robot industrial realiza movimientos oscilatorios según:",
+        "Una onda de marea se modela matemáticamente mediante:",
+    )
+
+    def draw(self, rng):
+        A = rng.randint(1, 3)
+        B = rng.randint(0, 3)
+        w = rng.choice(self.omegas)
+        phi = rng.choice(self.phases)
+        t = round(rng.uniform(0.3, 2), 2)
+        return {"A": A, "B": B, "w": w, "phi": phi, "t": t, "context": rng.choice(self.contexts)}
+
+    def curve(self, p):
+        return dict(super().curve(p), phi=p["phi"], offset=p["B"])
+
+    def build(self, p):
+        A, B, w, phi, t = p["A"], p["B"], p["w"], p["phi"], p["t"]
+
+        T = round(2 * math.pi / w, 3)
+        val = round(A * math.sin(w*t + phi) + B, 3)
+
+        return self._exercise(f"{p['context']} x(t) = {A}·sin({round(w,3)}t + {round(phi,3)}) + {B}", [
+            {"text": "¿Amplitud?", "answer": A, "unit": "cm"},
+            {"text": "¿Periodo?", "answer": T, "unit": "s"},
+            {"text": "¿Desfase?", "answer": round(phi, 3), "unit": "rad"},
+            {"text": f"¿Posición en t = {t}?", "answer": val, "unit": "cm"},
+            {"text": "¿Posición máxima posible?", "answer": A + B, "unit": "cm"},
+        ])
+
+    def build_batch(self, ps):
+        A, B = _column(ps, "A"), _column(ps, "B")
+        w, phi, t = _column(ps, "w"), _column(ps, "phi"), _column(ps, "t")
+
+        T = _round(2 * math.pi / w, 3)
+        val = _round(A * np.sin(w*t + phi) + B, 3)
+
+        exercises = []
+        for p, period, v in zip(ps, T.tolist(), val.tolist()):
+            phi_txt = self.phases_txt[p["phi"]]
+            exercises.append(self._exercise(
+                f"{p['context']} x(t) = {p['A']}·sin({self.omegas_txt[p['w']]}t + {phi_txt}) + {p['B']}", [
+                    {"text": "¿Amplitud?", "answer": p["A"], "unit": "cm"},
+                    {"text": "¿Periodo?", "answer": period, "unit": "s"},
+                    {"text": "¿Desfase?", "answer": phi_txt, "unit": "rad"},
+                    {"text": f"¿Posición en t = {p['t']}?", "answer": v, "unit": "cm"},
+                    {"text": "¿Posición máxima posible?", "answer": p["A"] + p["B"], "unit": "cm"},
+                ]))
+        return exercises
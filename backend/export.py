@@ -0,0 +1,192 @@
+import argparse
+import csv
+import hmac
+import io
+import json
+import sys
+from contextlib import closing
+from datetime import datetime, timedelta
+
+from catalog import catalog
+from config import env_int, env_str
+from db import DB_BACKEND, TimedSSDictCursor, pool
+
+# ============================================================
+#   EXPORTACIÓN DE RESULTADOS (CSV / JSONL) EN STREAMING
+# ============================================================
+# Para que los docentes descarguen los resultados de todo el curso.
+# La consulta se lee con un cursor sin buffer (SSCursor): las filas van
+# saliendo del socket de MySQL de a EXPORT_CHUNK_ROWS y se envían al
+# cliente, así la memoria es la misma para mil filas o diez millones.
+#
+# Se usa desde la API (/api/export/results, con X-Export-Token) o por
+# consola (desde backend/):
+#     python export.py --format csv --desde 2025-03-01 --hasta 2025-06-30 --module quadratic -o notas.csv
+
+EXPORT_TOKEN = env_str("EXPORT_TOKEN", "")      # secreto de los docentes; vacío = API deshabilitada
+EXPORT_CHUNK_ROWS = 500                         # filas leídas y enviadas por vez
+# Segundos que MySQL espera a que el cliente lea antes de cortar (un
+# navegador lento frena la lectura del cursor sin buffer)
+EXPORT_NET_WRITE_TIMEOUT = env_int("EXPORT_NET_WRITE_TIMEOUT", 600)
+
+COLUMNAS = ("id_resultado", "id_usuario", "nombre_usuario", "correo", "nivel_usuario",
+            "modulo", "puntaje", "total_preguntas", "fecha")
+FORMATOS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+class InvalidExport(ValueError):
+    """Parámetros de exportación inválidos."""
+
+
+def token_valido(token):
+    """True si `token` coincide con EXPORT_TOKEN (siempre False si no está configurado)."""
+    if not EXPORT_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), EXPORT_TOKEN.encode("utf-8"))
+
+
+def parse_fecha(valor, fin=False):
+    """
+    Fecha u hora ISO. Una fecha sola como fin del rango incluye ese día
+    completo (se devuelve el día siguiente, límite exclusivo).
+    """
+    if not valor:
+        return None
+    try:
+        fecha = datetime.fromisoformat(valor).replace(tzinfo=None)
+    except ValueError:
+        raise InvalidExport(f"Fecha inválida: {valor}")
+    if fin and len(valor) == 10:
+        fecha += timedelta(days=1)
+    return fecha
+
+
+def _consulta(desde, hasta, id_nivel):
+    sql = """
+        SELECT r.id_resultado, r.id_usuario, u.nombre_usuario, u.correo, u.nivel AS nivel_usuario,
+               r.id_nivel, r.puntaje, r.total_preguntas, r.fecha
+        FROM resultados r
+        JOIN usuario u ON u.id = r.id_usuario
+        WHERE 1 = 1
+    """
+    params = []
+    if desde is not None:
+        sql += " AND r.fecha >= %s"
+        params.append(desde)
+    if hasta is not None:
+        sql += " AND r.fecha < %s"
+        params.append(hasta)
+    if id_nivel is not None:
+        sql += " AND r.id_nivel = %s"
+        params.append(id_nivel)
+    # Orden de la clave primaria: MySQL la recorre sin ordenar en disco
+    return sql + " ORDER BY r.id_resultado", params
+
+
+def leer_resultados(desde=None, hasta=None, id_nivel=None):
+    """
+    Generador de filas (dict) con el cursor sin buffer. Si se abandona a
+    medias (el cliente cortó la descarga) la conexión se cierra en vez de
+    leer el resto de las filas para devolverla al pool.
+    """
+    sql, params = _consulta(desde, hasta, id_nivel)
+    nombres = {}    # id_nivel -> nombre, sin pasar por el catálogo en cada fila
+    pooled = pool.acquire()
+    completo = False
+    try:
+        conn = pooled.conn
+        mysql = DB_BACKEND != "sqlite"
+        if mysql:
+            with conn.cursor() as cursor:
+                cursor.execute("SET SESSION net_write_timeout = %s", (EXPORT_NET_WRITE_TIMEOUT,))
+        cursor = conn.cursor(TimedSSDictCursor)
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(EXPORT_CHUNK_ROWS)
+            if not rows:
+                break
+            for row in rows:
+                id_nivel_row = row.pop("id_nivel")
+                if id_nivel_row not in nombres:
+                    nivel = catalog.nivel_por_id(id_nivel_row)
+                    nombres[id_nivel_row] = nivel["nombre"] if nivel else None
+                row["modulo"] = nombres[id_nivel_row]
+            yield rows
+        cursor.close()
+        if mysql:
+            with conn.cursor() as cursor:
+                cursor.execute("SET SESSION net_write_timeout = DEFAULT")
+        conn.rollback()
+        completo = True
+    finally:
+        pool.release(pooled, broken=not completo)
+
+
+def _valor(v):
+    return v.isoformat(" ") if isinstance(v, datetime) else v
+
+
+def _csv(lotes):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNAS)
+    with closing(lotes):
+        for rows in lotes:
+            writer.writerows([[_valor(row[c]) for c in COLUMNAS] for row in rows])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _jsonl(lotes):
+    with closing(lotes):
+        for rows in lotes:
+            yield "".join(
+                json.dumps({c: _valor(row[c]) for c in COLUMNAS}, ensure_ascii=False) + "\n"
+                for row in rows
+            )
+
+
+def exportar(formato="csv", desde=None, hasta=None, module=None):
+    """
+    Generador de trozos de texto (CSV con encabezado, o una línea JSON por
+    resultado). Valida todo antes de tocar la BD: los errores salen al
+    llamarla, no a mitad de la descarga.
+    """
+    if formato not in FORMATOS:
+        raise InvalidExport("format debe ser 'csv' o 'jsonl'")
+    if desde is not None and hasta is not None and desde >= hasta:
+        raise InvalidExport("El rango de fechas está vacío")
+    id_nivel = None
+    if module:
+        id_nivel = catalog.id_nivel(module)
+        if id_nivel is None:
+            raise InvalidExport(f"Módulo desconocido: {module}")
+
+    lotes = leer_resultados(desde, hasta, id_nivel)
+    return _csv(lotes) if formato == "csv" else _jsonl(lotes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta los resultados del curso en CSV o JSONL")
+    parser.add_argument("--format", choices=sorted(FORMATOS), default="csv")
+    parser.add_argument("--desde", help="fecha inicial (YYYY-MM-DD o ISO), incluida")
+    parser.add_argument("--hasta", help="fecha final (YYYY-MM-DD incluye ese día)")
+    parser.add_argument("--module", help="solo un módulo (quadratic, trigonometric)")
+    parser.add_argument("-o", "--output", help="archivo de salida (por defecto la salida estándar)")
+    args = parser.parse_args()
+
+    try:
+        chunks = exportar(args.format, parse_fecha(args.desde), parse_fecha(args.hasta, fin=True), args.module)
+    except InvalidExport as e:
+        parser.error(str(e))
+
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
@@ -0,0 +1,184 @@
+import base64
+import hashlib
+import hmac
+import math
+import random
+import re
+import secrets
+import time
+
+from config import env_str
+from exercises import get_generator
+from metrics import generation_latency, timed
+
+# ============================================================
+#   EJERCICIOS CON SEMILLA + CORRECCIÓN EN EL SERVIDOR
+# ============================================================
+# El navegador recibe el ejercicio sin respuestas y un token firmado.
+# El token lleva (module, nivel, nonce, expiración); la semilla real es
+# HMAC(secreto, nonce), así que el cliente no puede regenerar las
+# respuestas aunque conozca el código de los generadores.
+# Para corregir se vuelve a generar el ejercicio desde la semilla:
+# el servidor no guarda el ejercicio ni sus respuestas.
+#
+# La corrección muestra las respuestas correctas, así que un token solo
+# puede guardar un resultado: el primero reclama su nonce en la tabla
+# 'ejercicios_corregidos' (ingest.reclamar_ejercicio) y reenviar las
+# respuestas reveladas se corrige pero no se guarda. Es el único estado
+# por ejercicio: una fila chica por ejercicio guardado, que vence junto
+# con el token (archive.py borra las vencidas). Un conjunto en memoria no
+# alcanza porque cada worker de gunicorn tendría el suyo.
+
+# Debe ser el mismo en todos los procesos/servidores (variable de entorno o backend/.env)
+EXERCISE_SECRET = env_str("EXERCISE_SECRET", "")
+if not EXERCISE_SECRET:
+    print("EXERCISE_SECRET no definido: se usa uno aleatorio (solo sirve con un proceso)")
+    EXERCISE_SECRET = secrets.token_hex(32)
+
+EXERCISE_TOKEN_TTL = 6 * 3600   # segundos que un ejercicio puede ser corregido
+ANSWER_TOLERANCE = 0.01         # misma tolerancia que usaba ejercicio.js
+
+_KEY = EXERCISE_SECRET.encode("utf-8")
+_NUMBER = re.compile(r"\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)")
+
+
+class InvalidToken(Exception):
+    """Token de ejercicio mal formado, con firma inválida o vencido."""
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload):
+    return hmac.new(_KEY, b"token|" + payload, hashlib.sha256).digest()[:16]
+
+
+def _seed(nonce):
+    return int.from_bytes(hmac.new(_KEY, b"seed|" + nonce.encode("ascii"), hashlib.sha256).digest()[:8], "big")
+
+
+# ---------- tokens ----------
+def issue_token(module, nivel, now=None):
+    nonce = secrets.token_hex(8)
+    expires = int((now or time.time()) + EXERCISE_TOKEN_TTL)
+    payload = f"{module}:{nivel}:{nonce}:{expires}".encode("utf-8")
+    return f"{_b64(payload)}.{_b64(_sign(payload))}", nonce
+
+
+def read_token(token, now=None):
+    """Devuelve (module, nivel, nonce) o lanza InvalidToken."""
+    try:
+        payload_b64, signature_b64 = token.split(".")
+        payload = _unb64(payload_b64)
+        signature = _unb64(signature_b64)
+    except (AttributeError, ValueError):
+        raise InvalidToken("Token mal formado")
+
+    if not hmac.compare_digest(signature, _sign(payload)):
+        raise InvalidToken("Firma inválida")
+
+    try:
+        module, nivel, nonce, expires = payload.decode("utf-8").split(":")
+        expires = int(expires)
+    except ValueError:
+        raise InvalidToken("Token mal formado")
+
+    if (now or time.time()) > expires:
+        raise InvalidToken("El ejercicio expiró")
+    return module, nivel, nonce
+
+
+# ---------- generación ----------
+def _without_answers(exercise, token):
+    public = dict(exercise)
+    public["questions"] = [
+        {k: v for k, v in q.items() if k != "answer"} for q in exercise["questions"]
+    ]
+    public["token"] = token
+    return public
+
+
+def generate_public(generator):
+    """Ejercicio listo para el navegador: con token y sin respuestas."""
+    token, nonce = issue_token(generator.module, generator.nivel)
+    with timed("generation", generation_latency, module=generator.module, nivel=generator.nivel, mode="single"):
+        exercise = generator.generate(random.Random(_seed(nonce)))
+    return _without_answers(exercise, token)
+
+
+def generate_public_batch(generator, count):
+    tokens = [issue_token(generator.module, generator.nivel) for _ in range(count)]
+    with timed("generation", generation_latency, module=generator.module, nivel=generator.nivel, mode="batch"):
+        ps = [generator.draw(random.Random(_seed(nonce))) for _, nonce in tokens]
+        exercises = generator.build_batch(ps)
+    return [_without_answers(ex, token) for ex, (token, _) in zip(exercises, tokens)]
+
+
+def rebuild(token):
+    """Vuelve a generar el ejercicio completo (con respuestas) desde su token."""
+    module, nivel, nonce = read_token(token)
+    generator = get_generator(module, nivel)
+    if generator is None:
+        raise InvalidToken("Módulo o nivel inválido")
+    with timed("generation", generation_latency, module=module, nivel=nivel, mode="rebuild"):
+        exercise = generator.generate(random.Random(_seed(nonce)))
+    return module, nivel, exercise
+
+
+def exercise_curve(token):
+    """Parámetros de la función del ejercicio del token (para plots.py), sin armar el ejercicio."""
+    module, nivel, nonce = read_token(token)
+    generator = get_generator(module, nivel)
+    if generator is None:
+        raise InvalidToken("Módulo o nivel inválido")
+    return generator.curve(generator.draw(random.Random(_seed(nonce))))
+
+
+# ---------- corrección ----------
+def _parse_number(value):
+    """Equivalente a parseFloat de JavaScript: toma el número al inicio del texto."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    match = _NUMBER.match(str(value))
+    return float(match.group(1)) if match else None
+
+
+def is_correct(user_answer, correct):
+    num_user = _parse_number(user_answer)
+    num_correct = _parse_number(correct)
+    if num_user is not None and num_correct is not None:
+        return abs(num_user - num_correct) < ANSWER_TOLERANCE
+    return str(user_answer).strip().lower() == str(correct).strip().lower()
+
+
+def grade(exercise, answers):
+    """Corrige las respuestas (en el orden de las preguntas) igual que lo hacía ejercicio.js."""
+    questions = exercise["questions"]
+    results = []
+    correct_count = 0
+
+    for i, q in enumerate(questions):
+        user_answer = answers[i] if i < len(answers) else ""
+        ok = is_correct(user_answer, q["answer"])
+        correct_count += ok
+        results.append({
+            "question": q["text"],
+            "userAnswer": user_answer,
+            "correctAnswer": q["answer"],
+            "isCorrect": ok,
+            "unit": q.get("unit", ""),
+        })
+
+    total = len(questions)
+    return {
+        "results": results,
+        # Math.round de JS (las mitades suben), como en ejercicio.js
+        "score": math.floor(correct_count / total * 100 + 0.5) if total else 0,
+        "correctCount": correct_count,
+        "totalQuestions": total,
+    }
@@ -0,0 +1,53 @@
+import multiprocessing
+
+from config import env_bool, env_int, env_str
+
+# ============================================================
+#   GUNICORN (SERVIDOR DE PRODUCCIÓN)
+# ============================================================
+# Desde backend/:
+#     gunicorn -c gunicorn.conf.py wsgi:application
+# Recarga sin cortar peticiones:  kill -HUP <pid del maestro>
+# Apagado ordenado:               kill -TERM <pid del maestro>
+# Todos los valores se pueden cambiar con variables de entorno o en .env.
+
+bind = env_str("WEB_BIND", "0.0.0.0:5000")
+workers = env_int("WEB_WORKERS", multiprocessing.cpu_count() * 2 + 1)
+threads = env_int("WEB_THREADS", 4)
+worker_class = "gthread"
+
+# La app, el registro de ejercicios y el catálogo se cargan una vez en el
+# maestro y los workers los heredan al hacer fork
+preload_app = env_bool("WEB_PRELOAD", True)
+
+timeout = env_int("WEB_TIMEOUT", 30)
+graceful_timeout = env_int("WEB_GRACEFUL_TIMEOUT", 30)
+keepalive = env_int("WEB_KEEPALIVE", 5)
+max_requests = env_int("WEB_MAX_REQUESTS", 0)
+max_requests_jitter = env_int("WEB_MAX_REQUESTS_JITTER", 0)
+
+# La app ya escribe un log de acceso JSON por petición (metrics.py)
+accesslog = env_str("WEB_ACCESS_LOG", "") or None
+errorlog = "-"
+
+
+def when_ready(server):
+    # El maestro no atiende peticiones: suelta las conexiones de la precarga
+    from db import pool
+    pool.close()
+
+
+def post_fork(server, worker):
+    # Cada worker abre sus propias conexiones (los sockets no se comparten)
+    from db import pool
+    pool.after_fork()
+    try:
+        pool.warmup()
+    except Exception as e:
+        print("No se pudo precalentar el pool del worker:", e)
+
+
+def worker_exit(server, worker):
+    # Al reiniciar (HUP) o apagar (TERM): vaciar write-behind y cerrar pools
+    from app import cerrar_recursos
+    cerrar_recursos()
@@ -0,0 +1,141 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import bcrypt
+
+from config import env_int
+from metrics import bcrypt_latency, timed
+
+# ============================================================
+#   HASH DE CONTRASEÑAS FUERA DE LOS HILOS DE FLASK
+# ============================================================
+# bcrypt consume decenas de ms de CPU por llamada. Se ejecuta en un pool
+# acotado de hilos (bcrypt libera el GIL mientras calcula), así un login
+# masivo no ocupa todos los núcleos y el resto de endpoints sigue
+# respondiendo. Si hay demasiadas operaciones en cola se rechaza la
+# petición de inmediato (HashingOverloaded -> 503 con Retry-After).
+
+# Subir BCRYPT_ROUNDS no invalida nada: cada hash viejo se rehace con el
+# costo nuevo la próxima vez que su dueño inicia sesión (needs_rehash)
+BCRYPT_ROUNDS = env_int("BCRYPT_ROUNDS", 12)                    # factor de costo de bcrypt (4 a 31)
+HASH_WORKERS = env_int("HASH_WORKERS", max(1, (os.cpu_count() or 2) // 2))  # hilos dedicados a bcrypt
+HASH_QUEUE_LIMIT = env_int("HASH_QUEUE_LIMIT", HASH_WORKERS * 8)  # operaciones en curso + en espera
+HASH_TIMEOUT = 10                                               # segundos máximos esperando un resultado
+HASH_RETRY_AFTER = 2                                            # valor del header Retry-After
+
+if not 4 <= BCRYPT_ROUNDS <= 31:
+    print(f"BCRYPT_ROUNDS fuera de rango (4 a 31): {BCRYPT_ROUNDS}, se usa 12")
+    BCRYPT_ROUNDS = 12
+
+
+class HashingOverloaded(Exception):
+    """La cola de bcrypt está llena; el cliente debe reintentar más tarde."""
+
+    retry_after = HASH_RETRY_AFTER
+
+
+class PasswordHasher:
+    def __init__(self, workers=HASH_WORKERS, queue_limit=HASH_QUEUE_LIMIT,
+                 rounds=BCRYPT_ROUNDS, timeout=HASH_TIMEOUT):
+        self.rounds = rounds
+        self.timeout = timeout
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(queue_limit)
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "rejected": 0, "rehashed": 0}
+
+    # ---------- admisión ----------
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise HashingOverloaded("Demasiadas operaciones de contraseña en cola")
+        with self._lock:
+            self._stats["submitted"] += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _run(self, fn, *args):
+        try:
+            return self._submit(fn, *args).result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HashingOverloaded("bcrypt no respondió a tiempo")
+
+    # ---------- operaciones ----------
+    def hash(self, password):
+        with timed("bcrypt", bcrypt_latency, operation="hash"):
+            return self._run(self._hash_sync, password, self.rounds)
+
+    def check(self, password, stored_hash):
+        with timed("bcrypt", bcrypt_latency, operation="check"):
+            return self._run(self._check_sync, password, stored_hash)
+
+    # ---------- modo asyncio (asgi.py): se espera sin bloquear el event loop ----------
+    async def _run_async(self, fn, *args):
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(self._submit(fn, *args)), self.timeout)
+        except asyncio.TimeoutError:
+            raise HashingOverloaded("bcrypt no respondió a tiempo")
+
+    async def hash_async(self, password):
+        with timed("bcrypt", bcrypt_latency, operation="hash"):
+            return await self._run_async(self._hash_sync, password, self.rounds)
+
+    async def check_async(self, password, stored_hash):
+        with timed("bcrypt", bcrypt_latency, operation="check"):
+            return await self._run_async(self._check_sync, password, stored_hash)
+
+    @staticmethod
+    def _hash_sync(password, rounds):
+        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+    @staticmethod
+    def _check_sync(password, stored_hash):
+        return bcrypt.checkpw(password.encode("utf-8"), stored_hash.encode("utf-8"))
+
+    def needs_rehash(self, stored_hash):
+        """True si el hash se generó con un costo distinto a BCRYPT_ROUNDS."""
+        try:
+            return int(stored_hash.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+
+    def rehash_later(self, password, on_done):
+        """
+        Calcula un hash con el costo actual en segundo plano y llama a
+        on_done(nuevo_hash). Si el pool está saturado se deja para el próximo login.
+        """
+        def _done(future):
+            if future.exception() is None:
+                with self._lock:
+                    self._stats["rehashed"] += 1
+                on_done(future.result())
+            else:
+                print("Error recalculando hash:", future.exception())
+
+        try:
+            self._submit(self._hash_sync, password, self.rounds).add_done_callback(_done)
+        except HashingOverloaded:
+            pass
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["rounds"] = self.rounds
+        stats["queue_limit"] = self.queue_limit
+        return stats
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+# Hasher compartido por toda la aplicación
+hasher = PasswordHasher()
@@ -0,0 +1,134 @@
+import base64
+from datetime import datetime
+
+from catalog import catalog
+from db import pool
+from db_async import apool
+
+# ============================================================
+#   HISTORIAL DE RESULTADOS PAGINADO POR CURSOR (KEYSET)
+# ============================================================
+# Las páginas se piden con `before` = posición (fecha, id_resultado) de la
+# última fila recibida, así cada página cuesta lo mismo sin importar cuántos
+# resultados tenga el usuario (no hay OFFSET). La consulta se resuelve con
+# el índice idx_resultados_usuario_fecha; los nombres de nivel y ejercicio
+# salen del catálogo en memoria en vez de hacer JOIN.
+
+HISTORY_PAGE_DEFAULT = 50
+HISTORY_PAGE_MAX = 200
+HISTORY_STREAM_PAGE = 500   # filas por consulta al transmitir el historial completo
+
+
+class InvalidCursor(ValueError):
+    """El parámetro `before` no es un cursor válido."""
+
+
+def encode_cursor(row):
+    fecha = row["fecha"]
+    fecha = fecha.isoformat() if isinstance(fecha, datetime) else str(fecha)
+    raw = f"{fecha}|{row['id_resultado']}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        fecha, id_resultado = raw.rsplit("|", 1)
+        return datetime.fromisoformat(fecha), int(id_resultado)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor("Cursor inválido")
+
+
+def _with_names(row):
+    nivel = catalog.nivel_por_id(row.pop("id_nivel"))
+    ejercicio = catalog.ejercicio_por_id(row.pop("id_ejercicio"))
+    row["nombre_nivel"] = nivel["nombre"] if nivel else None
+    row["titulo_ejercicio"] = ejercicio["titulo"] if ejercicio else None
+    return row
+
+
+def _consulta(user_id, limit, before):
+    sql = """
+        SELECT
+            r.id_resultado,
+            r.puntaje,
+            r.total_preguntas,
+            r.fecha,
+            r.id_nivel,
+            r.id_ejercicio
+        FROM resultados r
+        WHERE r.id_usuario = %s
+    """
+    params = [user_id]
+
+    if before is not None:
+        fecha, id_resultado = before
+        sql += " AND (r.fecha < %s OR (r.fecha = %s AND r.id_resultado < %s))"
+        params += [fecha, fecha, id_resultado]
+
+    sql += " ORDER BY r.fecha DESC, r.id_resultado DESC LIMIT %s"
+    params.append(limit)
+    return sql, params
+
+
+def consultar_historial(user_id, limit=HISTORY_PAGE_DEFAULT, before=None):
+    """
+    Devuelve hasta `limit` resultados del usuario, del más reciente al más
+    antiguo, anteriores a `before` (tupla (fecha, id_resultado) o None).
+    """
+    sql, params = _consulta(user_id, limit, before)
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+    return [_with_names(row) for row in rows]
+
+
+def pagina_historial(user_id, limit, before_cursor=None):
+    """Una página y el cursor para pedir la siguiente (None si no hay más)."""
+    before = decode_cursor(before_cursor) if before_cursor else None
+    rows = consultar_historial(user_id, limit, before)
+    next_before = encode_cursor(rows[-1]) if len(rows) == limit else None
+    return rows, next_before
+
+
+def recorrer_historial(user_id, page_size=HISTORY_STREAM_PAGE):
+    """Generador con el historial completo, consultado página por página."""
+    before = None
+    while True:
+        rows = consultar_historial(user_id, page_size, before)
+        yield from rows
+        if len(rows) < page_size:
+            return
+        last = rows[-1]
+        before = (last["fecha"], last["id_resultado"])
+
+
+# ---------- modo asyncio (asgi.py) ----------
+async def consultar_historial_async(user_id, limit=HISTORY_PAGE_DEFAULT, before=None):
+    sql, params = _consulta(user_id, limit, before)
+    async with apool.connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(sql, params)
+            rows = await cursor.fetchall()
+    return [_with_names(row) for row in rows]
+
+
+async def pagina_historial_async(user_id, limit, before_cursor=None):
+    before = decode_cursor(before_cursor) if before_cursor else None
+    rows = await consultar_historial_async(user_id, limit, before)
+    next_before = encode_cursor(rows[-1]) if len(rows) == limit else None
+    return rows, next_before
+
+
+async def recorrer_historial_async(user_id, page_size=HISTORY_STREAM_PAGE):
+    before = None
+    while True:
+        rows = await consultar_historial_async(user_id, page_size, before)
+        for row in rows:
+            yield row
+        if len(rows) < page_size:
+            return
+        last = rows[-1]
+        before = (last["fecha"], last["id_resultado"])
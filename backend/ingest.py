@@ -0,0 +1,456 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pymysql
+
+from attempts import insertar_intentos
+from config import env_bool, env_float, env_int, env_str
+from db import pool
+from leaderboard import leaderboard
+from summary import acumular
+import progress
+
+# ============================================================
+#   INGRESO DE RESULTADOS (DIRECTO O WRITE-BEHIND)
+# ============================================================
+# Modo directo: cada resultado se inserta y confirma en la petición.
+# Modo write-behind: el resultado entra a un buffer en memoria, se
+# responde al cliente y un hilo lo escribe después junto con otros en
+# un INSERT de varias filas y una sola transacción (al llegar a
+# FLUSH_SIZE filas o cada FLUSH_INTERVAL segundos).
+# Junto a cada resultado pueden venir sus filas de 'intentos'
+# (una por pregunta), que se escriben en la misma transacción.
+#
+# Un flush fallido se reintenta sin perder filas. Si al apagar la BD sigue
+# sin responder, lo pendiente se guarda en SPOOL_DIR y se escribe en el
+# próximo arranque (reenviar_pendientes, desde app.precargar). Solo se
+# pierde lo que esté en memoria si el proceso muere sin apagado ordenado
+# (kill -9, corte de luz).
+
+WRITE_BEHIND_ENABLED = env_bool("WRITE_BEHIND_ENABLED", False)
+FLUSH_SIZE = env_int("WRITE_BEHIND_FLUSH_SIZE", 200)            # filas que disparan un flush inmediato
+FLUSH_INTERVAL = env_float("WRITE_BEHIND_FLUSH_INTERVAL", 1.0)  # segundos máximos que una fila espera en el buffer
+MAX_PENDING = env_int("WRITE_BEHIND_MAX_PENDING", 10000)        # si el buffer está lleno se inserta directo
+RETRY_DELAY = 2.0           # espera tras un flush fallido (las filas no se pierden)
+STOP_RETRIES = 3            # flushes fallidos al apagar antes de pasar lo pendiente a disco
+SPOOL_DIR = env_str("WRITE_BEHIND_SPOOL_DIR", "") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "write_behind_spool")
+
+log = logging.getLogger("infinite_afo.ingest")
+
+
+def nueva_fila(id_usuario, id_nivel, id_ejercicio, puntaje, total_preguntas, fecha=None, dificultad=None,
+               corregido=False):
+    """
+    Fila lista para 'resultados'. La fecha se fija al recibir el resultado,
+    no al escribirlo, para que el write-behind no la retrase.
+    La dificultad (basico/intermedio/avanzado o None) alimenta el progreso
+    adaptativo (progress.py); `corregido` marca los resultados corregidos en
+    el servidor (/api/exercise-grade), los únicos que suman al ranking
+    (leaderboard.py).
+    """
+    return (id_usuario, id_nivel, id_ejercicio, puntaje, total_preguntas, fecha or datetime.now(), dificultad,
+            1 if corregido else 0)
+
+
+def insertar_resultados(rows, intentos=()):
+    """
+    Inserta todas las filas con un único INSERT multi-fila y, en la misma
+    transacción, suma esas filas al resumen por usuario y nivel y al
+    progreso adaptativo y guarda los intentos por pregunta (otro INSERT
+    multi-fila). Después avisa al
+    ranking en memoria para que lea los resultados nuevos.
+    """
+    if not rows and not intentos:
+        return
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            if rows:
+                # pymysql convierte executemany de un INSERT ... VALUES en un INSERT multi-fila
+                cursor.executemany(
+                    """
+                    INSERT INTO resultados (id_usuario, id_nivel, id_ejercicio, puntaje, total_preguntas, fecha,
+                                            dificultad, corregido)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    """,
+                    rows
+                )
+                acumular(cursor, rows)
+                progress.acumular(cursor, rows)
+            insertar_intentos(cursor, intentos)
+        conn.commit()
+    if rows:
+        leaderboard.marcar_cambios()
+
+
+def reclamar_ejercicio(nonce, ttl):
+    """
+    Marca como guardado el ejercicio del token con `nonce` (ver grading.py).
+    True la primera vez; False si ese ejercicio ya tenía un resultado.
+    La marca vence en `ttl` segundos, cuando el token ya no sirve.
+    """
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "INSERT IGNORE INTO ejercicios_corregidos (nonce, expira) VALUES (%s, %s)",
+                (nonce, datetime.now() + timedelta(seconds=ttl))
+            )
+            nuevo = cursor.rowcount == 1
+        conn.commit()
+    return nuevo
+
+
+def liberar_ejercicio(nonce):
+    """Deshace reclamar_ejercicio cuando el resultado no se pudo guardar."""
+    try:
+        with pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM ejercicios_corregidos WHERE nonce = %s", (nonce,))
+            conn.commit()
+    except Exception as e:
+        log.error("No se pudo liberar el ejercicio %s: %s", nonce, e)
+
+
+# ---------- entradas pendientes ----------
+# El buffer y los archivos pendientes guardan una entrada por resultado:
+# (fila, intentos de esa fila, nonce del ejercicio o None). Así un lote
+# lleva justo los intentos de sus filas y, si una fila se descarta, se
+# sabe qué ejercicio liberar.
+
+def _entradas(rows, intentos=(), nonce=None):
+    """Entradas de un envío: los intentos y el nonce van con la primera fila (un ejercicio corregido es un resultado)."""
+    if not rows:
+        return [(None, tuple(intentos), nonce)] if intentos else []
+    return [(rows[0], tuple(intentos), nonce)] + [(row, (), None) for row in rows[1:]]
+
+
+def _separar(entradas):
+    """(rows, intentos) para insert_fn."""
+    rows = [row for row, _, _ in entradas if row is not None]
+    intentos = [a for _, ats, _ in entradas for a in ats]
+    return rows, intentos
+
+
+def _contar_filas(entradas):
+    return sum(1 for row, _, _ in entradas if row is not None)
+
+
+def _escribir_de_a_uno(entradas, insert_fn):
+    """
+    Escribe cada resultado con sus intentos en su propia transacción. Los
+    inválidos (IntegrityError) se descartan y se libera su ejercicio, que
+    si no quedaría marcado como guardado. Devuelve (escritos, descartados,
+    entradas sin escribir porque la BD falló).
+    """
+    written = rejected = 0
+    for done, (row, intentos, nonce) in enumerate(entradas):
+        rows = [row] if row is not None else []
+        try:
+            insert_fn(rows, intentos)
+            written += len(rows)
+        except pymysql.err.IntegrityError as e:
+            log.error("Fila descartada por datos inválidos: %s %s", row or intentos, e)
+            rejected += 1
+            if nonce:
+                liberar_ejercicio(nonce)
+        except Exception as e:
+            log.warning("Error escribiendo resultados, quedan pendientes: %s", e)
+            return written, rejected, entradas[done:]
+    return written, rejected, []
+
+
+# ---------- entradas pendientes en disco ----------
+# Posición de la fecha en cada tipo de fila (JSON no tiene datetime)
+_FECHA_RESULTADO = 5
+_FECHA_INTENTO = 4
+
+
+def _a_json(row, i):
+    row = list(row)
+    if isinstance(row[i], datetime):
+        row[i] = row[i].isoformat()
+    return row
+
+
+def _de_json(row, i):
+    row = list(row)
+    if row[i] is not None:
+        row[i] = datetime.fromisoformat(row[i])
+    return tuple(row)
+
+
+def _resultado_de_json(row):
+    # nueva_fila completa los campos que no tenían los archivos de versiones anteriores
+    return nueva_fila(*_de_json(row, _FECHA_RESULTADO))
+
+
+def volcar_a_disco(entradas, directorio=None):
+    """
+    Guarda entradas que no llegaron a la BD en un archivo nuevo de
+    `directorio` (por defecto SPOOL_DIR). Devuelve su ruta.
+    """
+    directorio = directorio or SPOOL_DIR
+    os.makedirs(directorio, exist_ok=True)
+    path = os.path.join(directorio, f"pendiente-{os.getpid()}-{time.time_ns()}.json")
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({
+            "entradas": [
+                [None if row is None else _a_json(row, _FECHA_RESULTADO),
+                 [_a_json(a, _FECHA_INTENTO) for a in intentos], nonce]
+                for row, intentos, nonce in entradas
+            ],
+        }, f)
+        f.flush()
+        os.fsync(f.fileno())
+    # El archivo aparece completo o no aparece
+    os.replace(tmp, path)
+    return path
+
+
+def _leer_pendiente(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if "entradas" not in data:
+        # Formato anterior: filas e intentos por separado, sin nonce
+        return _entradas([], [_de_json(a, _FECHA_INTENTO) for a in data["intentos"]]) + [
+            (_resultado_de_json(r), (), None) for r in data["rows"]]
+    return [
+        (None if row is None else _resultado_de_json(row),
+         tuple(_de_json(a, _FECHA_INTENTO) for a in intentos), nonce)
+        for row, intentos, nonce in data["entradas"]
+    ]
+
+
+def _insertar_o_descartar(entradas, insert_fn):
+    """
+    Inserta todo junto; si alguna fila es inválida (IntegrityError) sigue
+    de a una y descarta esas. Devuelve (resultados escritos, entradas que
+    no se escribieron porque la BD falló).
+    """
+    try:
+        insert_fn(*_separar(entradas))
+        return _contar_filas(entradas), []
+    except pymysql.err.IntegrityError:
+        pass
+    except Exception as e:
+        log.warning("No se pudieron reenviar los resultados pendientes: %s", e)
+        return 0, entradas
+    written, _, faltan = _escribir_de_a_uno(entradas, insert_fn)
+    return written, faltan
+
+
+def reenviar_pendientes(directorio=None, insert_fn=insertar_resultados):
+    """
+    Escribe en la BD los archivos que dejó volcar_a_disco y los borra.
+    Cada archivo se reclama renombrándolo, así dos procesos que arrancan a
+    la vez no lo escriben dos veces. Si la BD falla, lo que falta queda
+    para el próximo arranque. Devuelve cuántos resultados escribió.
+    """
+    directorio = directorio or SPOOL_DIR
+    if not os.path.isdir(directorio):
+        return 0
+    total = 0
+    for nombre in sorted(os.listdir(directorio)):
+        path = os.path.join(directorio, nombre)
+        if nombre.endswith(".enviando"):
+            # Un arranque anterior murió a mitad: puede estar escrito en parte, revisar a mano
+            log.warning("Archivo pendiente sin terminar de reenviar: %s", path)
+            continue
+        if not (nombre.startswith("pendiente-") and nombre.endswith(".json")):
+            continue
+        reclamado = path + ".enviando"
+        try:
+            os.rename(path, reclamado)
+        except FileNotFoundError:
+            continue    # lo tomó otro proceso
+        entradas = _leer_pendiente(reclamado)
+
+        escritos, faltan = _insertar_o_descartar(entradas, insert_fn)
+        total += escritos
+        if len(faltan) == len(entradas):
+            os.rename(reclamado, path)      # no se escribió nada: queda igual que antes
+            break
+        if faltan:
+            # Si esto falla el archivo queda como .enviando, sin perder filas
+            volcar_a_disco(faltan, directorio)
+            os.remove(reclamado)
+            break
+        os.remove(reclamado)
+    if total:
+        log.warning("Reenviados %d resultado(s) pendiente(s) de un apagado anterior", total)
+    return total
+
+
+class ResultWriter:
+    """Buffer en memoria + hilo que vacía los resultados (con sus intentos) en lotes."""
+
+    def __init__(self, insert_fn=insertar_resultados, flush_size=FLUSH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, max_pending=MAX_PENDING, retry_delay=RETRY_DELAY):
+        self._insert = insert_fn
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.retry_delay = retry_delay
+
+        self._buffer = []       # entradas (fila, intentos, nonce), ver _entradas
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._stats = {"accepted": 0, "flushed_rows": 0, "flushes": 0, "flush_errors": 0,
+                       "overflow": 0, "rejected_rows": 0, "spooled_rows": 0}
+
+    # ---------- ciclo de vida ----------
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="result-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=30):
+        """
+        Detiene el hilo después de escribir todo lo pendiente. Lo que no se
+        pudo escribir (BD caída) se vuelca a SPOOL_DIR y se reenvía al
+        próximo arranque (reenviar_pendientes).
+        """
+        with self._cond:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stopping = True
+            self._cond.notify_all()
+        thread.join(timeout)
+        with self._cond:
+            self._thread = None
+            self._volcar_pendiente()
+
+    def _volcar_pendiente(self):
+        # Con self._cond tomado
+        if not self._buffer:
+            return
+        entradas = self._buffer
+        rows, intentos = _separar(entradas)
+        try:
+            path = volcar_a_disco(entradas)
+        except OSError as e:
+            log.error("Write-behind detenido: no se pudieron guardar %d resultado(s) y %d intento(s) "
+                      "sin escribir: %s", len(rows), len(intentos), e)
+            return
+        self._buffer = []
+        self._stats["spooled_rows"] += len(rows)
+        log.warning("Write-behind detenido con %d resultado(s) sin escribir: guardados en %s", len(rows), path)
+
+    # ---------- productor ----------
+    def submit(self, rows, intentos=(), nonce=None):
+        """
+        Encola filas con sus intentos. `nonce` es el del ejercicio corregido
+        (reclamar_ejercicio), para liberarlo si la fila resulta inválida.
+        Devuelve False si el buffer está lleno; en ese caso quien llama
+        debe insertarlas directamente.
+        """
+        self.start()
+        entradas = _entradas(rows, intentos, nonce)
+        with self._cond:
+            if len(self._buffer) + len(entradas) > self.max_pending:
+                self._stats["overflow"] += 1
+                return False
+            self._buffer.extend(entradas)
+            self._stats["accepted"] += len(rows)
+            if len(self._buffer) >= self.flush_size:
+                self._cond.notify()
+        return True
+
+    # ---------- consumidor ----------
+    def _run(self):
+        failures_while_stopping = 0
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._stopping and len(self._buffer) < self.flush_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                if self._stopping and not self._buffer:
+                    return
+                # Solo los intentos de las filas del lote: el resto sigue en el buffer con las suyas
+                batch = self._buffer[:self.flush_size]
+                del self._buffer[:len(batch)]
+
+            if not batch:
+                continue
+
+            try:
+                self._insert(*_separar(batch))
+            except pymysql.err.IntegrityError:
+                # Una fila inválida (ej. id_usuario inexistente) no debe bloquear al resto
+                self._insert_one_by_one(batch)
+                continue
+            except Exception as e:
+                log.warning("Error escribiendo lote de resultados, se reintentará: %s", e)
+                self._requeue(batch)
+                with self._cond:
+                    stopping = self._stopping
+                if stopping:
+                    # Al apagar se reintenta unas pocas veces y luego stop() vuelca lo pendiente a disco
+                    failures_while_stopping += 1
+                    if failures_while_stopping >= STOP_RETRIES:
+                        return
+                time.sleep(self.retry_delay)
+                continue
+
+            with self._cond:
+                self._stats["flushes"] += 1
+                self._stats["flushed_rows"] += _contar_filas(batch)
+
+    def _requeue(self, batch):
+        with self._cond:
+            # Vuelven al inicio del buffer para conservar el orden
+            self._buffer[:0] = batch
+            self._stats["flush_errors"] += 1
+            if self._thread is None:
+                # stop() ya terminó (venció su timeout): nadie más las va a escribir
+                self._volcar_pendiente()
+
+    def _insert_one_by_one(self, batch):
+        written, rejected, rest = _escribir_de_a_uno(batch, self._insert)
+        if rest:
+            # Falla de conexión: lo que falta vuelve al buffer para reintentarse
+            self._requeue(rest)
+        with self._cond:
+            self._stats["flushed_rows"] += written
+            self._stats["rejected_rows"] += rejected
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["pending"] = _contar_filas(self._buffer)
+            stats["pending_intentos"] = sum(len(intentos) for _, intentos, _ in self._buffer)
+            stats["running"] = self._thread is not None
+        stats["enabled"] = WRITE_BEHIND_ENABLED
+        return stats
+
+
+writer = ResultWriter()
+atexit.register(writer.stop)
+
+
+def registrar_resultados(rows, intentos=(), nonce=None):
+    """
+    Punto de entrada para guardar resultados (y sus intentos por pregunta).
+    `nonce` es el del ejercicio corregido, si lo hay (ver ResultWriter.submit).
+    Devuelve True si quedaron en el buffer (write-behind) y False si ya se
+    escribieron en la BD.
+    """
+    if WRITE_BEHIND_ENABLED and writer.submit(rows, intentos, nonce):
+        return True
+    insertar_resultados(rows, intentos)
+    return False
@@ -0,0 +1,69 @@
+import decimal
+from datetime import date, datetime, timezone
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:     # opcional: sin el paquete se usa el json de Flask
+    orjson = None
+
+# ============================================================
+#   SERIALIZACIÓN JSON RÁPIDA (ORJSON)
+# ============================================================
+# Las listas de filas que devuelve fetchall() (historial, estadísticas)
+# se serializan con orjson, bastante más rápido que el módulo json.
+# La salida es la misma que con el proveedor de Flask: claves ordenadas y
+# fechas en formato HTTP ("Sun, 18 Oct 2026 11:52:43 GMT"), así el
+# frontend no nota el cambio.
+
+_DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def _http_date(value):
+    # Igual que werkzeug.http.http_date (las fechas sin zona se toman como UTC), pero sin email.utils
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        h, m, s = value.hour, value.minute, value.second
+    else:
+        h = m = s = 0
+    return (f"{_DAYS[value.weekday()]}, {value.day:02d} {_MONTHS[value.month - 1]} "
+            f"{value.year:04d} {h:02d}:{m:02d}:{s:02d} GMT")
+
+
+def _default(value):
+    if isinstance(value, date):
+        return _http_date(value)
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return DefaultJSONProvider.default(value)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Proveedor JSON de Flask respaldado por orjson (misma salida que el por defecto)."""
+
+    _OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+                | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_SUBCLASS) if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        option = self._OPTIONS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option).decode("utf-8")
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self._OPTIONS
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        # Directo a bytes: sin pasar por str
+        body = orjson.dumps(obj, default=_default, option=option | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def instalar(app):
+    """Usa orjson en `app` si está instalado."""
+    if orjson is not None:
+        app.json = FastJSONProvider(app)
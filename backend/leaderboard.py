@@ -0,0 +1,380 @@
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from config import env_int
+from db import pool
+
+# ============================================================
+#   RANKINGS EN MEMORIA POR MÓDULO Y DIFICULTAD (SEMANAL E HISTÓRICO)
+# ============================================================
+# Puntaje de un alumno en un módulo y dificultad = suma de los puntajes (%)
+# de sus resultados, cada uno acotado a 0-100: premia practicar y acertar.
+# Solo cuentan los resultados corregidos en el servidor (/api/exercise-grade,
+# columna 'corregido'): el puntaje que manda el cliente en /api/exercise-result
+# o en un lote no se puede verificar. Cada uno trae su dificultad, así un
+# alumno de nivel básico no compite con uno avanzado. Por cada módulo y
+# dificultad hay dos tablas:
+#   - "all":  histórico
+#   - "week": semana en curso (desde el lunes 00:00); al cambiar la semana
+#             la tabla se descarta entera y empieza vacía
+#
+# Cada tabla guarda los puntajes en una skip list indexable ordenada por
+# (-puntaje, id_usuario): sumar puntos, el top-N y "mi posición" cuestan
+# O(log n) sin volver a agrupar la tabla 'resultados'.
+#
+# Al arrancar se arma todo desde la BD (progreso_usuario para el
+# histórico, resultados de la semana para el semanal). Después se leen solo
+# los resultados nuevos por id_resultado (marca de agua): tras cada INSERT
+# de este proceso y cada LEADERBOARD_REFRESH segundos para ver los que
+# escribieron otros workers. Los ids que faltan se reintentan un rato por
+# si su transacción todavía no había confirmado.
+
+LEADERBOARD_REFRESH = env_int("LEADERBOARD_REFRESH", 10)   # segundos entre lecturas de resultados nuevos
+LEADERBOARD_TOP_MAX = 100
+GAP_TTL = 60            # segundos que se espera un id_resultado faltante
+MAX_GAPS = 1000
+
+PERIODOS = ("all", "week")
+DIFICULTADES = ("basico", "intermedio", "avanzado")     # progress.NIVELES
+PUNTAJE_MAX = 100
+
+
+def acotar(puntaje):
+    """Puntaje que suma al ranking: entre 0 y PUNTAJE_MAX aunque el resultado diga otra cosa."""
+    return min(max(int(puntaje), 0), PUNTAJE_MAX)
+
+
+class SkipList:
+    """
+    Conjunto ordenado de claves con acceso por posición (skip list indexable):
+    add, remove, bisect_left y slice en O(log n) esperado.
+    """
+
+    MAX_LEVEL = 24      # suficiente para ~16 millones de claves
+
+    class _Node:
+        __slots__ = ("key", "next", "width")
+
+        def __init__(self, key, level):
+            self.key = key
+            self.next = [None] * level
+            self.width = [1] * level    # posiciones que avanza cada enlace
+
+    def __init__(self):
+        self._head = self._Node(None, self.MAX_LEVEL)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _random_level(self):
+        level = 1
+        while level < self.MAX_LEVEL and random.random() < 0.5:
+            level += 1
+        return level
+
+    def _path(self, key):
+        """Último nodo con clave < key en cada nivel y cuántas posiciones se avanzó en cada uno."""
+        chain = [None] * self.MAX_LEVEL
+        steps = [0] * self.MAX_LEVEL
+        node = self._head
+        for i in reversed(range(self.MAX_LEVEL)):
+            while node.next[i] is not None and node.next[i].key < key:
+                steps[i] += node.width[i]
+                node = node.next[i]
+            chain[i] = node
+        return chain, steps
+
+    def add(self, key):
+        chain, steps = self._path(key)
+        level = self._random_level()
+        new = self._Node(key, level)
+        advanced = 0
+        for i in range(level):
+            prev = chain[i]
+            new.next[i] = prev.next[i]
+            prev.next[i] = new
+            new.width[i] = prev.width[i] - advanced
+            prev.width[i] = advanced + 1
+            advanced += steps[i]
+        for i in range(level, self.MAX_LEVEL):
+            chain[i].width[i] += 1
+        self._size += 1
+
+    def remove(self, key):
+        chain, _ = self._path(key)
+        target = chain[0].next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+        for i in range(len(target.next)):
+            prev = chain[i]
+            prev.width[i] += target.width[i] - 1
+            prev.next[i] = target.next[i]
+        for i in range(len(target.next), self.MAX_LEVEL):
+            chain[i].width[i] -= 1
+        self._size -= 1
+
+    def bisect_left(self, key):
+        """Cantidad de claves menores que `key`."""
+        node = self._head
+        position = 0
+        for i in reversed(range(self.MAX_LEVEL)):
+            while node.next[i] is not None and node.next[i].key < key:
+                position += node.width[i]
+                node = node.next[i]
+        return position
+
+    def slice(self, start, stop):
+        """Claves en las posiciones [start, stop)."""
+        if start >= min(stop, self._size):
+            return []
+        node = self._head
+        position = 0
+        target = start + 1      # la cabeza ocupa la posición 0
+        for i in reversed(range(self.MAX_LEVEL)):
+            while node.next[i] is not None and position + node.width[i] <= target:
+                position += node.width[i]
+                node = node.next[i]
+        keys = []
+        while node is not None and len(keys) < stop - start:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+
+class _Tabla:
+    """Puntajes de un módulo y dificultad en un período."""
+
+    def __init__(self, desde=None):
+        self.desde = desde          # inicio de la semana (None en el histórico)
+        self.puntajes = {}          # id_usuario -> (puntaje, intentos)
+        self.orden = SkipList()     # claves (-puntaje, id_usuario)
+
+    def sumar(self, id_usuario, puntos, intentos=1):
+        puntaje, previos = self.puntajes.get(id_usuario, (0, 0))
+        if previos:
+            self.orden.remove((-puntaje, id_usuario))
+        puntaje += puntos
+        self.puntajes[id_usuario] = (puntaje, previos + intentos)
+        self.orden.add((-puntaje, id_usuario))
+
+    def posicion(self, puntaje):
+        # Empates comparten puesto (1, 2, 2, 4): 1 + cuántos tienen más puntaje
+        return self.orden.bisect_left((-puntaje, float("-inf"))) + 1
+
+    def top(self, n):
+        filas = []
+        for neg_puntaje, id_usuario in self.orden.slice(0, n):
+            puntaje = -neg_puntaje
+            if filas and filas[-1][2] == puntaje:
+                rank = filas[-1][0]
+            else:
+                rank = len(filas) + 1
+            filas.append((rank, id_usuario, puntaje, self.puntajes[id_usuario][1]))
+        return filas
+
+
+def inicio_semana(ahora=None):
+    """Lunes 00:00 de la semana de `ahora` (hora local, como la columna fecha)."""
+    ahora = ahora or datetime.now()
+    lunes = ahora - timedelta(days=ahora.weekday())
+    return lunes.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class Leaderboard:
+    def __init__(self, refresh=LEADERBOARD_REFRESH):
+        self.refresh = refresh
+        self._lock = threading.Lock()           # protege las tablas
+        self._sync_lock = threading.Lock()      # una sola lectura de la BD a la vez
+        self._tablas = {}                       # (id_nivel, dificultad, periodo) -> _Tabla
+        self._nombres = {}                      # id_usuario -> nombre_usuario
+        self._ultimo_id = None                  # None = nunca cargado
+        self._faltantes = {}                    # id_resultado -> cuándo se notó que faltaba
+        self._synced_at = 0.0
+        self._dirty = False
+        self._stats = {"loads": 0, "syncs": 0, "rows_applied": 0, "sync_errors": 0, "rollovers": 0}
+
+    # ---------- tablas ----------
+    def _tabla(self, id_nivel, dificultad, periodo):
+        key = (id_nivel, dificultad, periodo)
+        tabla = self._tablas.get(key)
+        if periodo == "week":
+            desde = inicio_semana()
+            if tabla is None or tabla.desde != desde:
+                if tabla is not None:
+                    self._stats["rollovers"] += 1
+                tabla = self._tablas[key] = _Tabla(desde)
+        elif tabla is None:
+            tabla = self._tablas[key] = _Tabla()
+        return tabla
+
+    def _aplicar(self, rows):
+        """
+        Suma resultados nuevos (con id_resultado, id_usuario, id_nivel,
+        dificultad, corregido, puntaje, fecha, nombre_usuario); los que no
+        corrigió el servidor o no tienen dificultad no cuentan.
+        """
+        for row in rows:
+            if not row["corregido"] or row["dificultad"] not in DIFICULTADES:
+                continue
+            self._nombres[row["id_usuario"]] = row["nombre_usuario"]
+            puntos = acotar(row["puntaje"])
+            self._tabla(row["id_nivel"], row["dificultad"], "all").sumar(row["id_usuario"], puntos)
+            semana = self._tabla(row["id_nivel"], row["dificultad"], "week")
+            if row["fecha"] >= semana.desde:
+                semana.sumar(row["id_usuario"], puntos)
+        self._stats["rows_applied"] += len(rows)
+
+    # ---------- carga completa ----------
+    def load(self):
+        """Arma todas las tablas desde la BD (al arrancar)."""
+        desde = inicio_semana()
+        with self._sync_lock:
+            with pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    # Una transacción: las tres lecturas ven el mismo estado de la BD
+                    cursor.execute("BEGIN")
+                    cursor.execute("SELECT COALESCE(MAX(id_resultado), 0) AS ultimo FROM resultados")
+                    ultimo = cursor.fetchone()["ultimo"]
+
+                    # ranking_puntaje ya suma los puntajes acotados (progress.acumular)
+                    cursor.execute(
+                        """
+                        SELECT p.id_usuario, p.id_nivel, p.dificultad, p.ranking_intentos AS intentos,
+                               p.ranking_puntaje AS suma_puntaje, u.nombre_usuario
+                        FROM progreso_usuario p
+                        JOIN usuario u ON u.id = p.id_usuario
+                        WHERE p.ranking_intentos > 0
+                        """
+                    )
+                    historico = cursor.fetchall()
+
+                    cursor.execute(
+                        f"""
+                        SELECT id_usuario, id_nivel, dificultad, COUNT(*) AS intentos,
+                               SUM(CASE WHEN puntaje < 0 THEN 0 WHEN puntaje > {PUNTAJE_MAX} THEN {PUNTAJE_MAX}
+                                        ELSE puntaje END) AS suma_puntaje
+                        FROM resultados
+                        WHERE fecha >= %s AND id_resultado <= %s AND corregido = 1 AND dificultad IS NOT NULL
+                        GROUP BY id_usuario, id_nivel, dificultad
+                        """,
+                        (desde, ultimo)
+                    )
+                    semana = cursor.fetchall()
+                conn.rollback()
+
+            tablas = {}
+            for periodo, rows in (("all", historico), ("week", semana)):
+                for row in rows:
+                    if row["dificultad"] not in DIFICULTADES:
+                        continue
+                    key = (row["id_nivel"], row["dificultad"], periodo)
+                    if key not in tablas:
+                        tablas[key] = _Tabla(desde if periodo == "week" else None)
+                    tablas[key].sumar(row["id_usuario"], int(row["suma_puntaje"]), int(row["intentos"]))
+
+            with self._lock:
+                self._tablas = tablas
+                self._nombres = {row["id_usuario"]: row["nombre_usuario"] for row in historico}
+                self._ultimo_id = ultimo
+                self._faltantes = {}
+                self._synced_at = time.monotonic()
+                self._dirty = False
+                self._stats["loads"] += 1
+
+    # ---------- resultados nuevos ----------
+    def marcar_cambios(self):
+        """Llamado después de confirmar resultados: la próxima consulta los lee."""
+        self._dirty = True
+
+    def _necesita_sync(self):
+        return self._dirty or time.monotonic() - self._synced_at >= self.refresh
+
+    def sincronizar(self):
+        """Aplica los resultados con id_resultado mayor al último visto (y los faltantes)."""
+        if self._ultimo_id is None:
+            return self.load()
+        with self._sync_lock:
+            self._dirty = False
+            ahora = time.monotonic()
+            faltantes = [i for i, visto in self._faltantes.items() if ahora - visto < GAP_TTL]
+            sql = """
+                SELECT r.id_resultado, r.id_usuario, r.id_nivel, r.dificultad, r.corregido, r.puntaje, r.fecha,
+                       u.nombre_usuario
+                FROM resultados r
+                JOIN usuario u ON u.id = r.id_usuario
+                WHERE r.id_resultado > %s
+            """
+            params = [self._ultimo_id]
+            if faltantes:
+                sql += " OR r.id_resultado IN ({})".format(", ".join(["%s"] * len(faltantes)))
+                params += faltantes
+            with pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(sql + " ORDER BY r.id_resultado", params)
+                    rows = cursor.fetchall()
+
+            with self._lock:
+                vistos = {row["id_resultado"] for row in rows}
+                self._faltantes = {i: self._faltantes[i] for i in faltantes if i not in vistos}
+                nuevo_ultimo = max(vistos, default=self._ultimo_id)
+                # Ids salteados: una transacción que aún no confirma (o un rollback)
+                for i in range(self._ultimo_id + 1, nuevo_ultimo):
+                    if i not in vistos and len(self._faltantes) < MAX_GAPS:
+                        self._faltantes[i] = ahora
+                self._ultimo_id = nuevo_ultimo
+                self._aplicar(rows)
+                self._synced_at = ahora
+                self._stats["syncs"] += 1
+
+    def _al_dia(self):
+        if not self._necesita_sync():
+            return
+        try:
+            self.sincronizar()
+        except Exception as e:
+            with self._lock:
+                self._stats["sync_errors"] += 1
+                self._synced_at = time.monotonic()     # no reintentar en cada consulta
+                loaded = self._ultimo_id is not None
+            if not loaded:
+                raise
+            print("No se pudo actualizar el ranking, se usa la copia anterior:", e)
+
+    # ---------- consultas ----------
+    def _fila(self, rank, id_usuario, puntaje, intentos):
+        return {"rank": rank, "id_usuario": id_usuario, "nombre_usuario": self._nombres.get(id_usuario),
+                "score": puntaje, "intentos": intentos}
+
+    def top(self, id_nivel, dificultad, periodo, n=10):
+        """Los `n` primeros con su puesto (empates comparten puesto)."""
+        self._al_dia()
+        with self._lock:
+            tabla = self._tabla(id_nivel, dificultad, periodo)
+            return [self._fila(*fila) for fila in tabla.top(min(n, LEADERBOARD_TOP_MAX))], len(tabla.puntajes)
+
+    def posicion(self, id_nivel, dificultad, periodo, id_usuario):
+        """Puesto de un usuario o None si no tiene resultados en el período."""
+        self._al_dia()
+        with self._lock:
+            tabla = self._tabla(id_nivel, dificultad, periodo)
+            entrada = tabla.puntajes.get(id_usuario)
+            if entrada is None:
+                return None
+            return self._fila(tabla.posicion(entrada[0]), id_usuario, *entrada)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["boards"] = len(self._tablas)
+            stats["entries"] = sum(len(t.puntajes) for t in self._tablas.values())
+            stats["pending_gaps"] = len(self._faltantes)
+            stats["last_id"] = self._ultimo_id
+            stats["age"] = time.monotonic() - self._synced_at if self._ultimo_id is not None else None
+        return stats
+
+
+# Rankings compartidos por toda la aplicación
+leaderboard = Leaderboard()
@@ -0,0 +1,242 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from config import env_bool, env_int
+
+# ============================================================
+#   MÉTRICAS (FORMATO TEXTO DE PROMETHEUS) Y LOG DE ACCESO
+# ============================================================
+# Contadores e histogramas en memoria, sin dependencias externas.
+# /metrics los expone en el formato de texto de Prometheus. Con varios
+# workers de gunicorn cada proceso tiene sus propios valores (Prometheus
+# los distingue por la instancia que responde).
+#
+# Además cada petición acumula su propio desglose de tiempos (SQL, bcrypt,
+# generación de ejercicios) que va al log de acceso JSON y, si la petición
+# fue lenta, al header Server-Timing.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+ACCESS_LOG_JSON = env_bool("ACCESS_LOG_JSON", True)   # una línea JSON por petición
+TIMING_HEADER = env_bool("TIMING_HEADER", False)      # agrega Server-Timing a las peticiones lentas
+SLOW_REQUEST_MS = env_int("SLOW_REQUEST_MS", 500)     # desde cuántos ms una petición es lenta
+
+access_log = logging.getLogger("infinite_afo.access")
+if not access_log.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    access_log.addHandler(_handler)
+    access_log.setLevel(logging.INFO)
+    access_log.propagate = False
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+
+def _labels_text(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs += [f'{n}="{v}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines += self._render_items(items)
+        return lines
+
+    def _render_items(self, items):
+        return [f"{self.name}{_labels_text(self.labels, key)} {_fmt(value)}" for key, value in items]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # [conteo por bucket..., suma, total]
+                entry = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+                    break
+            entry[-2] += value
+            entry[-1] += 1
+
+    def _render_items(self, items):
+        lines = []
+        for key, entry in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry):
+                cumulative += count
+                labels = _labels_text(self.labels, key, [("le", _fmt(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels_text(self.labels, key, [('le', '+Inf')])} {entry[-1]}")
+            lines.append(f"{self.name}_sum{_labels_text(self.labels, key)} {_fmt(entry[-2])}")
+            lines.append(f"{self.name}_count{_labels_text(self.labels, key)} {entry[-1]}")
+        return lines
+
+
+# ---------- métricas de la aplicación ----------
+REGISTRY = []
+
+
+def _register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+http_requests = _register(Counter(
+    "http_requests_total", "Peticiones HTTP atendidas", ("method", "endpoint", "status")))
+http_latency = _register(Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP", ("method", "endpoint")))
+http_in_flight = _register(Gauge(
+    "http_requests_in_flight", "Peticiones HTTP en curso"))
+db_latency = _register(Histogram(
+    "db_query_duration_seconds", "Tiempo de cada sentencia SQL", ("operation",)))
+bcrypt_latency = _register(Histogram(
+    "bcrypt_duration_seconds", "Tiempo de bcrypt incluyendo la espera en la cola", ("operation",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)))
+generation_latency = _register(Histogram(
+    "exercise_generation_duration_seconds", "Tiempo generando ejercicios", ("module", "nivel", "mode")))
+rate_limited = _register(Counter(
+    "rate_limited_total", "Peticiones rechazadas con 429 por límite de frecuencia", ("rule",)))
+plot_latency = _register(Histogram(
+    "plot_render_duration_seconds", "Tiempo dibujando gráficos no cacheados, con la espera en la cola", ("format",)))
+
+
+def render(extra_gauges=()):
+    """
+    Texto para /metrics. `extra_gauges` son tuplas (nombre, ayuda, dict) con
+    valores leídos al momento (ej. stats del pool de conexiones).
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    for prefix, help_text, values in extra_gauges:
+        for key, value in sorted(values.items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"{prefix}_{key}"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {_fmt(value)}"]
+    return "\n".join(lines) + "\n"
+
+
+# ---------- desglose por petición ----------
+_local = threading.local()
+
+
+def begin_request():
+    _local.timings = {}
+
+
+def end_request():
+    timings = getattr(_local, "timings", None)
+    _local.timings = None
+    return timings or {}
+
+
+def _add_timing(kind, seconds):
+    timings = getattr(_local, "timings", None)
+    if timings is None:
+        return
+    total, count = timings.get(kind, (0.0, 0))
+    timings[kind] = (total + seconds, count + 1)
+
+
+def record(kind, histogram, seconds, **labels):
+    """Registra una duración en su histograma y en el desglose de la petición actual."""
+    histogram.observe(seconds, **labels)
+    _add_timing(kind, seconds)
+
+
+@contextmanager
+def timed(kind, histogram, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(kind, histogram, time.perf_counter() - start, **labels)
+
+
+def observe_query(sql, seconds):
+    """Llamado por db.TimedDictCursor después de cada sentencia."""
+    if isinstance(sql, (bytes, bytearray)):
+        # executemany arma el INSERT multi-fila ya codificado
+        sql = bytes(sql[:16]).decode("utf-8", "replace")
+    parts = sql.lstrip().split(None, 1)
+    operation = parts[0].upper() if parts else "OTHER"
+    if operation not in ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE"):
+        operation = "OTHER"
+    record("db", db_latency, seconds, operation=operation)
+
+
+def server_timing(total_seconds, timings):
+    """Valor del header Server-Timing: total y tiempo por tipo (SQL, bcrypt, generación)."""
+    parts = [f"app;dur={total_seconds * 1000:.1f}"]
+    for kind, (seconds, count) in sorted(timings.items()):
+        parts.append(f'{kind};dur={seconds * 1000:.1f};desc="{count}x"')
+    return ", ".join(parts)
+
+
+def log_access(entry):
+    if ACCESS_LOG_JSON:
+        access_log.info(json.dumps(entry, ensure_ascii=False, default=str))
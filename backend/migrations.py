@@ -0,0 +1,482 @@
+import argparse
+from datetime import date
+
+from db import DB_BACKEND, pool
+
+# ============================================================
+#   MIGRACIONES VERSIONADAS DEL ESQUEMA
+# ============================================================
+# 'schema_version' guarda qué migraciones ya se aplicaron. Cada migración
+# se puede volver a correr sin romper nada (revisa antes si la tabla,
+# columna o índice ya existe), porque en MySQL cada DDL confirma por su
+# cuenta y una migración cortada a la mitad queda aplicada en parte.
+#
+# Desde backend/:
+#     python migrations.py status
+#     python migrations.py upgrade
+#     python migrations.py partition      (opcional, solo MySQL, ver abajo)
+#
+# Con DB_BACKEND=sqlite las pendientes se aplican solas al arrancar la app
+# (son rápidas en una base chica); con MySQL se corren a mano y la app no
+# arranca mientras falte alguna.
+#
+# Particionar por mes 'resultados' e 'intentos' (versión 4) no es parte de
+# upgrade: borra todas las claves foráneas de esas dos tablas (MySQL no las
+# admite en tablas particionadas), cambia su clave primaria a (id, fecha) y
+# reescribe las tablas. Se pide a mano con 'partition'; sin particiones
+# archive.py mueve las filas con INSERT ... SELECT y DELETE.
+
+PARTICIONES_ADELANTE = 3    # meses futuros con partición creada de antemano
+
+
+def _mysql():
+    return DB_BACKEND != "sqlite"
+
+
+# ---------- inspección del esquema ----------
+def tiene_tabla(cursor, tabla):
+    if _mysql():
+        cursor.execute(
+            "SELECT 1 FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (tabla,)
+        )
+    else:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type IN ('table', 'view') AND name = %s", (tabla,))
+    return cursor.fetchone() is not None
+
+
+_tablas_vistas = set()     # una tabla que ya existe no desaparece con la app andando
+
+
+def existe_tabla(cursor, tabla):
+    """tiene_tabla recordando las que existen: para consultas que se hacen en cada petición."""
+    if tabla not in _tablas_vistas and tiene_tabla(cursor, tabla):
+        _tablas_vistas.add(tabla)
+    return tabla in _tablas_vistas
+
+
+def tiene_columna(cursor, tabla, columna):
+    if _mysql():
+        cursor.execute(
+            """
+            SELECT 1 FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+            """,
+            (tabla, columna)
+        )
+        return cursor.fetchone() is not None
+    cursor.execute(f"PRAGMA table_info({tabla})")
+    return any(row["name"] == columna for row in cursor.fetchall())
+
+
+def tiene_indice(cursor, tabla, indice):
+    if _mysql():
+        cursor.execute(
+            """
+            SELECT 1 FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+            """,
+            (tabla, indice)
+        )
+    else:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND name = %s",
+                       (tabla, indice))
+    return cursor.fetchone() is not None
+
+
+def crear_indice(cursor, tabla, indice, columnas):
+    if not tiene_indice(cursor, tabla, indice):
+        cursor.execute(f"CREATE INDEX {indice} ON {tabla} ({columnas})")
+
+
+def esta_particionada(cursor, tabla):
+    if not _mysql():
+        return False
+    cursor.execute(
+        """
+        SELECT COUNT(*) AS n FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        """,
+        (tabla,)
+    )
+    return cursor.fetchone()["n"] > 0
+
+
+def _compresion():
+    # Tablas de archivo comprimidas (InnoDB); SQLite no tiene compresión de páginas
+    return " ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8" if _mysql() else ""
+
+
+# ---------- particiones mensuales ----------
+def primer_dia(d):
+    return date(d.year, d.month, 1)
+
+
+def mes_siguiente(d):
+    return date(d.year + d.month // 12, d.month % 12 + 1, 1)
+
+
+def nombre_particion(mes):
+    return f"p{mes:%Y%m}"
+
+
+def definiciones_particiones(desde, hasta):
+    """'PARTITION pYYYYMM VALUES LESS THAN (...)' para cada mes de [desde, hasta]."""
+    partes = []
+    mes = primer_dia(desde)
+    while mes <= hasta:
+        partes.append(f"PARTITION {nombre_particion(mes)} VALUES LESS THAN ('{mes_siguiente(mes):%Y-%m-%d}')")
+        mes = mes_siguiente(mes)
+    return partes
+
+
+# ---------- migraciones ----------
+def _base(cursor):
+    """Lo que antes se agregaba a mano en bases ya creadas ('Para una base ya creada' en el .sql)."""
+    if not tiene_columna(cursor, "preguntas_ejercicio", "clave"):
+        cursor.execute("ALTER TABLE preguntas_ejercicio ADD COLUMN clave VARCHAR(100) NULL UNIQUE")
+    crear_indice(cursor, "intentos", "idx_intentos_pregunta", "id_pregunta, es_correcta")
+    crear_indice(cursor, "resultados", "idx_resultados_usuario_fecha",
+                 "id_usuario, fecha, id_resultado, id_nivel, id_ejercicio, puntaje, total_preguntas")
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS resumen_usuario_nivel (
+            id_usuario INT NOT NULL,
+            id_nivel INT NOT NULL,
+            intentos INT NOT NULL DEFAULT 0,
+            suma_puntaje BIGINT NOT NULL DEFAULT 0,
+            ultima_actividad TIMESTAMP NULL,
+            PRIMARY KEY (id_usuario, id_nivel),
+            FOREIGN KEY (id_usuario) REFERENCES usuario(id),
+            FOREIGN KEY (id_nivel) REFERENCES niveles(id_nivel)
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS progreso_usuario (
+            id_usuario INT NOT NULL,
+            id_nivel INT NOT NULL,
+            dificultad VARCHAR(20) NOT NULL,
+            intentos INT NOT NULL DEFAULT 0,
+            precision_ewma DOUBLE NOT NULL DEFAULT 0,
+            actualizado TIMESTAMP NULL,
+            PRIMARY KEY (id_usuario, id_nivel, dificultad),
+            FOREIGN KEY (id_usuario) REFERENCES usuario(id),
+            FOREIGN KEY (id_nivel) REFERENCES niveles(id_nivel)
+        )
+        """
+    )
+
+
+def _indices(cursor):
+    """Índices compuestos para las consultas que hace la app."""
+    # Rangos de fechas: ranking semanal (leaderboard.load), exportación por fechas,
+    # archivo por mes.
+    crear_indice(cursor, "resultados", "idx_resultados_fecha", "fecha, id_nivel, id_usuario, puntaje")
+    # /api/question-stats: intentos del usuario de la sesión agrupados por pregunta
+    crear_indice(cursor, "intentos", "idx_intentos_usuario", "id_usuario, id_pregunta, es_correcta")
+    # Rango de fechas en intentos (archivo por mes)
+    crear_indice(cursor, "intentos", "idx_intentos_fecha", "fecha_hora")
+
+
+def _archivo(cursor):
+    """Tablas de archivo (filas viejas, comprimidas) y agregados mensuales que siguen consultables."""
+    cursor.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS resultados_archivo (
+            id_resultado INT NOT NULL PRIMARY KEY,
+            id_usuario INT NOT NULL,
+            id_nivel INT NOT NULL,
+            id_ejercicio INT NULL,
+            puntaje INT NOT NULL,
+            total_preguntas INT NOT NULL,
+            fecha DATETIME NOT NULL
+        ){_compresion()}
+        """
+    )
+    crear_indice(cursor, "resultados_archivo", "idx_resultados_archivo_usuario", "id_usuario, fecha")
+    cursor.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS intentos_archivo (
+            id_intento INT NOT NULL PRIMARY KEY,
+            id_usuario INT NOT NULL,
+            id_pregunta INT NOT NULL,
+            id_opcion INT NULL,
+            respuesta_usuario VARCHAR(255) NULL,
+            es_correcta TINYINT NOT NULL,
+            fecha_hora DATETIME NULL
+        ){_compresion()}
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS resultados_mensual (
+            mes DATE NOT NULL,
+            id_usuario INT NOT NULL,
+            id_nivel INT NOT NULL,
+            intentos INT NOT NULL,
+            suma_puntaje BIGINT NOT NULL,
+            ultima_actividad DATETIME NULL,
+            PRIMARY KEY (mes, id_usuario, id_nivel)
+        )
+        """
+    )
+    crear_indice(cursor, "resultados_mensual", "idx_resultados_mensual_usuario", "id_usuario, id_nivel")
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS intentos_mensual (
+            mes DATE NOT NULL,
+            id_pregunta INT NOT NULL,
+            id_usuario INT NOT NULL,
+            intentos INT NOT NULL,
+            errores INT NOT NULL,
+            PRIMARY KEY (mes, id_pregunta, id_usuario)
+        )
+        """
+    )
+    crear_indice(cursor, "intentos_mensual", "idx_intentos_mensual_usuario", "id_usuario, id_pregunta")
+
+    # Historial mensual completo: meses vivos + meses ya archivados
+    if not tiene_tabla(cursor, "resultados_por_mes"):
+        mes = "CAST(DATE_FORMAT(fecha, '%%Y-%%m-01') AS DATE)" if _mysql() else "strftime('%Y-%m-01', fecha)"
+        cursor.execute(
+            f"""
+            CREATE VIEW resultados_por_mes AS
+            SELECT mes, id_usuario, id_nivel, SUM(intentos) AS intentos, SUM(suma_puntaje) AS suma_puntaje
+            FROM (
+                SELECT {mes} AS mes, id_usuario, id_nivel, COUNT(*) AS intentos, SUM(puntaje) AS suma_puntaje
+                FROM resultados
+                GROUP BY {mes}, id_usuario, id_nivel
+                UNION ALL
+                SELECT mes, id_usuario, id_nivel, intentos, suma_puntaje
+                FROM resultados_mensual
+            ) t
+            GROUP BY mes, id_usuario, id_nivel
+            """,
+            ()
+        )
+
+
+def _corregidos(cursor):
+    """Ejercicios que ya guardaron su resultado: cada token cuenta una sola vez (ver grading.py)."""
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ejercicios_corregidos (
+            nonce CHAR(16) NOT NULL PRIMARY KEY,
+            expira DATETIME NOT NULL
+        )
+        """
+    )
+    crear_indice(cursor, "ejercicios_corregidos", "idx_corregidos_expira", "expira")
+
+
+def _ranking_por_dificultad(cursor):
+    """
+    Dificultad en cada resultado y totales del ranking histórico por módulo
+    y dificultad (ver leaderboard.py). Los resultados anteriores no guardaban
+    la dificultad: el ranking por dificultad empieza vacío.
+    """
+    if not tiene_columna(cursor, "resultados", "dificultad"):
+        cursor.execute("ALTER TABLE resultados ADD COLUMN dificultad VARCHAR(20) NULL")
+    if not tiene_columna(cursor, "progreso_usuario", "ranking_intentos"):
+        cursor.execute("ALTER TABLE progreso_usuario ADD COLUMN ranking_intentos INT NOT NULL DEFAULT 0")
+    if not tiene_columna(cursor, "progreso_usuario", "ranking_puntaje"):
+        cursor.execute("ALTER TABLE progreso_usuario ADD COLUMN ranking_puntaje BIGINT NOT NULL DEFAULT 0")
+
+
+def _dificultad_archivo(cursor):
+    """El archivo guarda la dificultad de cada resultado igual que 'resultados' (migración 6)."""
+    if not tiene_columna(cursor, "resultados_archivo", "dificultad"):
+        cursor.execute("ALTER TABLE resultados_archivo ADD COLUMN dificultad VARCHAR(20) NULL")
+
+
+def _resultados_corregidos(cursor):
+    """
+    Marca de los resultados corregidos en el servidor (/api/exercise-grade):
+    el ranking suma solo esos, el puntaje que manda el cliente no cuenta.
+    Los totales del ranking histórico podían incluir puntajes del cliente
+    y no hay forma de separarlos: empiezan de cero.
+    """
+    for tabla in ("resultados", "resultados_archivo"):
+        if tiene_tabla(cursor, tabla) and not tiene_columna(cursor, tabla, "corregido"):
+            cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN corregido TINYINT NOT NULL DEFAULT 0")
+    cursor.execute("UPDATE progreso_usuario SET ranking_intentos = 0, ranking_puntaje = 0")
+
+
+def _claves_foraneas(cursor, tabla):
+    cursor.execute(
+        """
+        SELECT CONSTRAINT_NAME AS nombre FROM information_schema.TABLE_CONSTRAINTS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND CONSTRAINT_TYPE = 'FOREIGN KEY'
+        """,
+        (tabla,)
+    )
+    return [row["nombre"] for row in cursor.fetchall()]
+
+
+def _particionar(cursor, tabla, id_col, fecha_col, tipo_fecha):
+    if esta_particionada(cursor, tabla):
+        return
+    # MySQL no admite claves foráneas en tablas particionadas y la fecha
+    # tiene que ser parte de la clave primaria
+    for nombre in _claves_foraneas(cursor, tabla):
+        cursor.execute(f"ALTER TABLE {tabla} DROP FOREIGN KEY {nombre}")
+    cursor.execute(f"UPDATE {tabla} SET {fecha_col} = CURRENT_TIMESTAMP WHERE {fecha_col} IS NULL")
+    cursor.execute(
+        f"""
+        ALTER TABLE {tabla}
+            MODIFY {fecha_col} {tipo_fecha} NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            DROP PRIMARY KEY,
+            ADD PRIMARY KEY ({id_col}, {fecha_col})
+        """
+    )
+    cursor.execute(f"SELECT MIN({fecha_col}) AS desde FROM {tabla}")
+    primera = cursor.fetchone()["desde"]
+    hoy = date.today()
+    hasta = primer_dia(hoy)
+    for _ in range(PARTICIONES_ADELANTE):
+        hasta = mes_siguiente(hasta)
+    partes = definiciones_particiones(min(primera.date(), hoy) if primera else hoy, hasta)
+    partes.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+    cursor.execute(
+        f"ALTER TABLE {tabla} PARTITION BY RANGE COLUMNS({fecha_col}) ({', '.join(partes)})"
+    )
+
+
+def _particiones(cursor):
+    """Particiones por mes en resultados e intentos (solo MySQL; SQLite no particiona)."""
+    if not _mysql():
+        return
+    # DATETIME: RANGE COLUMNS no admite TIMESTAMP (la app siempre guarda hora local)
+    _particionar(cursor, "resultados", "id_resultado", "fecha", "DATETIME")
+    _particionar(cursor, "intentos", "id_intento", "fecha_hora", "DATETIME")
+
+
+MIGRACIONES = [
+    (1, "base: clave de preguntas, resumen y progreso", _base),
+    (2, "índices compuestos de resultados e intentos", _indices),
+    (3, "tablas de archivo y agregados mensuales", _archivo),
+    # 4: particiones, opcional (PARTICIONES, ver encabezado)
+    (5, "ejercicios ya corregidos (un resultado por token)", _corregidos),
+    (6, "dificultad en resultados y ranking por dificultad", _ranking_por_dificultad),
+    (7, "dificultad en el archivo de resultados", _dificultad_archivo),
+    (8, "ranking solo con resultados corregidos en el servidor", _resultados_corregidos),
+]
+
+# Se aplica solo con 'python migrations.py partition'
+PARTICIONES = (4, "particiones mensuales de resultados e intentos", _particiones)
+
+
+# ---------- ejecución ----------
+def _asegurar_tabla_version(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT NOT NULL PRIMARY KEY,
+            descripcion VARCHAR(100) NOT NULL,
+            aplicada TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+
+def aplicadas():
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            _asegurar_tabla_version(cursor)
+            cursor.execute("SELECT version FROM schema_version")
+            versiones = {row["version"] for row in cursor.fetchall()}
+        conn.commit()
+    return versiones
+
+
+def pendientes():
+    hechas = aplicadas()
+    return [(v, desc) for v, desc, _ in MIGRACIONES if v not in hechas]
+
+
+def _aplicar(version, descripcion, migrar, verbose):
+    if verbose:
+        print(f"Aplicando migración {version}: {descripcion}")
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            migrar(cursor)
+            cursor.execute(
+                "INSERT INTO schema_version (version, descripcion) VALUES (%s, %s)",
+                (version, descripcion)
+            )
+        conn.commit()
+
+
+def upgrade(verbose=True):
+    """Aplica en orden las migraciones que falten (sin las particiones). Devuelve cuántas aplicó."""
+    hechas = aplicadas()
+    cuenta = 0
+    for version, descripcion, migrar in MIGRACIONES:
+        if version in hechas:
+            continue
+        _aplicar(version, descripcion, migrar, verbose)
+        cuenta += 1
+    return cuenta
+
+
+def particionar(verbose=True):
+    """Aplica la migración opcional de particiones (solo MySQL). False si ya estaba aplicada."""
+    if not _mysql():
+        raise ValueError("SQLite no admite particiones")
+    version, descripcion, migrar = PARTICIONES
+    if version in aplicadas():
+        return False
+    _aplicar(version, descripcion, migrar, verbose)
+    return True
+
+
+class MigracionesPendientes(RuntimeError):
+    """La base MySQL no tiene todas las migraciones: la app no debe arrancar."""
+
+
+def revisar_al_arrancar():
+    """
+    SQLite: aplica lo pendiente. MySQL: si falta alguna migración lanza
+    MigracionesPendientes; la app fallaría igual en cada consulta que use
+    una columna nueva (catálogo, guardar resultados).
+    """
+    if not _mysql():
+        upgrade(verbose=False)
+        return
+    faltan = pendientes()
+    if faltan:
+        versiones = ", ".join(str(v) for v, _ in faltan)
+        raise MigracionesPendientes(
+            f"Migraciones pendientes ({versiones}): ejecutar 'python migrations.py upgrade' desde backend/"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migraciones del esquema")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="versiones aplicadas y pendientes")
+    sub.add_parser("upgrade", help="aplicar las migraciones pendientes")
+    sub.add_parser("partition", help="particionar por mes resultados e intentos (opcional, solo MySQL; "
+                                     "borra sus claves foráneas)")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        hechas = aplicadas()
+        for version, descripcion, _ in sorted(MIGRACIONES + [PARTICIONES]):
+            if version == PARTICIONES[0]:
+                estado = "aplicada " if version in hechas else "opcional "
+            else:
+                estado = "aplicada " if version in hechas else "pendiente"
+            print(f"{version:>3}  {estado}  {descripcion}")
+    elif args.command == "upgrade":
+        n = upgrade()
+        print(f"{n} migración(es) aplicada(s)" if n else "El esquema ya está al día")
+    elif args.command == "partition":
+        try:
+            hecho = particionar()
+        except ValueError as e:
+            print(e)
+        else:
+            print("Particiones creadas" if hecho else "resultados e intentos ya estaban particionadas")
@@ -0,0 +1,428 @@
+import hashlib
+import html
+import io
+import json
+import math
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from config import env_int, env_str
+from metrics import plot_latency, timed
+
+try:
+    from matplotlib.figure import Figure
+except ImportError:     # opcional: sin matplotlib solo se ofrece SVG
+    Figure = None
+
+# ============================================================
+#   GRÁFICOS DE LAS FUNCIONES DE LOS EJERCICIOS (SVG / PNG)
+# ============================================================
+# Cada ejercicio generado describe su función con generator.curve(p)
+# (solo números: coeficientes, ω, φ...). La imagen depende únicamente de
+# esos números, así que se guarda con el hash de ellos como nombre:
+#   1. caché LRU en memoria (por proceso, acotada en bytes)
+#   2. caché LRU en disco (PLOT_CACHE_DIR, compartida por los workers;
+#      se descartan los archivos usados hace más tiempo)
+#   3. si no está, se dibuja en un pool de procesos (dibujar es CPU puro y
+#      no libera el GIL). Dos pedidos simultáneos del mismo gráfico esperan
+#      el mismo dibujo; con la cola llena se responde 503 (PlotsOverloaded).
+#
+# SVG se dibuja a mano (sin dependencias); PNG necesita matplotlib.
+
+PLOT_CACHE_DIR = env_str("PLOT_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "plot_cache"))
+PLOT_CACHE_DISK_MB = env_int("PLOT_CACHE_DISK_MB", 256)      # 0 = sin caché en disco
+PLOT_CACHE_MEMORY_MB = env_int("PLOT_CACHE_MEMORY_MB", 16)   # por proceso
+PLOT_WORKERS = env_int("PLOT_WORKERS", 2)                    # procesos de dibujo; 0 = en el hilo de la petición
+PLOT_QUEUE_LIMIT = max(1, PLOT_WORKERS) * 8                  # dibujos en curso + en espera
+PLOT_TIMEOUT = 10                                            # segundos máximos esperando un dibujo
+PLOT_RETRY_AFTER = 2                                         # valor del header Retry-After
+
+RENDER_VERSION = 1      # subir al cambiar el dibujo: las imágenes viejas dejan de coincidir
+
+ANCHO, ALTO = 560, 320
+MARGENES = (56, 16, 32, 44)     # izquierda, derecha, arriba, abajo (px)
+MUESTRAS = 240                  # puntos de la curva
+COLOR = "#0d6efd"
+
+EJES = {
+    "quadratic": ("t (s)", "h (m)", "h"),
+    "sinusoid": ("t (s)", "x (cm)", "x"),
+}
+
+FORMATOS = {"svg": "image/svg+xml"}
+if Figure is not None:
+    FORMATOS["png"] = "image/png"
+
+
+class InvalidPlot(ValueError):
+    """Formato o función que no se puede graficar."""
+
+
+class PlotsOverloaded(Exception):
+    """La cola de dibujo está llena; el cliente debe reintentar más tarde."""
+
+    retry_after = PLOT_RETRY_AFTER
+
+
+def clave(curva, formato):
+    """Hash de los parámetros de la función: el mismo gráfico, la misma clave."""
+    datos = json.dumps(curva, sort_keys=True, separators=(",", ":")) + f"|{formato}|{RENDER_VERSION}"
+    return hashlib.blake2b(datos.encode("utf-8"), digest_size=16).hexdigest()
+
+
+# ---------- dibujo ----------
+def muestrear(curva, n=MUESTRAS):
+    """(t, y) de la función: hasta que toca el suelo (parábola) o dos periodos (senoidal)."""
+    if curva["kind"] == "quadratic":
+        a, b, c = curva["a"], curva["b"], curva["c"]
+        D = b * b - 4 * a * c
+        fin = (-b - math.sqrt(D)) / (2 * a) if a and D >= 0 else 0
+        t = np.linspace(0, fin if fin > 0 else 1, n)
+        return t, a * t ** 2 + b * t + c
+    if curva["kind"] == "sinusoid":
+        w = curva["w"]
+        t = np.linspace(0, 2 * (2 * math.pi / w), n)
+        return t, curva["sin"] * np.sin(w * t + curva["phi"]) + curva["cos"] * np.cos(w * t) + curva["offset"]
+    raise InvalidPlot(f"Función desconocida: {curva['kind']}")
+
+
+def formula(curva):
+    """Mismo texto que el enunciado del ejercicio, ej. 'h(t) = -4.5t² + 20.3t'."""
+    if curva["kind"] == "quadratic":
+        texto = f"h(t) = {curva['a']}t² + {curva['b']}t"
+        return texto + (f" + {curva['c']}" if curva["c"] else "")
+    w = round(curva["w"], 3)
+    fase = f" + {round(curva['phi'], 3)}" if curva["phi"] else ""
+    texto = f"x(t) = {curva['sin']}·sin({w}t{fase})"
+    if curva["cos"]:
+        texto += f" + {curva['cos']}·cos({w}t)"
+    if curva["offset"]:
+        texto += f" + {curva['offset']}"
+    return texto
+
+
+def _marcas(lo, hi, n=6):
+    """Valores 'redondos' (1, 2, 2.5, 5 × 10^k) para las marcas de un eje."""
+    crudo = (hi - lo) / n
+    magnitud = 10 ** math.floor(math.log10(crudo))
+    paso = next(m * magnitud for m in (1, 2, 2.5, 5, 10) if m * magnitud >= crudo)
+    primera = math.ceil(lo / paso) * paso
+    return [round(primera + i * paso, 10) for i in range(int((hi - primera) / paso + 1e-9) + 1)]
+
+
+def _rango(t, y):
+    y0, y1 = min(float(y.min()), 0.0), max(float(y.max()), 0.0)
+    margen = (y1 - y0) * 0.08 or 1.0
+    return float(t[0]), float(t[-1]), y0 - margen, y1 + margen
+
+
+def _svg(curva):
+    t, y = muestrear(curva)
+    x0, x1, y0, y1 = _rango(t, y)
+    izq, der, arriba, abajo = MARGENES
+    ancho, alto = ANCHO - izq - der, ALTO - arriba - abajo
+
+    def px(v):
+        return izq + (v - x0) / (x1 - x0) * ancho
+
+    def py(v):
+        return arriba + (y1 - v) / (y1 - y0) * alto
+
+    eje_x, eje_y, _ = EJES[curva["kind"]]
+    partes = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{ANCHO}" height="{ALTO}" '
+        f'viewBox="0 0 {ANCHO} {ALTO}" font-family="sans-serif" font-size="11">',
+        f'<rect width="{ANCHO}" height="{ALTO}" fill="#fff"/>',
+    ]
+    for v in _marcas(x0, x1):
+        x = px(v)
+        partes.append(f'<line x1="{x:.1f}" y1="{arriba}" x2="{x:.1f}" y2="{arriba + alto}" stroke="#e5e7eb"/>')
+        partes.append(f'<text x="{x:.1f}" y="{arriba + alto + 16}" text-anchor="middle">{v:g}</text>')
+    for v in _marcas(y0, y1):
+        y_ = py(v)
+        partes.append(f'<line x1="{izq}" y1="{y_:.1f}" x2="{izq + ancho}" y2="{y_:.1f}" stroke="#e5e7eb"/>')
+        partes.append(f'<text x="{izq - 6}" y="{y_ + 4:.1f}" text-anchor="end">{v:g}</text>')
+    # Ejes: t = 0 y la línea del cero (el suelo, o el equilibrio de la oscilación)
+    partes.append(f'<line x1="{izq}" y1="{py(0):.1f}" x2="{izq + ancho}" y2="{py(0):.1f}" stroke="#6b7280"/>')
+    partes.append(f'<line x1="{px(0):.1f}" y1="{arriba}" x2="{px(0):.1f}" y2="{arriba + alto}" stroke="#6b7280"/>')
+
+    xs = izq + (t - x0) / (x1 - x0) * ancho
+    ys = arriba + (y1 - y) / (y1 - y0) * alto
+    puntos = " ".join(f"{a:.1f},{b:.1f}" for a, b in zip(xs.tolist(), ys.tolist()))
+    partes.append(f'<polyline points="{puntos}" fill="none" stroke="{COLOR}" stroke-width="2.5" '
+                  f'stroke-linejoin="round"/>')
+
+    partes.append(f'<text x="{izq}" y="{arriba - 12}" font-size="13">{html.escape(formula(curva))}</text>')
+    partes.append(f'<text x="{izq + ancho}" y="{ALTO - 6}" text-anchor="end">{eje_x}</text>')
+    partes.append(f'<text x="14" y="{arriba + alto / 2:.1f}" text-anchor="middle" '
+                  f'transform="rotate(-90 14 {arriba + alto / 2:.1f})">{eje_y}</text>')
+    partes.append("</svg>")
+    return "\n".join(partes).encode("utf-8")
+
+
+def _png(curva):
+    t, y = muestrear(curva)
+    eje_x, eje_y, _ = EJES[curva["kind"]]
+    fig = Figure(figsize=(ANCHO / 100, ALTO / 100), dpi=100)
+    ax = fig.add_subplot()
+    ax.plot(t, y, color=COLOR, linewidth=2.5)
+    ax.axhline(0, color="#6b7280", linewidth=0.8)
+    ax.grid(True, color="#e5e7eb")
+    ax.set_xlabel(eje_x)
+    ax.set_ylabel(eje_y)
+    ax.set_title(formula(curva), loc="left", fontsize=11)
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+def renderizar(curva, formato):
+    """Bytes de la imagen. Corre en los procesos del pool (debe ser una función de módulo)."""
+    return _png(curva) if formato == "png" else _svg(curva)
+
+
+# ---------- cachés ----------
+class _MemoriaLRU:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                return
+            self._items[key] = data
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                _, viejo = self._items.popitem(last=False)
+                self._bytes -= len(viejo)
+
+    def stats(self):
+        with self._lock:
+            return {"memory_entries": len(self._items), "memory_bytes": self._bytes}
+
+
+class _DiscoLRU:
+    """
+    Un archivo por imagen (<dir>/<2 primeros caracteres>/<clave>.<formato>).
+    La fecha de modificación se actualiza en cada lectura y al pasarse del
+    tamaño máximo se borran los más viejos hasta quedar en el 90 %.
+    """
+
+    def __init__(self, directorio, max_bytes):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self._bytes = None      # se mide en la primera escritura
+        self._lock = threading.Lock()
+
+    def _ruta(self, key, formato):
+        return os.path.join(self.directorio, key[:2], f"{key}.{formato}")
+
+    def get(self, key, formato):
+        if self.max_bytes <= 0:
+            return None
+        ruta = self._ruta(key, formato)
+        try:
+            with open(ruta, "rb") as f:
+                data = f.read()
+            os.utime(ruta)
+        except OSError:
+            return None
+        return data
+
+    def put(self, key, formato, data):
+        if self.max_bytes <= 0:
+            return
+        ruta = self._ruta(key, formato)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            with open(temporal, "wb") as f:
+                f.write(data)
+            os.replace(temporal, ruta)      # otro worker nunca lee un archivo a medio escribir
+        except OSError as e:
+            print("No se pudo guardar el gráfico en disco:", e)
+            return
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(tamano for _, tamano, _ in self._archivos())
+            else:
+                self._bytes += len(data)
+            if self._bytes > self.max_bytes:
+                self._podar()
+
+    def _archivos(self):
+        for carpeta in os.scandir(self.directorio):
+            if not carpeta.is_dir():
+                continue
+            for archivo in os.scandir(carpeta.path):
+                if archivo.name.endswith(".tmp"):
+                    continue
+                try:
+                    st = archivo.stat()
+                except OSError:
+                    continue
+                yield st.st_mtime, st.st_size, archivo.path
+
+    def _podar(self):
+        # Se vuelve a medir el disco: otros workers también escriben en la carpeta
+        archivos = sorted(self._archivos())
+        total = sum(tamano for _, tamano, _ in archivos)
+        objetivo = self.max_bytes * 0.9
+        for _, tamano, ruta in archivos:
+            if total <= objetivo:
+                break
+            try:
+                os.remove(ruta)
+                total -= tamano
+            except OSError:
+                pass
+        self._bytes = total
+
+    def stats(self):
+        with self._lock:
+            return {"disk_bytes": self._bytes or 0, "disk_max_bytes": self.max_bytes}
+
+
+# ---------- renderizador ----------
+class PlotRenderer:
+    def __init__(self, workers=PLOT_WORKERS, queue_limit=PLOT_QUEUE_LIMIT, timeout=PLOT_TIMEOUT,
+                 directorio=PLOT_CACHE_DIR, disco_mb=PLOT_CACHE_DISK_MB, memoria_mb=PLOT_CACHE_MEMORY_MB):
+        self.workers = workers
+        self.timeout = timeout
+        self.queue_limit = queue_limit
+        self._memoria = _MemoriaLRU(memoria_mb * 1024 * 1024)
+        self._disco = _DiscoLRU(directorio, disco_mb * 1024 * 1024)
+        self._executor = None
+        self._pid = None
+        self._slots = threading.BoundedSemaphore(queue_limit)
+        self._lock = threading.Lock()
+        self._en_curso = {}     # clave -> Future del dibujo que ya se está haciendo
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "renders": 0, "coalesced": 0, "rejected": 0}
+
+    def _pool(self):
+        # Uno por proceso, creado en el primer dibujo: los workers de gunicorn no
+        # heredan procesos hijos del maestro. 'spawn' porque el worker ya tiene hilos.
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+                self._pid = os.getpid()
+            return self._executor
+
+    def _terminar(self, key, formato, future, data=None, error=None):
+        self._slots.release()
+        if error is None:
+            self._memoria.put(key, data)
+            self._disco.put(key, formato, data)
+        with self._lock:
+            self._en_curso.pop(key, None)
+            if error is None:
+                self._stats["renders"] += 1
+            elif isinstance(error, BrokenProcessPool):
+                self._executor = None       # un proceso murió: el próximo dibujo crea otro pool
+        if error is None:
+            future.set_result(data)
+        else:
+            future.set_exception(error)
+
+    def _lanzar(self, key, curva, formato, future):
+        if self.workers <= 0:
+            try:
+                data = renderizar(curva, formato)
+            except Exception as e:
+                self._terminar(key, formato, future, error=e)
+            else:
+                self._terminar(key, formato, future, data)
+            return
+
+        def _listo(f):
+            error = f.exception()
+            self._terminar(key, formato, future, None if error else f.result(), error)
+
+        try:
+            self._pool().submit(renderizar, curva, formato).add_done_callback(_listo)
+        except Exception as e:
+            self._terminar(key, formato, future, error=e)
+
+    def obtener(self, curva, formato):
+        """(clave, bytes, origen) con origen 'memory', 'disk' o 'render'."""
+        if formato not in FORMATOS:
+            raise InvalidPlot(f"format debe ser uno de: {', '.join(sorted(FORMATOS))}")
+        key = clave(curva, formato)
+
+        data = self._memoria.get(key)
+        if data is not None:
+            with self._lock:
+                self._stats["memory_hits"] += 1
+            return key, data, "memory"
+
+        data = self._disco.get(key, formato)
+        if data is not None:
+            self._memoria.put(key, data)
+            with self._lock:
+                self._stats["disk_hits"] += 1
+            return key, data, "disk"
+
+        with self._lock:
+            # Otra petición pudo terminar de dibujarlo mientras se buscaba en disco
+            data = self._memoria.get(key)
+            if data is not None:
+                self._stats["memory_hits"] += 1
+                return key, data, "memory"
+            future = self._en_curso.get(key)
+            propio = future is None
+            if propio:
+                if not self._slots.acquire(blocking=False):
+                    self._stats["rejected"] += 1
+                    raise PlotsOverloaded("Demasiados gráficos en cola")
+                future = self._en_curso[key] = Future()
+            else:
+                self._stats["coalesced"] += 1
+        if propio:
+            self._lanzar(key, curva, formato, future)
+
+        with timed("plot", plot_latency, format=formato):
+            try:
+                data = future.result(timeout=self.timeout)
+            except FutureTimeout:
+                raise PlotsOverloaded("El gráfico no se generó a tiempo")
+        return key, data, "render"
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._en_curso)
+        stats.update(self._memoria.stats())
+        stats.update(self._disco.stats())
+        stats["workers"] = self.workers
+        stats["queue_limit"] = self.queue_limit
+        return stats
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=wait)
+
+
+# Renderizador compartido por toda la aplicación
+renderer = PlotRenderer()
@@ -0,0 +1,187 @@
+from catalog import MODULOS, catalog
+from config import env_float, env_int
+from db import pool
+
+# ============================================================
+#   DIFICULTAD ADAPTATIVA (PRECISIÓN MÓVIL POR USUARIO)
+# ============================================================
+# La tabla 'progreso_usuario' guarda, por (usuario, módulo, dificultad),
+# cuántos resultados hay y la precisión con promedio móvil exponencial
+# (EWMA): cada resultado nuevo pesa ADAPTIVE_ALPHA y lo anterior se va
+# olvidando, así la recomendación sigue cómo le va al alumno ahora y no
+# hace falta recorrer el historial. Se actualiza en la misma transacción
+# que el INSERT en 'resultados' (ingest.insertar_resultados), solo para
+# los resultados de los que se conoce la dificultad (los corregidos en el
+# servidor o los que el cliente manda con "nivel"). En la misma fila se
+# lleva el total del ranking histórico por dificultad (ranking_intentos,
+# ranking_puntaje con cada puntaje acotado a 0-100, ver leaderboard.py),
+# que suma solo los resultados corregidos en el servidor.
+#
+# usuario.nivel sube solo (basico -> intermedio -> avanzado) cuando en
+# todos los módulos tiene al menos PROMOTE_MIN_ATTEMPTS resultados en su
+# nivel actual con precisión >= PROMOTE_ACCURACY.
+
+NIVELES = ("basico", "intermedio", "avanzado")
+
+ADAPTIVE_ALPHA = env_float("ADAPTIVE_ALPHA", 0.3)           # peso del resultado más reciente
+PROMOTE_ACCURACY = env_float("PROMOTE_ACCURACY", 0.8)
+PROMOTE_MIN_ATTEMPTS = env_int("PROMOTE_MIN_ATTEMPTS", 5)
+REVIEW_ACCURACY = env_float("REVIEW_ACCURACY", 0.4)         # por debajo se recomienda el nivel anterior
+PRIOR = 0.5             # precisión supuesta antes del primer resultado
+
+
+def _precision(puntaje):
+    return min(max(puntaje / 100.0, 0.0), 1.0)
+
+
+def acumular(cursor, rows):
+    """
+    Suma al EWMA las filas recién insertadas que traen dificultad
+    (tuplas de ingest.nueva_fila) y promueve a quien cumpla los umbrales.
+    Los totales del ranking suman solo las corregidas en el servidor.
+    Debe llamarse dentro de la transacción del INSERT.
+    """
+    decay = 1.0 - ADAPTIVE_ALPHA
+    # (id_usuario, id_nivel, dificultad) ->
+    #     [cantidad, ewma desde PRIOR, última fecha, corregidas, suma de puntajes corregidos]
+    grupos = {}
+    for id_usuario, id_nivel, _id_ejercicio, puntaje, _total, fecha, dificultad, corregido in rows:
+        if dificultad not in NIVELES:
+            continue
+        acc = grupos.setdefault((id_usuario, id_nivel, dificultad), [0, PRIOR, fecha, 0, 0])
+        acc[0] += 1
+        acc[1] = acc[1] * decay + ADAPTIVE_ALPHA * _precision(puntaje)
+        acc[2] = max(acc[2], fecha)
+        if corregido:
+            acc[3] += 1
+            acc[4] += round(_precision(puntaje) * 100)
+    if not grupos:
+        return
+
+    # v = EWMA de los k resultados partiendo de PRIOR; si ya había fila con
+    # valor e, el resultado es e*decay^k + (v - PRIOR*decay^k): un upsert O(1)
+    cursor.executemany(
+        f"""
+        INSERT INTO progreso_usuario (id_usuario, id_nivel, dificultad, intentos, precision_ewma, actualizado,
+                                      ranking_intentos, ranking_puntaje)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            precision_ewma = (precision_ewma - {PRIOR!r}) * POW({decay!r}, VALUES(intentos)) + VALUES(precision_ewma),
+            intentos = intentos + VALUES(intentos),
+            actualizado = GREATEST(actualizado, VALUES(actualizado)),
+            ranking_intentos = ranking_intentos + VALUES(ranking_intentos),
+            ranking_puntaje = ranking_puntaje + VALUES(ranking_puntaje)
+        """,
+        [(u, n, d, k, v, f, c, s) for (u, n, d), (k, v, f, c, s) in grupos.items()]
+    )
+    promover(cursor, {u for u, _, _ in grupos})
+
+
+def _domina(fila):
+    return fila is not None and fila["intentos"] >= PROMOTE_MIN_ATTEMPTS \
+        and fila["precision_ewma"] >= PROMOTE_ACCURACY
+
+
+def promover(cursor, usuarios):
+    """Sube usuario.nivel a quienes dominan su nivel actual en todos los módulos."""
+    if not usuarios:
+        return []
+    ids = sorted(usuarios)
+    cursor.execute(
+        """
+        SELECT u.id, u.nivel, p.id_nivel, p.intentos, p.precision_ewma
+        FROM usuario u
+        LEFT JOIN progreso_usuario p ON p.id_usuario = u.id AND p.dificultad = u.nivel
+        WHERE u.id IN ({})
+        """.format(", ".join(["%s"] * len(ids))),
+        ids
+    )
+    por_usuario = {}
+    for row in cursor.fetchall():
+        nivel, progreso = por_usuario.setdefault(row["id"], (row["nivel"], {}))
+        if row["id_nivel"] is not None:
+            progreso[row["id_nivel"]] = row
+
+    modulos = [catalog.id_nivel(key) for key in MODULOS]
+    promovidos = []
+    for id_usuario, (nivel, progreso) in por_usuario.items():
+        if nivel not in NIVELES[:-1]:
+            continue
+        if all(_domina(progreso.get(id_nivel)) for id_nivel in modulos):
+            siguiente = NIVELES[NIVELES.index(nivel) + 1]
+            # La condición sobre el nivel evita subir dos veces si dos lotes coinciden
+            cursor.execute(
+                "UPDATE usuario SET nivel = %s WHERE id = %s AND nivel = %s",
+                (siguiente, id_usuario, nivel)
+            )
+            if cursor.rowcount:
+                promovidos.append((id_usuario, siguiente))
+    return promovidos
+
+
+def _recomendar_modulo(nivel, fila):
+    """(nivel recomendado, motivo) para un módulo según el progreso en el nivel del usuario."""
+    if fila is None or fila["intentos"] < PROMOTE_MIN_ATTEMPTS:
+        return nivel, "pocos_intentos"
+    if fila["precision_ewma"] < REVIEW_ACCURACY and nivel != NIVELES[0]:
+        return NIVELES[NIVELES.index(nivel) - 1], "repasar"
+    if _domina(fila):
+        return nivel, "dominado"
+    return nivel, "en_progreso"
+
+
+# Qué módulo conviene practicar primero
+_PRIORIDAD = {"repasar": 0, "pocos_intentos": 1, "en_progreso": 2, "dominado": 3}
+
+
+def recomendar(id_usuario, module=None):
+    """
+    Próximo módulo y nivel para el usuario (o solo el nivel para `module`).
+    Lee la fila del usuario y a lo más una fila de progreso por módulo y
+    dificultad. Devuelve None si el usuario no existe.
+    """
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT nivel FROM usuario WHERE id = %s", (id_usuario,))
+            usuario = cursor.fetchone()
+            if usuario is None:
+                return None
+            cursor.execute(
+                """
+                SELECT id_nivel, dificultad, intentos, precision_ewma
+                FROM progreso_usuario
+                WHERE id_usuario = %s
+                """,
+                (id_usuario,)
+            )
+            filas = cursor.fetchall()
+
+    nivel = usuario["nivel"] if usuario["nivel"] in NIVELES else NIVELES[0]
+    progreso = {(f["id_nivel"], f["dificultad"]): f for f in filas}
+
+    modulos = []
+    for key in MODULOS:
+        fila = progreso.get((catalog.id_nivel(key), nivel))
+        recomendado, motivo = _recomendar_modulo(nivel, fila)
+        modulos.append({
+            "module": key,
+            "nivel": recomendado,
+            "motivo": motivo,
+            "intentos": fila["intentos"] if fila else 0,
+            "precision": round(float(fila["precision_ewma"]), 3) if fila else None,
+        })
+
+    if module is not None:
+        elegido = next((m for m in modulos if m["module"] == module), None)
+        if elegido is None:
+            raise ValueError(f"Módulo desconocido: {module}")
+    else:
+        elegido = min(modulos, key=lambda m: (_PRIORIDAD[m["motivo"]], m["precision"] or 0, m["intentos"]))
+
+    return {
+        "nivel_usuario": nivel,
+        "module": elegido["module"],
+        "nivel": elegido["nivel"],
+        "motivo": elegido["motivo"],
+        "modules": modulos,
+    }
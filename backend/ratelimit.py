@@ -0,0 +1,163 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from config import env_bool, env_int, env_str
+from metrics import rate_limited
+
+# ============================================================
+#   LÍMITE DE FRECUENCIA POR IP / USUARIO (TOKEN BUCKET EN MEMORIA)
+# ============================================================
+# Cada regla tiene una cubeta por clave (IP, cuenta o id de usuario) con
+# hasta `capacidad` fichas que se recargan de a poco: "60/60" permite
+# ráfagas de 60 peticiones y en régimen 1 por segundo. Cada petición gasta
+# una ficha; sin fichas se responde 429 con Retry-After antes de tocar la
+# BD o bcrypt (ver app.py y asgi.py).
+#
+# Por clave solo se guardan (fichas, último acceso). Una cubeta que lleva
+# `periodo` segundos sin uso ya está llena, que es lo mismo que no tenerla,
+# así que se descarta: la memoria depende de las claves activas y nunca
+# pasa de RATE_LIMIT_KEYS por regla. Las cuentas son por proceso: con
+# varios workers de gunicorn el límite efectivo se multiplica por WEB_WORKERS.
+
+RATE_LIMIT_ENABLED = env_bool("RATE_LIMIT_ENABLED", True)  # False: sin límites (pruebas de carga)
+RATE_LIMIT_KEYS = env_int("RATE_LIMIT_KEYS", 100_000)    # claves máximas en memoria por regla
+RATE_LIMIT_PROXIES = env_int("RATE_LIMIT_PROXIES", 0)    # proxies propios delante (nginx = 1)
+PODA_POR_LLAMADA = 64                                    # cubetas inactivas descartadas por alta como máximo
+
+# regla -> (variable de entorno, "capacidad/segundos"); "0" o vacío deshabilita la regla
+REGLAS = {
+    # Un curso entero entra a la vez detrás de la misma IP del colegio
+    "login_ip": ("RATE_LOGIN_IP", "60/60"),
+    # Fuerza bruta contra una cuenta, aunque venga de muchas IPs
+    "login_cuenta": ("RATE_LOGIN_ACCOUNT", "10/300"),
+    "register_ip": ("RATE_REGISTER_IP", "60/600"),
+    "resultados_usuario": ("RATE_RESULTS_USER", "30/60"),
+    "resultados_ip": ("RATE_RESULTS_IP", "600/60"),
+    "lote_usuario": ("RATE_BATCH_USER", "10/60"),
+}
+
+
+class RateLimited(Exception):
+    """La clave agotó sus fichas; el cliente debe esperar `retry_after` segundos."""
+
+    def __init__(self, regla, espera):
+        super().__init__(f"Límite de frecuencia excedido ({regla})")
+        self.regla = regla
+        self.retry_after = max(1, math.ceil(espera))
+
+
+class TokenBucket:
+    def __init__(self, capacidad, periodo, max_claves=RATE_LIMIT_KEYS):
+        self.capacidad = float(capacidad)
+        self.periodo = float(periodo)            # segundos en recargar una cubeta vacía
+        self.tasa = capacidad / periodo          # fichas por segundo
+        self.max_claves = max_claves
+        # clave -> [fichas, último acceso], del menos al más recientemente usado
+        self._cubetas = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"allowed": 0, "limited": 0, "expired": 0, "evicted": 0}
+
+    def consumir(self, clave, costo=1):
+        """Gasta `costo` fichas de `clave`: 0.0 si alcanzan, si no los segundos que faltan."""
+        with self._lock:
+            ahora = time.monotonic()
+            cubeta = self._cubetas.get(clave)
+            if cubeta is None:
+                self._podar(ahora)
+                cubeta = self._cubetas[clave] = [self.capacidad, ahora]
+            else:
+                cubeta[0] = min(self.capacidad, cubeta[0] + (ahora - cubeta[1]) * self.tasa)
+                cubeta[1] = ahora
+                self._cubetas.move_to_end(clave)
+
+            if cubeta[0] >= costo:
+                cubeta[0] -= costo
+                self._stats["allowed"] += 1
+                return 0.0
+            self._stats["limited"] += 1
+            return (costo - cubeta[0]) / self.tasa
+
+    def _podar(self, ahora):
+        # Las del frente son las que llevan más tiempo sin uso; se corta en la primera activa
+        for _ in range(PODA_POR_LLAMADA):
+            if not self._cubetas:
+                return
+            clave, (_, ultimo) = next(iter(self._cubetas.items()))
+            if ahora - ultimo < self.periodo:
+                break
+            del self._cubetas[clave]
+            self._stats["expired"] += 1
+        # Tope duro: se sacrifica la menos reciente aunque no esté llena
+        while len(self._cubetas) >= self.max_claves:
+            self._cubetas.popitem(last=False)
+            self._stats["evicted"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["keys"] = len(self._cubetas)
+        return stats
+
+
+def parse_limite(texto):
+    """'60/60' -> (60, 60.0); '0' o vacío -> None (regla deshabilitada)."""
+    texto = (texto or "").strip()
+    if texto in ("", "0"):
+        return None
+    capacidad, _, periodo = texto.partition("/")
+    try:
+        capacidad, periodo = int(capacidad), float(periodo or 1)
+    except ValueError:
+        raise ValueError(f"Límite inválido: {texto!r} (se espera capacidad/segundos)")
+    if capacidad < 1 or periodo <= 0:
+        raise ValueError(f"Límite inválido: {texto!r} (se espera capacidad/segundos)")
+    return capacidad, periodo
+
+
+def _crear_limites():
+    limites = {}
+    if not RATE_LIMIT_ENABLED:
+        return limites
+    for regla, (variable, por_defecto) in REGLAS.items():
+        texto = env_str(variable, por_defecto)
+        try:
+            limite = parse_limite(texto)
+        except ValueError as e:
+            print(f"{variable}: {e}, se usa {por_defecto}")
+            limite = parse_limite(por_defecto)
+        if limite is not None:
+            limites[regla] = TokenBucket(*limite)
+    return limites
+
+
+limites = _crear_limites()
+
+
+def limitar(regla, clave):
+    """Lanza RateLimited si `clave` ya no tiene fichas en `regla` (deshabilitada o sin clave: no hace nada)."""
+    bucket = limites.get(regla)
+    if bucket is None or clave is None:
+        return
+    espera = bucket.consumir(clave)
+    if espera:
+        rate_limited.inc(rule=regla)
+        raise RateLimited(regla, espera)
+
+
+def ip_cliente(request):
+    """
+    IP del cliente (request de Flask o de Quart). Detrás de RATE_LIMIT_PROXIES
+    proxies propios se toma de X-Forwarded-For la que agregó el más externo;
+    lo que venga antes lo puede inventar el cliente.
+    """
+    if RATE_LIMIT_PROXIES > 0:
+        saltos = [ip.strip() for ip in request.headers.get("X-Forwarded-For", "").split(",") if ip.strip()]
+        if len(saltos) >= RATE_LIMIT_PROXIES:
+            return saltos[-RATE_LIMIT_PROXIES]
+    return request.remote_addr
+
+
+def stats():
+    return {f"{regla}_{k}": v for regla, bucket in limites.items() for k, v in bucket.stats().items()}
@@ -0,0 +1,158 @@
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+from functools import wraps
+
+from flask import g, jsonify, request
+
+from config import env_int, env_str
+
+# ============================================================
+#   SESIONES CON TOKENS FIRMADOS (SIN ESTADO EN EL SERVIDOR)
+# ============================================================
+# El login entrega dos tokens:
+#   - access  (corto): va en cada petición como "Authorization: Bearer <token>"
+#   - refresh (largo): solo sirve para pedir un access nuevo en /api/session/refresh
+# Formato: "<kid>.<payload>.<firma>", payload = "tipo:id_usuario:expiración".
+# Verificar es un HMAC-SHA256 en memoria: no hay consulta a la BD ni
+# almacén de sesiones, así el id del usuario sale del token y no del JSON
+# que manda el navegador.
+#
+# Rotación de claves: SESSION_KEYS="k2:secreto_nuevo,k1:secreto_viejo".
+# Se firma con la primera y se aceptan todas; la vieja se quita cuando ya
+# pasó SESSION_REFRESH_TTL, así ninguna sesión se corta de golpe.
+
+SESSION_ACCESS_TTL = env_int("SESSION_ACCESS_TTL", 3600)             # 1 hora
+SESSION_REFRESH_TTL = env_int("SESSION_REFRESH_TTL", 14 * 86400)     # 14 días
+
+ACCESS = "a"
+REFRESH = "r"
+
+
+def _parse_keys(raw):
+    keys = []
+    for part in raw.split(","):
+        kid, sep, secret = part.strip().partition(":")
+        if sep and kid and secret:
+            keys.append((kid, secret.encode("utf-8")))
+    return keys
+
+
+# Deben ser las mismas en todos los procesos/servidores (variable de entorno o backend/.env)
+SESSION_KEYS = _parse_keys(env_str("SESSION_KEYS", ""))
+if not SESSION_KEYS:
+    print("SESSION_KEYS no definido: se usa una clave aleatoria (las sesiones se pierden al reiniciar)")
+    SESSION_KEYS = [("local", secrets.token_bytes(32))]
+
+_KEYS = dict(SESSION_KEYS)
+_ACTIVE_KID, _ACTIVE_KEY = SESSION_KEYS[0]
+
+
+class InvalidSession(ValueError):
+    """Token ausente, mal formado, con firma inválida o de otro tipo."""
+
+
+class SessionExpired(InvalidSession):
+    """Token válido pero vencido (el cliente debe renovarlo)."""
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(key, message):
+    return hmac.new(key, message.encode("ascii"), hashlib.sha256).digest()[:16]
+
+
+def _issue(kind, id_usuario, ttl, now):
+    payload = _b64(f"{kind}:{int(id_usuario)}:{now + ttl}".encode("ascii"))
+    signed = f"{_ACTIVE_KID}.{payload}"
+    return f"{signed}.{_b64(_sign(_ACTIVE_KEY, signed))}"
+
+
+def emitir_sesion(id_usuario):
+    """Par de tokens para un usuario recién autenticado."""
+    now = int(time.time())
+    return {
+        "access_token": _issue(ACCESS, id_usuario, SESSION_ACCESS_TTL, now),
+        "refresh_token": _issue(REFRESH, id_usuario, SESSION_REFRESH_TTL, now),
+        "expires_in": SESSION_ACCESS_TTL,
+    }
+
+
+def verificar(token, kind=ACCESS):
+    """Devuelve el id de usuario del token o lanza InvalidSession / SessionExpired."""
+    try:
+        kid, payload, signature = token.split(".")
+    except (AttributeError, ValueError):
+        raise InvalidSession("Token mal formado")
+
+    key = _KEYS.get(kid)
+    if key is None:
+        raise InvalidSession("Clave de sesión desconocida")
+    try:
+        valid = hmac.compare_digest(_unb64(signature), _sign(key, f"{kid}.{payload}"))
+    except ValueError:
+        valid = False
+    if not valid:
+        raise InvalidSession("Firma inválida")
+
+    try:
+        token_kind, id_usuario, exp = _unb64(payload).decode("ascii").split(":")
+        id_usuario, exp = int(id_usuario), int(exp)
+    except ValueError:
+        raise InvalidSession("Token mal formado")
+
+    if token_kind != kind:
+        raise InvalidSession("Tipo de token incorrecto")
+    if exp < time.time():
+        raise SessionExpired("Sesión expirada")
+    return id_usuario
+
+
+def renovar(refresh_token):
+    """Nuevo par de tokens a partir de un refresh válido (firmado con la clave activa)."""
+    return emitir_sesion(verificar(refresh_token, REFRESH))
+
+
+# ---------- Flask ----------
+def _bearer():
+    header = request.headers.get("Authorization", "")
+    scheme, _, token = header.partition(" ")
+    return token.strip() if scheme.lower() == "bearer" and token.strip() else None
+
+
+def respuesta_no_autorizada(e):
+    response = jsonify({"error": str(e), "expired": isinstance(e, SessionExpired)})
+    response.headers["WWW-Authenticate"] = 'Bearer error="invalid_token"'
+    return response, 401
+
+
+def usuario_actual():
+    """
+    Id del usuario de la sesión, o None si la petición no trae token.
+    Lanza InvalidSession si trae uno inválido.
+    """
+    token = _bearer()
+    return verificar(token) if token else None
+
+
+def requiere_sesion(fn):
+    """Decorador: exige un access token válido y deja el usuario en g.id_usuario."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            id_usuario = usuario_actual()
+        except InvalidSession as e:
+            return respuesta_no_autorizada(e)
+        if id_usuario is None:
+            return respuesta_no_autorizada(InvalidSession("Falta el token de sesión"))
+        g.id_usuario = id_usuario
+        return fn(*args, **kwargs)
+    return wrapper
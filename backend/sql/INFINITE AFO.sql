@@ -1,3 +1,11 @@
+-- Despues de cargar este archivo, desde backend/: python migrations.py upgrade
+-- (indices compuestos y columnas nuevas).
+-- Opcional: python migrations.py partition particiona por mes resultados e
+-- intentos. Eso BORRA todas las FOREIGN KEY de esas dos tablas (MySQL no las
+-- admite en tablas particionadas) y cambia su PRIMARY KEY a (id, fecha):
+-- desde ahí la integridad con usuario, niveles, ejercicios, preguntas y
+-- opciones la cuida solo la aplicación.
+
 CREATE TABLE usuario (
     id INT AUTO_INCREMENT PRIMARY KEY,
     nombre_usuario VARCHAR(50) NOT NULL,
@@ -34,6 +42,8 @@ CREATE TABLE preguntas_ejercicio (
     respuesta_correcta VARCHAR(100) NOT NULL,
     unidad VARCHAR(50),
     pista TEXT,
+    -- Pregunta de un generador ('module/nivel/n'); la crea attempts.sincronizar_preguntas
+    clave VARCHAR(100) NULL UNIQUE,
     FOREIGN KEY (id_ejercicio) REFERENCES ejercicios(id_ejercicio)
 );
 
@@ -55,9 +65,15 @@ CREATE TABLE intentos (
     fecha_hora DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (id_usuario) REFERENCES usuario(id),
     FOREIGN KEY (id_pregunta) REFERENCES preguntas_ejercicio(id_pregunta),
-    FOREIGN KEY (id_opcion) REFERENCES opciones(id_opcion)
+    FOREIGN KEY (id_opcion) REFERENCES opciones(id_opcion),
+    -- Tasa de error por pregunta (/api/question-stats)
+    INDEX idx_intentos_pregunta (id_pregunta, es_correcta)
 );
 
+-- Para una base ya creada:
+-- ALTER TABLE preguntas_ejercicio ADD COLUMN clave VARCHAR(100) NULL UNIQUE;
+-- CREATE INDEX idx_intentos_pregunta ON intentos (id_pregunta, es_correcta);
+
 CREATE TABLE resultados (
     id_resultado INT AUTO_INCREMENT PRIMARY KEY,
     id_usuario INT NOT NULL,
@@ -66,11 +82,126 @@ CREATE TABLE resultados (
     puntaje INT NOT NULL,
     total_preguntas INT NOT NULL,
     fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- basico/intermedio/avanzado si se conoce (ranking por dificultad); NULL si no
+    dificultad VARCHAR(20) NULL,
+    -- 1 si lo corrigió el servidor (/api/exercise-grade): solo esos suman al ranking
+    corregido TINYINT NOT NULL DEFAULT 0,
     FOREIGN KEY (id_usuario) REFERENCES usuario(id),
     FOREIGN KEY (id_nivel) REFERENCES niveles(id_nivel),
-    FOREIGN KEY (id_ejercicio) REFERENCES ejercicios(id_ejercicio)
+    FOREIGN KEY (id_ejercicio) REFERENCES ejercicios(id_ejercicio),
+    -- Historial por usuario (/api/user-results): el índice cubre la consulta
+    -- completa y ya viene ordenado por (fecha, id_resultado)
+    INDEX idx_resultados_usuario_fecha (id_usuario, fecha, id_resultado, id_nivel, id_ejercicio, puntaje, total_preguntas)
+);
+
+-- Para una base ya creada:
+-- CREATE INDEX idx_resultados_usuario_fecha
+--     ON resultados (id_usuario, fecha, id_resultado, id_nivel, id_ejercicio, puntaje, total_preguntas);
+
+-- Resumen por usuario y nivel para el dashboard (/api/user-summary).
+-- Se actualiza en la misma transacción que cada INSERT en resultados;
+-- para recalcularlo desde cero: python summary.py rebuild
+CREATE TABLE resumen_usuario_nivel (
+    id_usuario INT NOT NULL,
+    id_nivel INT NOT NULL,
+    intentos INT NOT NULL DEFAULT 0,
+    suma_puntaje BIGINT NOT NULL DEFAULT 0,
+    ultima_actividad TIMESTAMP NULL,
+    PRIMARY KEY (id_usuario, id_nivel),
+    FOREIGN KEY (id_usuario) REFERENCES usuario(id),
+    FOREIGN KEY (id_nivel) REFERENCES niveles(id_nivel)
 );
 
+-- Precisión móvil (EWMA) por usuario, módulo y dificultad para la
+-- dificultad adaptativa (/api/user-recommendation, progress.py).
+-- Se actualiza en la misma transacción que cada INSERT en resultados.
+CREATE TABLE progreso_usuario (
+    id_usuario INT NOT NULL,
+    id_nivel INT NOT NULL,
+    dificultad VARCHAR(20) NOT NULL,
+    intentos INT NOT NULL DEFAULT 0,
+    precision_ewma DOUBLE NOT NULL DEFAULT 0,
+    actualizado TIMESTAMP NULL,
+    -- Ranking histórico por módulo y dificultad (leaderboard.py): puntajes acotados a 0-100
+    ranking_intentos INT NOT NULL DEFAULT 0,
+    ranking_puntaje BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_usuario, id_nivel, dificultad),
+    FOREIGN KEY (id_usuario) REFERENCES usuario(id),
+    FOREIGN KEY (id_nivel) REFERENCES niveles(id_nivel)
+);
+
+-- Para una base ya creada: ejecutar el CREATE TABLE progreso_usuario de arriba
+
+-- Ejercicios que ya guardaron su resultado: cada token de ejercicio guarda
+-- un solo resultado (ver grading.py). archive.py borra las filas vencidas.
+CREATE TABLE ejercicios_corregidos (
+    nonce CHAR(16) NOT NULL PRIMARY KEY,
+    expira DATETIME NOT NULL,
+    INDEX idx_corregidos_expira (expira)
+);
+
+-- Archivo de resultados e intentos viejos (archive.py): filas movidas de
+-- las tablas vivas, comprimidas, y agregados por mes que siguen sumando
+-- en el resumen, el ranking y /api/question-stats. Las mismas que crea la
+-- migración 3.
+CREATE TABLE resultados_archivo (
+    id_resultado INT NOT NULL PRIMARY KEY,
+    id_usuario INT NOT NULL,
+    id_nivel INT NOT NULL,
+    id_ejercicio INT NULL,
+    puntaje INT NOT NULL,
+    total_preguntas INT NOT NULL,
+    fecha DATETIME NOT NULL,
+    dificultad VARCHAR(20) NULL,
+    corregido TINYINT NOT NULL DEFAULT 0,
+    INDEX idx_resultados_archivo_usuario (id_usuario, fecha)
+) ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+CREATE TABLE intentos_archivo (
+    id_intento INT NOT NULL PRIMARY KEY,
+    id_usuario INT NOT NULL,
+    id_pregunta INT NOT NULL,
+    id_opcion INT NULL,
+    respuesta_usuario VARCHAR(255) NULL,
+    es_correcta TINYINT NOT NULL,
+    fecha_hora DATETIME NULL
+) ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+CREATE TABLE resultados_mensual (
+    mes DATE NOT NULL,
+    id_usuario INT NOT NULL,
+    id_nivel INT NOT NULL,
+    intentos INT NOT NULL,
+    suma_puntaje BIGINT NOT NULL,
+    ultima_actividad DATETIME NULL,
+    PRIMARY KEY (mes, id_usuario, id_nivel),
+    INDEX idx_resultados_mensual_usuario (id_usuario, id_nivel)
+);
+
+CREATE TABLE intentos_mensual (
+    mes DATE NOT NULL,
+    id_pregunta INT NOT NULL,
+    id_usuario INT NOT NULL,
+    intentos INT NOT NULL,
+    errores INT NOT NULL,
+    PRIMARY KEY (mes, id_pregunta, id_usuario),
+    INDEX idx_intentos_mensual_usuario (id_usuario, id_pregunta)
+);
+
+-- Historial mensual completo: meses vivos + meses ya archivados
+CREATE VIEW resultados_por_mes AS
+SELECT mes, id_usuario, id_nivel, SUM(intentos) AS intentos, SUM(suma_puntaje) AS suma_puntaje
+FROM (
+    SELECT CAST(DATE_FORMAT(fecha, '%Y-%m-01') AS DATE) AS mes, id_usuario, id_nivel,
+           COUNT(*) AS intentos, SUM(puntaje) AS suma_puntaje
+    FROM resultados
+    GROUP BY CAST(DATE_FORMAT(fecha, '%Y-%m-01') AS DATE), id_usuario, id_nivel
+    UNION ALL
+    SELECT mes, id_usuario, id_nivel, intentos, suma_puntaje
+    FROM resultados_mensual
+) t
+GROUP BY mes, id_usuario, id_nivel;
+
 -- =========================================================
 -- Obviamente las tablas van primero, luego los insert into
 -- =========================================================
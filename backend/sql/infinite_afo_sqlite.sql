@@ -0,0 +1,161 @@
+-- =========================================================
+-- Esquema para el modo SQLite embebido (DB_BACKEND=sqlite).
+-- Mismas tablas, columnas e índices que INFINITE AFO.sql; lo crea
+-- sqlite_backend.py la primera vez que abre un archivo vacío.
+-- =========================================================
+
+CREATE TABLE usuario (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre_usuario VARCHAR(50) NOT NULL,
+    correo VARCHAR(100) NOT NULL UNIQUE,
+    "contraseña" VARCHAR(255) NOT NULL,
+    nivel VARCHAR(30) NOT NULL
+);
+
+CREATE TABLE niveles (
+    id_nivel INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre VARCHAR(50) NOT NULL,
+    descripcion TEXT,
+    orden INT NOT NULL
+);
+
+CREATE TABLE ejercicios (
+    id_ejercicio INTEGER PRIMARY KEY AUTOINCREMENT,
+    codigo VARCHAR(50) NOT NULL UNIQUE,
+    titulo VARCHAR(255) NOT NULL,
+    modulo VARCHAR(100) NOT NULL,
+    dificultad VARCHAR(50) NOT NULL,
+    descripcion TEXT,
+    imagen VARCHAR(255),
+    imagen_caption VARCHAR(255),
+    contexto TEXT
+);
+
+CREATE TABLE preguntas_ejercicio (
+    id_pregunta INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_ejercicio INT NOT NULL REFERENCES ejercicios(id_ejercicio),
+    enunciado TEXT NOT NULL,
+    tipo VARCHAR(20) DEFAULT 'numeric',
+    respuesta_correcta VARCHAR(100) NOT NULL,
+    unidad VARCHAR(50),
+    pista TEXT,
+    clave VARCHAR(100) NULL UNIQUE
+);
+
+CREATE TABLE opciones (
+    id_opcion INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_pregunta INT NOT NULL REFERENCES preguntas_ejercicio(id_pregunta),
+    texto_opcion VARCHAR(255) NOT NULL,
+    es_correcta TINYINT DEFAULT 0
+);
+
+CREATE TABLE intentos (
+    id_intento INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_usuario INT NOT NULL REFERENCES usuario(id),
+    id_pregunta INT NOT NULL REFERENCES preguntas_ejercicio(id_pregunta),
+    id_opcion INT NULL REFERENCES opciones(id_opcion),
+    respuesta_usuario VARCHAR(255) NULL,
+    es_correcta TINYINT NOT NULL,
+    fecha_hora TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_intentos_pregunta ON intentos (id_pregunta, es_correcta);
+
+CREATE TABLE resultados (
+    id_resultado INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_usuario INT NOT NULL REFERENCES usuario(id),
+    id_nivel INT NOT NULL REFERENCES niveles(id_nivel),
+    id_ejercicio INT NULL REFERENCES ejercicios(id_ejercicio),
+    puntaje INT NOT NULL,
+    total_preguntas INT NOT NULL,
+    fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    dificultad VARCHAR(20) NULL,
+    corregido TINYINT NOT NULL DEFAULT 0
+);
+
+CREATE INDEX idx_resultados_usuario_fecha
+    ON resultados (id_usuario, fecha, id_resultado, id_nivel, id_ejercicio, puntaje, total_preguntas);
+
+CREATE TABLE resumen_usuario_nivel (
+    id_usuario INT NOT NULL REFERENCES usuario(id),
+    id_nivel INT NOT NULL REFERENCES niveles(id_nivel),
+    intentos INT NOT NULL DEFAULT 0,
+    suma_puntaje BIGINT NOT NULL DEFAULT 0,
+    ultima_actividad TIMESTAMP NULL,
+    PRIMARY KEY (id_usuario, id_nivel)
+);
+
+CREATE TABLE progreso_usuario (
+    id_usuario INT NOT NULL REFERENCES usuario(id),
+    id_nivel INT NOT NULL REFERENCES niveles(id_nivel),
+    dificultad VARCHAR(20) NOT NULL,
+    intentos INT NOT NULL DEFAULT 0,
+    precision_ewma DOUBLE NOT NULL DEFAULT 0,
+    actualizado TIMESTAMP NULL,
+    ranking_intentos INT NOT NULL DEFAULT 0,
+    ranking_puntaje BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_usuario, id_nivel, dificultad)
+);
+
+CREATE TABLE ejercicios_corregidos (
+    nonce CHAR(16) NOT NULL PRIMARY KEY,
+    expira DATETIME NOT NULL
+);
+
+CREATE INDEX idx_corregidos_expira ON ejercicios_corregidos (expira);
+
+-- =========================================================
+-- Obviamente las tablas van primero, luego los insert into
+-- =========================================================
+
+INSERT INTO niveles (nombre, descripcion, orden)
+VALUES
+('Funciones Cuadráticas', 'Ejercicios basados en movimiento parabólico y vértices', 1),
+('Funciones Trigonométricas', 'Ejercicios basados en ondas senoidales y oscilaciones', 2);
+
+
+INSERT INTO ejercicios (
+    codigo,
+    titulo,
+    modulo,
+    dificultad,
+    descripcion,
+    imagen,
+    imagen_caption,
+    contexto
+)
+VALUES
+(
+    'quadratic', 
+    'Movimiento Parabólico - Proyectil',
+    'Funciones Cuadráticas',
+    'Intermedio',
+    'Analiza el movimiento de un proyectil lanzado desde el suelo.',
+    './assets/images/parabolic-motion.png',
+    'Trayectoria parabólica del proyectil',
+    'Un proyectil es lanzado desde el suelo con una velocidad inicial de 50 m/s con un ángulo de 45°. La altura sigue: h(t) = -5t² + 35.35t.'
+),
+(
+    'trigonometric',
+    'Ondas Senoidales - Muelle',
+    'Funciones Trigonométricas',
+    'Intermedio',
+    'Analiza el movimiento armónico simple de un muelle.',
+    './assets/images/sine-wave.png',
+    'Movimiento oscilatorio del muelle',
+    'Un muelle sigue x(t) = 2·sin(πt) + 3·cos(πt), donde x es la posición en cm.'
+);
+
+INSERT INTO preguntas_ejercicio 
+(id_ejercicio, enunciado, tipo, respuesta_correcta, unidad, pista)
+VALUES
+(1, '¿Cuál es la altura máxima que alcanza el proyectil?', 'numeric', '62.5', 'metros', 'Usa la fórmula del vértice de la parábola'),
+(1, '¿En qué tiempo alcanza la altura máxima?', 'numeric', '3.535', 'segundos', 'El tiempo en el vértice es t = -b/(2a)'),
+(1, '¿A qué distancia cae el proyectil?', 'numeric', '125', 'metros', 'Encuentra cuando h(t) = 0 y calcula la distancia horizontal');
+
+INSERT INTO preguntas_ejercicio 
+(id_ejercicio, enunciado, tipo, respuesta_correcta, unidad, pista)
+VALUES
+(2, '¿Cuál es la amplitud máxima del movimiento?', 'numeric', '3.606', 'cm', 'Calcula √(A² + B²) para la amplitud'),
+(2, '¿Cuál es el periodo de oscilación?', 'numeric', '2', 'segundos', 'Periodo = 2π/ω'),
+(2, '¿En qué posición se encuentra en t = 0.5 segundos?', 'numeric', '3', 'cm', 'Sustituye t = 0.5 en la función');
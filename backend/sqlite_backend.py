@@ -0,0 +1,200 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from functools import lru_cache
+
+import pymysql
+from pymysql.constants import SERVER_STATUS
+
+from metrics import observe_query
+
+# ============================================================
+#   BACKEND SQLITE EMBEBIDO (DB_BACKEND=sqlite)
+# ============================================================
+# Para instalaciones chicas (un colegio, un solo servidor) sin MySQL.
+# Las conexiones imitan lo que la app usa de pymysql (cursor de
+# diccionario, commit/rollback, ping, server_status), así db.pool y todos
+# los módulos funcionan igual con cualquiera de los dos backends.
+#
+# Las consultas de la app son SQL estándar salvo unas pocas construcciones
+# de MySQL que se reescriben una vez por sentencia (traducir, con caché):
+#   %s                         -> ?
+#   INSERT IGNORE              -> INSERT OR IGNORE
+#   ON DUPLICATE KEY UPDATE    -> ON CONFLICT DO UPDATE SET (VALUES(x) -> excluded.x)
+#   GREATEST(a, b)             -> MAX(a, b)
+# POW no viene en todas las compilaciones de SQLite (necesita
+# SQLITE_ENABLE_MATH_FUNCTIONS): se registra en cada conexión.
+# Como el texto traducido es siempre el mismo, sqlite3 reutiliza la
+# sentencia ya compilada (caché de `cached_statements` por conexión).
+#
+# Los errores se entregan como los de pymysql (IntegrityError, OperationalError)
+# para que el manejo de errores de la app no dependa del backend.
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql", "infinite_afo_sqlite.sql")
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",        # lectores y un escritor a la vez, sin bloquearse
+    "PRAGMA synchronous=NORMAL",      # con WAL es seguro ante caídas del proceso
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA busy_timeout=5000",       # ms esperando el lock de escritura
+    "PRAGMA cache_size=-32000",       # ~32 MB de caché de páginas por conexión
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",     # 256 MB leídos con mmap
+)
+STATEMENT_CACHE = 256   # sentencias compiladas que guarda cada conexión
+
+sqlite3.register_adapter(datetime, lambda d: d.isoformat(" "))
+sqlite3.register_converter("TIMESTAMP", lambda b: datetime.fromisoformat(b.decode()))
+sqlite3.register_converter("DATETIME", lambda b: datetime.fromisoformat(b.decode()))
+sqlite3.register_converter("DATE", lambda b: date.fromisoformat(b.decode()[:10]))
+
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+
+@lru_cache(maxsize=512)
+def traducir(sql):
+    """Sentencia en el dialecto de MySQL -> SQLite."""
+    sql = sql.replace("%s", "?").replace("INSERT IGNORE", "INSERT OR IGNORE")
+    if "ON DUPLICATE KEY UPDATE" in sql:
+        sql = sql.replace("ON DUPLICATE KEY UPDATE", "ON CONFLICT DO UPDATE SET")
+        sql = re.sub(r"VALUES\((\w+)\)", r"excluded.\1", sql)
+    return sql.replace("GREATEST(", "MAX(")
+
+
+def _as_pymysql_error(e):
+    if isinstance(e, sqlite3.IntegrityError):
+        # Mismos códigos que MySQL: 1452 clave foránea, 1062 duplicado
+        return pymysql.err.IntegrityError(1452 if "FOREIGN KEY" in str(e) else 1062, str(e))
+    if isinstance(e, sqlite3.OperationalError):
+        return pymysql.err.OperationalError(2013, str(e))
+    return pymysql.err.DatabaseError(0, str(e))
+
+
+class SQLiteCursor:
+    def __init__(self, conn):
+        self._cursor = conn.cursor()
+        self.rowcount = -1
+        self.lastrowid = None
+
+    def _run(self, method, query, params):
+        start = time.perf_counter()
+        try:
+            method(traducir(query), params)
+        except sqlite3.Error as e:
+            raise _as_pymysql_error(e) from e
+        finally:
+            observe_query(query, time.perf_counter() - start)
+        self.rowcount = self._cursor.rowcount
+        self.lastrowid = self._cursor.lastrowid
+        return self.rowcount
+
+    def execute(self, query, args=None):
+        return self._run(self._cursor.execute, query, tuple(args or ()))
+
+    def executemany(self, query, args):
+        return self._run(self._cursor.executemany, query, [tuple(a) for a in args])
+
+    def _row(self, row):
+        if row is None:
+            return None
+        return {d[0]: v for d, v in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(r) for r in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(r) for r in self._cursor.fetchall()]
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self._row(row)
+
+    def close(self):
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SQLiteConnection:
+    """Conexión SQLite con la interfaz de pymysql que usan db.pool y la app."""
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(
+            path,
+            timeout=5,
+            check_same_thread=False,    # el pool la presta a un hilo a la vez
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            cached_statements=STATEMENT_CACHE,
+        )
+        for pragma in PRAGMAS:
+            self._conn.execute(pragma)
+        # progress.acumular lo usa en el upsert del EWMA
+        self._conn.create_function("POW", 2, math.pow, deterministic=True)
+
+    @property
+    def server_status(self):
+        return SERVER_STATUS.SERVER_STATUS_IN_TRANS if self._conn.in_transaction else 0
+
+    def cursor(self, cursorclass=None):
+        return SQLiteCursor(self._conn)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def ping(self, reconnect=False):
+        try:
+            self._conn.execute("SELECT 1")
+        except sqlite3.Error as e:
+            raise _as_pymysql_error(e) from e
+
+    def close(self):
+        self._conn.close()
+
+
+def _tiene_esquema(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'usuario'"
+    ).fetchone() is not None
+
+
+def crear_esquema(path, schema_file=SCHEMA_FILE):
+    """Crea tablas y datos iniciales si el archivo todavía no tiene el esquema."""
+    with _schema_lock:
+        if path in _schema_ready:
+            return
+        conn = sqlite3.connect(path, timeout=30)
+        try:
+            if not _tiene_esquema(conn):
+                with open(schema_file, encoding="utf-8") as f:
+                    script = f.read()
+                try:
+                    # Una sola transacción: otro proceso que arranque a la vez ve todo o nada
+                    conn.executescript("BEGIN IMMEDIATE;\n" + script + "\nCOMMIT;")
+                    print(f"Base SQLite creada en {path}")
+                except sqlite3.OperationalError:
+                    conn.rollback()
+                    if not _tiene_esquema(conn):
+                        raise
+        finally:
+            conn.close()
+        _schema_ready.add(path)
+
+
+def connect(path):
+    crear_esquema(path)
+    return SQLiteConnection(path)
@@ -0,0 +1,213 @@
+import argparse
+import hashlib
+import math
+from collections import defaultdict
+
+from catalog import MODULOS, catalog
+from db import pool
+from db_async import apool
+from migrations import tiene_tabla
+
+# ============================================================
+#   RESUMEN POR USUARIO Y NIVEL (MÉTRICAS DEL DASHBOARD)
+# ============================================================
+# La tabla 'resumen_usuario_nivel' guarda, por (usuario, nivel), cuántos
+# resultados hay, la suma de puntajes y la última actividad. Se actualiza
+# en la misma transacción que cada INSERT en 'resultados' (ver
+# ingest.insertar_resultados), así /api/user-summary lee a lo más una fila
+# por nivel sin importar el largo del historial.
+#
+# Reconstrucción completa desde 'resultados' (desde backend/):
+#     python summary.py rebuild [--user ID]
+
+
+def acumular(cursor, rows):
+    """
+    Suma las filas recién insertadas en 'resultados' al resumen.
+    `rows` son tuplas de ingest.nueva_fila; se agrupan antes para hacer
+    un solo upsert multi-fila. Debe llamarse dentro de la transacción del INSERT.
+    """
+    totals = defaultdict(lambda: [0, 0, None])
+    for id_usuario, id_nivel, _id_ejercicio, puntaje, _total, fecha, _dificultad, _corregido in rows:
+        acc = totals[(id_usuario, id_nivel)]
+        acc[0] += 1
+        acc[1] += puntaje
+        if acc[2] is None or fecha > acc[2]:
+            acc[2] = fecha
+
+    cursor.executemany(
+        """
+        INSERT INTO resumen_usuario_nivel (id_usuario, id_nivel, intentos, suma_puntaje, ultima_actividad)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            intentos = intentos + VALUES(intentos),
+            suma_puntaje = suma_puntaje + VALUES(suma_puntaje),
+            ultima_actividad = GREATEST(ultima_actividad, VALUES(ultima_actividad))
+        """,
+        [(u, n, c, s, f) for (u, n), (c, s, f) in totals.items()]
+    )
+
+
+def reconstruir(id_usuario=None):
+    """
+    Recalcula el resumen desde 'resultados' más lo ya archivado en
+    'resultados_mensual' (todo, o solo un usuario). Sin esa tabla (base
+    MySQL sin migrar) se usa solo 'resultados'.
+    """
+    where = "WHERE id_usuario = %s" if id_usuario is not None else ""
+    params = (id_usuario,) if id_usuario is not None else ()
+    ramas = [f"""
+                    SELECT id_usuario, id_nivel, COUNT(*) AS intentos, SUM(puntaje) AS suma_puntaje,
+                           MAX(fecha) AS ultima_actividad
+                    FROM resultados
+                    {where}
+                    GROUP BY id_usuario, id_nivel
+    """]
+
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            if tiene_tabla(cursor, "resultados_mensual"):
+                ramas.append(f"""
+                    SELECT id_usuario, id_nivel, SUM(intentos), SUM(suma_puntaje), MAX(ultima_actividad)
+                    FROM resultados_mensual
+                    {where}
+                    GROUP BY id_usuario, id_nivel
+                """)
+            cursor.execute(f"DELETE FROM resumen_usuario_nivel {where}", params)
+            cursor.execute(
+                f"""
+                INSERT INTO resumen_usuario_nivel (id_usuario, id_nivel, intentos, suma_puntaje, ultima_actividad)
+                SELECT id_usuario, id_nivel, SUM(intentos), SUM(suma_puntaje), MAX(ultima_actividad)
+                FROM ({" UNION ALL ".join(ramas)}) t
+                GROUP BY id_usuario, id_nivel
+                """,
+                params * len(ramas)
+            )
+            filas = cursor.rowcount
+        conn.commit()
+    return filas
+
+
+# La cabeza de 'resultados' (último id y cantidad, por el índice
+# idx_resultados_usuario_fecha) cambia también cuando archive.py mueve filas
+# o reconstruir recalcula el resumen sin sumarle nada
+_SQL_VERSION = """
+    SELECT COALESCE(SUM(intentos), 0) AS total, MAX(ultima_actividad) AS ultima,
+           (SELECT MAX(id_resultado) FROM resultados WHERE id_usuario = %s) AS cabeza,
+           (SELECT COUNT(*) FROM resultados WHERE id_usuario = %s) AS vivos
+    FROM resumen_usuario_nivel
+    WHERE id_usuario = %s
+"""
+
+
+def version_usuario(id_usuario, variante=b""):
+    """
+    ETag del historial/resumen de un usuario: cambia cada vez que se le suma
+    un resultado (cantidad y última actividad del resumen) y cada vez que
+    cambian sus filas de 'resultados' (último id y cantidad). Son lecturas
+    por clave primaria e índice, mucho más baratas que armar la respuesta.
+    `variante` distingue representaciones (ej. el query string de la página).
+    """
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(_SQL_VERSION, (id_usuario,) * 3)
+            row = cursor.fetchone()
+    return _etag(id_usuario, row, variante)
+
+
+async def version_usuario_async(id_usuario, variante=b""):
+    """version_usuario para el modo asyncio (asgi.py)."""
+    async with apool.connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(_SQL_VERSION, (id_usuario,) * 3)
+            row = await cursor.fetchone()
+    return _etag(id_usuario, row, variante)
+
+
+def _etag(id_usuario, row, variante):
+    ultima = row["ultima"]
+    ultima = ultima.isoformat() if hasattr(ultima, "isoformat") else str(ultima)
+    raw = f"{id_usuario}|{int(row['total'])}|{ultima}|{row['cabeza']}|{int(row['vivos'])}|".encode("utf-8") + variante
+    return hashlib.blake2b(raw, digest_size=12).hexdigest()
+
+
+def _js_round(x):
+    # Math.round de JavaScript, para dar los mismos números que antes calculaba dashboard.js
+    return math.floor(x + 0.5)
+
+
+def resumen_usuario(id_usuario):
+    """Métricas globales y por módulo, con las mismas fórmulas que usaba dashboard.js."""
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT id_nivel, intentos, suma_puntaje, ultima_actividad
+                FROM resumen_usuario_nivel
+                WHERE id_usuario = %s
+                """,
+                (id_usuario,)
+            )
+            rows = cursor.fetchall()
+
+    modules = {
+        key: {"label": nombre, "count": 0, "sumScore": 0, "avgScore": 0}
+        for key, nombre in MODULOS.items()
+    }
+    modulo_por_nombre = {nombre: key for key, nombre in MODULOS.items()}
+
+    n = 0
+    total_score = 0
+    last_activity = None
+
+    for row in rows:
+        n += row["intentos"]
+        total_score += int(row["suma_puntaje"])
+        if last_activity is None or row["ultima_actividad"] > last_activity:
+            last_activity = row["ultima_actividad"]
+
+        nivel = catalog.nivel_por_id(row["id_nivel"])
+        key = modulo_por_nombre.get(nivel["nombre"]) if nivel else None
+        if key:
+            modules[key]["count"] += row["intentos"]
+            modules[key]["sumScore"] += int(row["suma_puntaje"])
+
+    for m in modules.values():
+        m["avgScore"] = _js_round(m["sumScore"] / m["count"]) if m["count"] else 0
+
+    if n == 0:
+        metrics = {
+            "participation": 0,
+            "activityCompletion": 0,
+            "timeDedication": 0,
+            "resourceInteraction": 0,
+            "taskAccuracy": 0,
+        }
+    else:
+        avg_score = total_score / n
+        metrics = {
+            "participation": _js_round(min(100, n * 15)),        # +15 por práctica
+            "activityCompletion": _js_round(avg_score),
+            "timeDedication": _js_round(min(100, n * 10)),       # +10 por práctica
+            "resourceInteraction": _js_round(min(100, 40 + n * 5)),  # base 40
+            "taskAccuracy": _js_round(avg_score),
+        }
+
+    return {
+        "total": n,
+        "lastActivity": last_activity,
+        "metrics": metrics,
+        "modules": modules,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resumen por usuario y nivel")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild = sub.add_parser("rebuild", help="recalcular desde la tabla resultados")
+    rebuild.add_argument("--user", type=int, help="solo este id de usuario")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        filas = reconstruir(args.user)
+        print(f"Resumen reconstruido: {filas} fila(s)")
@@ -0,0 +1,11 @@
+import os
+import sys
+
+# Los módulos del backend se importan planos (from db import pool), igual que en app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Valores fijos para que las pruebas no dependan del .env de quien las corre
+os.environ.setdefault("EXERCISE_SECRET", "pruebas")
+os.environ.setdefault("SESSION_KEYS", "k1:pruebas")
+os.environ.setdefault("ACCESS_LOG_JSON", "0")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
@@ -0,0 +1,238 @@
+"""
+Las consultas de usuario, catálogo, resultados, historial, resumen e
+intentos deben dar lo mismo con SQLite (sqlite_backend.py traduce el SQL
+de MySQL) y con MySQL.
+
+SQLite corre siempre, en una base temporal. MySQL solo si TEST_MYSQL_DB
+nombra una base DESCARTABLE del servidor de DB_HOST/DB_PORT/DB_USER/
+DB_PASSWORD: se borran todas sus tablas y se carga 'INFINITE AFO.sql'.
+
+Desde backend/:  TEST_MYSQL_DB=infinite_afo_test python -m pytest tests
+"""
+import os
+import re
+
+import pymysql
+import pytest
+
+import db
+import migrations
+from config import env_str
+
+TEST_MYSQL_DB = env_str("TEST_MYSQL_DB", "")
+ESQUEMA_MYSQL = os.path.join(os.path.dirname(db.__file__), "sql", "INFINITE AFO.sql")
+N_RESULTADOS = 7
+
+
+def _mysql_no_disponible():
+    """Motivo para saltear MySQL, o None si se puede usar."""
+    if not TEST_MYSQL_DB:
+        return "TEST_MYSQL_DB no definido"
+    try:
+        pymysql.connect(host=db.DB_HOST, port=db.DB_PORT, user=db.DB_USER, password=db.DB_PASSWORD,
+                        database=TEST_MYSQL_DB).close()
+    except pymysql.err.Error as e:
+        return f"MySQL no disponible: {e}"
+    return None
+
+
+_SIN_MYSQL = _mysql_no_disponible()
+BACKENDS = ["sqlite", pytest.param("mysql", marks=pytest.mark.skipif(_SIN_MYSQL is not None, reason=_SIN_MYSQL or ""))]
+
+
+def _cargar_esquema_mysql():
+    """Borra todo lo que haya en TEST_MYSQL_DB y carga el esquema con sus datos iniciales."""
+    with open(ESQUEMA_MYSQL, encoding="utf-8") as f:
+        # Sin las líneas de comentario (algunas tienen ';'), una sentencia por ';' al final de línea
+        script = "\n".join(line for line in f if not line.lstrip().startswith("--"))
+    conn = db.get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+            cursor.execute(
+                "SELECT TABLE_NAME AS nombre, TABLE_TYPE AS tipo FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE()"
+            )
+            for row in cursor.fetchall():
+                cursor.execute(f"DROP {'VIEW' if row['tipo'] == 'VIEW' else 'TABLE'} `{row['nombre']}`")
+            cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+            for sentencia in re.split(r";\s*$", script, flags=re.MULTILINE):
+                if sentencia.strip():
+                    cursor.execute(sentencia)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+@pytest.fixture(scope="module", params=BACKENDS)
+def cliente(request, tmp_path_factory):
+    """Cliente de prueba de la app Flask sobre una base nueva del backend pedido."""
+    anterior = (db.DB_BACKEND, db.DB_PATH, db.DB_NAME)
+    # El pool compartido abre las conexiones nuevas con la configuración de db.py
+    db.pool.close()
+    db.pool.after_fork()
+    db.DB_BACKEND = migrations.DB_BACKEND = request.param
+    if request.param == "sqlite":
+        db.DB_PATH = str(tmp_path_factory.mktemp("sqlite") / "infinite_afo.sqlite3")
+    else:
+        db.DB_NAME = TEST_MYSQL_DB
+        _cargar_esquema_mysql()
+    migrations._tablas_vistas.clear()
+    migrations.upgrade(verbose=False)
+
+    import app
+    import attempts
+    from catalog import catalog
+    from hashing import hasher
+    from leaderboard import leaderboard
+
+    hasher.rounds = 4
+    # Lo mismo que app.precargar, sin reenviar pendientes ni tragarse los errores
+    catalog.load()
+    attempts._synced = False
+    app.sincronizar_preguntas()
+    catalog.load()
+    leaderboard.load()
+
+    yield app.app.test_client()
+
+    db.pool.close()
+    db.pool.after_fork()
+    db.DB_BACKEND, db.DB_PATH, db.DB_NAME = anterior
+    migrations.DB_BACKEND = anterior[0]
+    migrations._tablas_vistas.clear()
+    catalog.invalidate()
+
+
+def test_sqlite_pow(tmp_path):
+    # Algunas compilaciones de SQLite no traen POW (progress.acumular lo usa)
+    import sqlite_backend
+
+    conn = sqlite_backend.connect(str(tmp_path / "pow.sqlite3"))
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT POW(%s, %s) AS v", (0.5, 3))
+            assert cursor.fetchone()["v"] == 0.125
+    finally:
+        conn.close()
+
+
+def _sesion(cliente, nombre):
+    """Registra un usuario nuevo y devuelve (id, headers con su token)."""
+    datos = {"nombre_usuario": nombre, "correo": f"{nombre}@pruebas", "contraseña": "clave-de-prueba"}
+    assert cliente.post("/api/register", json=datos).status_code == 201
+    r = cliente.post("/api/login", json={"username": datos["correo"], "password": "clave-de-prueba"})
+    assert r.status_code == 200
+    body = r.get_json()
+    return body["user"]["id"], {"Authorization": f"Bearer {body['session']['access_token']}"}
+
+
+def test_usuario(cliente):
+    id_usuario, _ = _sesion(cliente, "ana")
+    assert id_usuario
+    repetido = {"nombre_usuario": "ana", "correo": "ana@pruebas", "contraseña": "x"}
+    assert cliente.post("/api/register", json=repetido).status_code == 400
+    assert cliente.post("/api/login", json={"username": "ana@pruebas", "password": "otra"}).status_code == 401
+    assert cliente.post("/api/login", json={"username": "nadie@pruebas", "password": "x"}).status_code == 404
+
+
+def test_catalogo(cliente):
+    from attempts import clave_pregunta
+    from catalog import MODULOS, catalog
+    from exercises import REGISTRY
+
+    for module in MODULOS:
+        assert catalog.id_nivel(module) is not None
+    # Una fila de preguntas_ejercicio por pregunta de cada generador
+    for (module, nivel), generator in REGISTRY.items():
+        for numero in range(1, len(generator.question_labels) + 1):
+            assert catalog.id_pregunta(clave_pregunta(module, nivel, numero)) is not None
+
+
+def test_resultados_historial_y_resumen(cliente):
+    from summary import reconstruir
+
+    id_usuario, headers = _sesion(cliente, "beto")
+    puntajes = [10 * i for i in range(N_RESULTADOS)]
+    for puntaje in puntajes:
+        r = cliente.post("/api/exercise-result", headers=headers,
+                         json={"module": "quadratic", "puntaje": puntaje, "total_preguntas": 5, "nivel": "basico"})
+        assert r.status_code == 201
+
+    # Páginas de 3 con el cursor: todas, del más reciente al más antiguo, sin repetir
+    vistos, before = [], None
+    while True:
+        url = f"/api/user-results/{id_usuario}?limit=3" + (f"&before={before}" if before else "")
+        body = cliente.get(url, headers=headers).get_json()
+        vistos += body["results"]
+        before = body["next_before"]
+        if before is None:
+            break
+    assert [r["puntaje"] for r in vistos] == puntajes[::-1]
+    completo = cliente.get(f"/api/user-results/{id_usuario}?all=1", headers=headers).get_json()
+    assert [r["puntaje"] for r in completo] == puntajes[::-1]
+
+    resumen = cliente.get(f"/api/user-summary/{id_usuario}", headers=headers).get_json()
+    assert resumen["modules"]["quadratic"]["count"] == N_RESULTADOS
+    assert resumen["modules"]["quadratic"]["sumScore"] == sum(puntajes)
+    # Recalcular desde 'resultados' da lo mismo que lo acumulado al insertar
+    assert reconstruir(id_usuario) == 1
+    assert cliente.get(f"/api/user-summary/{id_usuario}", headers=headers).get_json()["modules"] == resumen["modules"]
+
+
+def test_version_cambia_al_archivar(cliente):
+    from datetime import datetime, timedelta
+
+    import archive
+    from catalog import catalog
+    from ingest import insertar_resultados, nueva_fila
+    from summary import version_usuario
+
+    id_usuario, headers = _sesion(cliente, "dani")
+    vieja = datetime.now().replace(microsecond=0) - timedelta(days=3 * 366)
+    insertar_resultados([nueva_fila(id_usuario, catalog.id_nivel("quadratic"), None, 50, 5, vieja, "basico")], ())
+    antes = version_usuario(id_usuario)
+    # El resumen no cambia al archivar, la cabeza de 'resultados' sí
+    assert archive.archivar(meses=12)["resultados"] == 1
+    assert version_usuario(id_usuario) != antes
+    assert cliente.get(f"/api/user-results/{id_usuario}?all=1", headers=headers).get_json() == []
+
+
+def test_intentos(cliente):
+    id_usuario, headers = _sesion(cliente, "caro")
+    ejercicio = cliente.get("/api/exercise?module=trigonometric&nivel=basico").get_json()
+    respuestas = ["0"] * len(ejercicio["questions"])
+
+    corregido = cliente.post("/api/exercise-grade", headers=headers,
+                             json={"token": ejercicio["token"], "answers": respuestas}).get_json()
+    assert not corregido.get("alreadyGraded")
+    # El mismo token no se guarda dos veces
+    otra_vez = cliente.post("/api/exercise-grade", headers=headers,
+                            json={"token": ejercicio["token"], "answers": respuestas}).get_json()
+    assert otra_vez["alreadyGraded"]
+
+    stats = cliente.get("/api/question-stats?module=trigonometric&nivel=basico", headers=headers).get_json()
+    assert len(stats) == len(ejercicio["questions"])
+    assert all(s["intentos"] == 1 for s in stats)
+    assert sum(s["errores"] for s in stats) == sum(1 for r in corregido["results"] if not r["isCorrect"])
+    # De la más fallada a la menos, calculado y cortado en SQL
+    assert [s["tasa_error"] for s in stats] == sorted((s["tasa_error"] for s in stats), reverse=True)
+    primera = cliente.get("/api/question-stats?module=trigonometric&nivel=basico&limit=1", headers=headers).get_json()
+    assert primera == stats[:1]
+
+
+def test_ranking_solo_corregidos(cliente):
+    # El puntaje que manda el cliente no entra al ranking; el corregido en el servidor sí
+    id_usuario, headers = _sesion(cliente, "eli")
+    r = cliente.post("/api/exercise-result", headers=headers,
+                     json={"module": "quadratic", "puntaje": 100, "total_preguntas": 5, "nivel": "avanzado"})
+    assert r.status_code == 201
+    ejercicio = cliente.get("/api/exercise?module=quadratic&nivel=avanzado").get_json()
+    corregido = cliente.post("/api/exercise-grade", headers=headers,
+                             json={"token": ejercicio["token"], "answers": ["0"] * len(ejercicio["questions"])}).get_json()
+
+    for period in ("all", "week"):
+        body = cliente.get(f"/api/leaderboard?module=quadratic&nivel=avanzado&period={period}",
+                           headers=headers).get_json()
+        assert body["me"]["score"] == corregido["score"]
+        assert body["me"]["intentos"] == 1
@@ -0,0 +1,38 @@
+"""
+El camino en lote con NumPy (build_batch, /api/exercises) debe dar
+exactamente los mismos ejercicios que el escalar (build, /api/exercise).
+
+Desde backend/:  python -m pytest tests
+"""
+import random
+
+import pytest
+
+from exercises import REGISTRY
+from grading import generate_public_batch, rebuild
+
+GENERADORES = sorted(REGISTRY.items())
+IDS = [f"{module}-{nivel}" for (module, nivel), _ in GENERADORES]
+
+
+@pytest.mark.parametrize("generator", [g for _, g in GENERADORES], ids=IDS)
+def test_lote_igual_a_escalar(generator):
+    rng = random.Random(20240501)
+    ps = [generator.draw(rng) for _ in range(500)]
+    assert generator.build_batch(ps) == [generator.build(p) for p in ps]
+
+
+@pytest.mark.parametrize("generator", [g for _, g in GENERADORES], ids=IDS)
+def test_lote_chico(generator):
+    p = generator.draw(random.Random(7))
+    assert generator.build_batch([p]) == [generator.build(p)]
+    assert generator.build_batch([]) == []
+
+
+@pytest.mark.parametrize("generator", [g for _, g in GENERADORES], ids=IDS)
+def test_lote_publico_se_corrige_igual(generator):
+    # Lo que se envía en lote es lo mismo que se reconstruye desde cada token al corregir
+    for publico in generate_public_batch(generator, 20):
+        _, _, completo = rebuild(publico["token"])
+        assert publico["context"] == completo["context"]
+        assert [q["text"] for q in publico["questions"]] == [q["text"] for q in completo["questions"]]
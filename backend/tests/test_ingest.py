@@ -0,0 +1,169 @@
+"""
+Write-behind (ingest.py): lotes con sus intentos, filas inválidas que se
+descartan liberando su ejercicio, apagado con la BD caída (lo pendiente
+va a disco) y reenvío de esos archivos al arrancar.
+
+Desde backend/:  python -m pytest tests
+"""
+import json
+import os
+import threading
+from datetime import datetime
+
+import pymysql
+import pytest
+
+import ingest
+from ingest import ResultWriter, nueva_fila, reenviar_pendientes, volcar_a_disco
+
+FECHA = datetime(2025, 5, 5, 10, 30)
+
+
+def _fila(id_usuario, puntaje=50):
+    return nueva_fila(id_usuario, 1, None, puntaje, 5, FECHA, "basico", True)
+
+
+def _intento(id_usuario, id_pregunta=1):
+    return (id_usuario, id_pregunta, "0", 0, FECHA)
+
+
+class _BD:
+    """insert_fn de prueba: guarda lo escrito; los usuarios en `invalidos` dan IntegrityError."""
+
+    def __init__(self, invalidos=(), caida=False):
+        self.invalidos = set(invalidos)
+        self.caida = caida
+        self.lotes = []
+        self.escrito = threading.Event()
+
+    def __call__(self, rows, intentos):
+        if self.caida:
+            raise pymysql.err.OperationalError(2003, "BD caída")
+        if any(row[0] in self.invalidos for row in rows):
+            raise pymysql.err.IntegrityError(1452, "id_usuario inexistente")
+        self.lotes.append((list(rows), list(intentos)))
+        self.escrito.set()
+
+    def filas(self):
+        return [row for rows, _ in self.lotes for row in rows]
+
+    def intentos(self):
+        return [a for _, intentos in self.lotes for a in intentos]
+
+
+@pytest.fixture
+def liberados(monkeypatch):
+    liberados = []
+    monkeypatch.setattr(ingest, "liberar_ejercicio", liberados.append)
+    return liberados
+
+
+@pytest.fixture
+def spool(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "SPOOL_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _writer(bd, **kwargs):
+    kwargs.setdefault("flush_interval", 0.01)
+    return ResultWriter(bd, retry_delay=0.01, **kwargs)
+
+
+def test_lote_con_sus_intentos(spool):
+    bd = _BD()
+    writer = _writer(bd, flush_size=2, flush_interval=60)
+    writer.submit([_fila(1)], [_intento(1, 1), _intento(1, 2)])
+    writer.submit([_fila(2)], [_intento(2)])
+    writer.submit([_fila(3)], [_intento(3)])
+    assert bd.escrito.wait(5)
+    writer.stop()
+
+    # El primer lote lleva justo los intentos de sus dos filas
+    rows, intentos = bd.lotes[0]
+    assert [r[0] for r in rows] == [1, 2]
+    assert [a[0] for a in intentos] == [1, 1, 2]
+    assert [r[0] for r in bd.filas()] == [1, 2, 3]
+    assert [a[0] for a in bd.intentos()] == [1, 1, 2, 3]
+    assert writer.stats()["flushed_rows"] == 3
+    assert writer.stats()["pending"] == 0
+    assert os.listdir(spool) == []
+
+
+def test_fila_invalida_libera_su_ejercicio(spool, liberados):
+    bd = _BD(invalidos={2})
+    writer = _writer(bd, flush_size=3, flush_interval=60)
+    writer.submit([_fila(1)], [_intento(1)], "n1")
+    writer.submit([_fila(2)], [_intento(2)], "n2")
+    writer.submit([_fila(3)], [_intento(3)], "n3")
+    writer.stop()
+
+    # Se sigue de a una: la inválida se descarta con sus intentos y las demás se escriben
+    assert [r[0] for r in bd.filas()] == [1, 3]
+    assert [a[0] for a in bd.intentos()] == [1, 3]
+    assert liberados == ["n2"]
+    stats = writer.stats()
+    assert stats["rejected_rows"] == 1
+    assert stats["flushed_rows"] == 2
+
+
+def test_stop_con_la_bd_caida_vuelca_a_disco(spool):
+    bd = _BD(caida=True)
+    writer = _writer(bd, flush_size=100)
+    writer.submit([_fila(1), _fila(2)])
+    writer.submit([_fila(3)], [_intento(3)], "n3")
+    writer.stop()
+
+    archivos = os.listdir(spool)
+    assert len(archivos) == 1 and archivos[0].startswith("pendiente-")
+    stats = writer.stats()
+    assert stats["spooled_rows"] == 3
+    assert stats["pending"] == 0
+    assert stats["flush_errors"] >= ingest.STOP_RETRIES
+    assert not stats["running"]
+
+    # Al arrancar de nuevo, con la BD arriba, se escribe todo y se borra el archivo
+    bd.caida = False
+    assert reenviar_pendientes(insert_fn=bd) == 3
+    assert bd.filas() == [_fila(1), _fila(2), _fila(3)]
+    assert bd.intentos() == [_intento(3)]
+    assert os.listdir(spool) == []
+
+
+def test_reenviar_con_la_bd_caida_deja_el_archivo(spool):
+    path = volcar_a_disco(ingest._entradas([_fila(1)], [_intento(1)], "n1"))
+    assert reenviar_pendientes(insert_fn=_BD(caida=True)) == 0
+    assert os.listdir(spool) == [os.path.basename(path)]
+
+    bd = _BD()
+    assert reenviar_pendientes(str(spool), bd) == 1
+    assert bd.lotes == [([_fila(1)], [_intento(1)])]
+    assert os.listdir(spool) == []
+
+
+def test_reenviar_descarta_invalidas(spool, liberados):
+    volcar_a_disco(ingest._entradas([_fila(1)], [_intento(1)], "n1") + ingest._entradas([_fila(2)], [], "n2"))
+    bd = _BD(invalidos={1})
+    assert reenviar_pendientes(insert_fn=bd) == 1
+    assert bd.filas() == [_fila(2)]
+    assert bd.intentos() == []
+    assert liberados == ["n1"]
+    assert os.listdir(spool) == []
+
+
+def test_reenviar_formato_anterior(spool):
+    # Archivos de antes: filas e intentos por separado, sin dificultad ni corregido
+    with open(spool / "pendiente-1-1.json", "w", encoding="utf-8") as f:
+        json.dump({"rows": [[1, 1, None, 50, 5, FECHA.isoformat()]],
+                   "intentos": [[1, 1, "0", 0, FECHA.isoformat()]]}, f)
+    bd = _BD()
+    assert reenviar_pendientes(insert_fn=bd) == 1
+    assert bd.filas() == [nueva_fila(1, 1, None, 50, 5, FECHA)]
+    assert bd.intentos() == [_intento(1)]
+
+
+def test_reenviar_ignora_otros_archivos(spool):
+    (spool / "notas.txt").write_text("x")
+    (spool / "pendiente-1-1.json.enviando").write_text("{}")
+    assert reenviar_pendientes(insert_fn=_BD()) == 0
+    assert sorted(os.listdir(spool)) == ["notas.txt", "pendiente-1-1.json.enviando"]
+    assert reenviar_pendientes(str(spool / "no-existe"), _BD()) == 0
@@ -0,0 +1,207 @@
+"""
+Rankings en memoria (leaderboard.py): la skip list indexable contra una
+lista ordenada, las tablas con empates, el cambio de semana y la lectura
+de resultados nuevos después de marcar_cambios (sobre una base SQLite
+temporal).
+
+Desde backend/:  python -m pytest tests
+"""
+import bisect
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+import db
+import leaderboard as lb
+import migrations
+from leaderboard import Leaderboard, SkipList, _Tabla
+
+
+# ---------- SkipList ----------
+def test_skiplist_vacia():
+    sl = SkipList()
+    assert len(sl) == 0
+    assert sl.bisect_left(5) == 0
+    assert sl.slice(0, 10) == []
+    with pytest.raises(KeyError):
+        sl.remove(5)
+
+
+def test_skiplist_igual_a_lista_ordenada():
+    rng = random.Random(20240501)
+    sl, esperado = SkipList(), []
+    for _ in range(2000):
+        if esperado and rng.random() < 0.4:
+            key = esperado[rng.randrange(len(esperado))]
+            sl.remove(key)
+            esperado.remove(key)
+        else:
+            key = (rng.randrange(-500, 0), rng.randrange(10_000))
+            if key in esperado:
+                continue
+            sl.add(key)
+            bisect.insort(esperado, key)
+    assert len(sl) == len(esperado)
+    assert sl.slice(0, len(sl)) == esperado
+    for key in esperado[::7] + [(-501, 0), (0, 0)]:
+        assert sl.bisect_left(key) == bisect.bisect_left(esperado, key)
+
+
+def test_skiplist_slice_en_los_bordes():
+    sl = SkipList()
+    for key in range(10):
+        sl.add(key)
+    assert sl.slice(0, 1) == [0]
+    assert sl.slice(9, 10) == [9]
+    assert sl.slice(8, 100) == [8, 9]
+    assert sl.slice(3, 3) == []
+    assert sl.slice(10, 12) == []
+    assert sl.slice(5, 2) == []
+    assert sl.bisect_left(-1) == 0
+    assert sl.bisect_left(10) == 10
+    sl.remove(0)
+    sl.remove(9)
+    assert sl.slice(0, 100) == list(range(1, 9))
+    with pytest.raises(KeyError):
+        sl.remove(9)
+
+
+# ---------- _Tabla ----------
+def test_tabla_sumar_y_posicion():
+    tabla = _Tabla()
+    tabla.sumar(1, 50)
+    tabla.sumar(2, 80)
+    tabla.sumar(3, 50)
+    assert tabla.top(10) == [(1, 2, 80, 1), (2, 1, 50, 1), (2, 3, 50, 1)]
+    # Empates comparten puesto y el siguiente salta (1, 2, 2, 4)
+    tabla.sumar(4, 10)
+    assert [fila[0] for fila in tabla.top(10)] == [1, 2, 2, 4]
+    assert tabla.posicion(50) == 2
+    assert tabla.posicion(10) == 4
+
+    # Sumar mueve al usuario, sin duplicarlo
+    tabla.sumar(3, 40, intentos=2)
+    assert tabla.top(2) == [(1, 3, 90, 3), (2, 2, 80, 1)]
+    assert len(tabla.orden) == len(tabla.puntajes) == 4
+    assert tabla.posicion(tabla.puntajes[1][0]) == 3
+
+
+def test_tabla_top_en_los_bordes():
+    tabla = _Tabla()
+    assert tabla.top(5) == []
+    for id_usuario in range(1, 6):
+        tabla.sumar(id_usuario, 100)
+    assert tabla.top(0) == []
+    # Todos empatados: mismo puesto, desempata el id
+    assert tabla.top(3) == [(1, 1, 100, 1), (1, 2, 100, 1), (1, 3, 100, 1)]
+    assert len(tabla.top(100)) == 5
+    # Un resultado con 0 puntos igual entra a la tabla
+    tabla.sumar(6, 0)
+    assert tabla.top(10)[-1] == (6, 6, 0, 1)
+
+
+# ---------- cambio de semana ----------
+def test_cambio_de_semana(monkeypatch):
+    lunes = datetime(2025, 5, 5)
+    monkeypatch.setattr(lb, "inicio_semana", lambda: lunes)
+    board = Leaderboard()
+
+    def fila(id_resultado, puntaje, fecha):
+        return {"id_resultado": id_resultado, "id_usuario": 1, "id_nivel": 1, "dificultad": "basico",
+                "corregido": 1, "puntaje": puntaje, "fecha": fecha, "nombre_usuario": "ana"}
+
+    board._aplicar([fila(1, 30, lunes - timedelta(days=1)), fila(2, 40, lunes + timedelta(hours=1))])
+    # El del domingo anterior solo cuenta en el histórico
+    assert board._tabla(1, "basico", "all").puntajes[1] == (70, 2)
+    assert board._tabla(1, "basico", "week").puntajes[1] == (40, 1)
+
+    lunes += timedelta(days=7)
+    semana = board._tabla(1, "basico", "week")
+    assert semana.desde == lunes
+    assert semana.puntajes == {}
+    assert board._stats["rollovers"] == 1
+    assert board._tabla(1, "basico", "all").puntajes[1] == (70, 2)
+
+    board._aplicar([fila(3, 200, lunes)])
+    # Acotado a PUNTAJE_MAX
+    assert board._tabla(1, "basico", "week").puntajes[1] == (100, 1)
+    # Sin corregir en el servidor o sin dificultad no cuentan
+    board._aplicar([dict(fila(4, 50, lunes), corregido=0), dict(fila(5, 50, lunes), dificultad=None)])
+    assert board._tabla(1, "basico", "all").puntajes[1] == (170, 3)
+
+
+def test_inicio_semana():
+    assert lb.inicio_semana(datetime(2025, 5, 11, 23, 59)) == datetime(2025, 5, 5)
+    assert lb.inicio_semana(datetime(2025, 5, 5, 0, 0)) == datetime(2025, 5, 5)
+
+
+# ---------- resultados nuevos ----------
+@pytest.fixture
+def base(tmp_path):
+    """Base SQLite nueva en el pool compartido (como tests/test_backends.py)."""
+    from catalog import catalog
+
+    anterior = (db.DB_BACKEND, db.DB_PATH)
+    db.pool.close()
+    db.pool.after_fork()
+    db.DB_BACKEND = migrations.DB_BACKEND = "sqlite"
+    db.DB_PATH = str(tmp_path / "infinite_afo.sqlite3")
+    migrations._tablas_vistas.clear()
+    migrations.upgrade(verbose=False)
+    catalog.load()
+
+    yield catalog
+
+    db.pool.close()
+    db.pool.after_fork()
+    db.DB_BACKEND, db.DB_PATH = anterior
+    migrations.DB_BACKEND = anterior[0]
+    migrations._tablas_vistas.clear()
+    catalog.invalidate()
+
+
+def _usuario(nombre):
+    with db.pool.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO usuario (nombre_usuario, correo, contraseña, nivel) VALUES (%s, %s, %s, %s)",
+                (nombre, f"{nombre}@pruebas", "x", "basico")
+            )
+            id_usuario = cursor.lastrowid
+        conn.commit()
+    return id_usuario
+
+
+def test_marcar_cambios_lee_resultados_nuevos(base):
+    from ingest import insertar_resultados, nueva_fila
+
+    id_nivel = base.id_nivel("quadratic")
+    ana, beto = _usuario("ana"), _usuario("beto")
+    insertar_resultados([nueva_fila(ana, id_nivel, None, 60, 5, dificultad="basico", corregido=True)])
+
+    board = Leaderboard(refresh=3600)
+    board.load()
+    assert board.top(id_nivel, "basico", "all") == (
+        [{"rank": 1, "id_usuario": ana, "nombre_usuario": "ana", "score": 60, "intentos": 1}], 1)
+
+    insertar_resultados([
+        nueva_fila(beto, id_nivel, None, 90, 5, dificultad="basico", corregido=True),
+        nueva_fila(ana, id_nivel, None, 100, 5, dificultad="basico"),     # puntaje del cliente
+    ])
+    # Sin aviso y con refresh largo se sigue mostrando la copia anterior
+    assert board.top(id_nivel, "basico", "all")[1] == 1
+
+    board.marcar_cambios()
+    for periodo in ("all", "week"):
+        top, total = board.top(id_nivel, "basico", periodo)
+        assert total == 2
+        assert [(f["id_usuario"], f["score"]) for f in top] == [(beto, 90), (ana, 60)]
+    assert board.posicion(id_nivel, "basico", "all", ana)["rank"] == 2
+    assert board.posicion(id_nivel, "intermedio", "all", ana) is None
+
+    # Otra carga completa desde la BD da lo mismo que lo sumado de a poco
+    nuevo = Leaderboard(refresh=3600)
+    nuevo.load()
+    for periodo in ("all", "week"):
+        assert nuevo.top(id_nivel, "basico", periodo) == board.top(id_nivel, "basico", periodo)
@@ -0,0 +1,148 @@
+"""
+Límites de frecuencia (ratelimit.py): recarga y rechazo del token bucket,
+descarte de cubetas inactivas, tope de claves, lectura de las reglas e IP
+del cliente detrás de proxies.
+
+Desde backend/:  python -m pytest tests
+"""
+import pytest
+
+import ratelimit
+from ratelimit import RateLimited, TokenBucket, ip_cliente, limitar, parse_limite
+
+
+class _Reloj:
+    """Reemplaza al módulo time dentro de ratelimit."""
+
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def monotonic(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = _Reloj()
+    monkeypatch.setattr(ratelimit, "time", reloj)
+    return reloj
+
+
+def test_rafaga_y_rechazo(reloj):
+    bucket = TokenBucket(3, 30)     # 1 ficha cada 10 s
+    assert [bucket.consumir("ip") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.consumir("ip") == pytest.approx(10.0)
+    # Las claves no comparten fichas
+    assert bucket.consumir("otra") == 0.0
+    assert bucket.stats()["allowed"] == 4
+    assert bucket.stats()["limited"] == 1
+
+
+def test_recarga(reloj):
+    bucket = TokenBucket(3, 30)
+    for _ in range(3):
+        bucket.consumir("ip")
+    reloj.ahora += 4
+    assert bucket.consumir("ip") == pytest.approx(6.0)
+    reloj.ahora += 6
+    assert bucket.consumir("ip") == 0.0
+    # Nunca pasa de la capacidad
+    reloj.ahora += 1000
+    assert [bucket.consumir("ip") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.consumir("ip") > 0
+
+
+def test_poda_de_inactivas(reloj):
+    bucket = TokenBucket(3, 30)
+    bucket.consumir("a")
+    reloj.ahora += 10
+    bucket.consumir("b")
+    reloj.ahora += 20
+    # "a" lleva un periodo sin uso (ya estaría llena): se descarta al dar de alta otra
+    bucket.consumir("c")
+    assert bucket.stats()["keys"] == 2
+    assert bucket.stats()["expired"] == 1
+    assert list(bucket._cubetas) == ["b", "c"]
+
+
+def test_poda_acotada_por_llamada(reloj, monkeypatch):
+    monkeypatch.setattr(ratelimit, "PODA_POR_LLAMADA", 2)
+    bucket = TokenBucket(3, 30)
+    for clave in "abcde":
+        bucket.consumir(clave)
+    reloj.ahora += 30
+    bucket.consumir("f")
+    assert bucket.stats()["expired"] == 2
+    assert list(bucket._cubetas) == ["c", "d", "e", "f"]
+
+
+def test_tope_de_claves(reloj):
+    bucket = TokenBucket(3, 30, max_claves=2)
+    bucket.consumir("a")
+    bucket.consumir("b")
+    bucket.consumir("a")        # "a" pasa a ser la más reciente
+    bucket.consumir("c")
+    assert list(bucket._cubetas) == ["a", "c"]
+    assert bucket.stats()["evicted"] == 1
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("60/60", (60, 60.0)),
+    ("10/0.5", (10, 0.5)),
+    ("5", (5, 1.0)),
+    (" 0 ", None),
+    ("", None),
+    (None, None),
+])
+def test_parse_limite(texto, esperado):
+    assert parse_limite(texto) == esperado
+
+
+@pytest.mark.parametrize("texto", ["x/60", "60/x", "-1/60", "10/0", "10/-5"])
+def test_parse_limite_invalido(texto):
+    with pytest.raises(ValueError):
+        parse_limite(texto)
+
+
+def test_limitar(reloj, monkeypatch):
+    monkeypatch.setattr(ratelimit, "limites", {"prueba": TokenBucket(2, 10)})
+    limitar("prueba", "ip")
+    limitar("prueba", "ip")
+    with pytest.raises(RateLimited) as e:
+        limitar("prueba", "ip")
+    assert e.value.regla == "prueba"
+    assert e.value.retry_after == 5
+    # Regla deshabilitada o sin clave (petición sin sesión): no limita
+    for _ in range(5):
+        limitar("otra", "ip")
+        limitar("prueba", None)
+
+
+def test_retry_after_minimo():
+    assert RateLimited("prueba", 0.2).retry_after == 1
+    assert RateLimited("prueba", 1.2).retry_after == 2
+
+
+class _Request:
+    def __init__(self, remote_addr, forwarded=None):
+        self.remote_addr = remote_addr
+        self.headers = {"X-Forwarded-For": forwarded} if forwarded is not None else {}
+
+
+def test_ip_cliente_sin_proxies(monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_PROXIES", 0)
+    # Sin proxies propios X-Forwarded-For lo inventa el cliente
+    assert ip_cliente(_Request("203.0.113.5", "1.2.3.4")) == "203.0.113.5"
+
+
+def test_ip_cliente_detras_de_proxies(monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_PROXIES", 1)
+    assert ip_cliente(_Request("127.0.0.1", "203.0.113.5")) == "203.0.113.5"
+    # Lo que está antes de lo que agregó nuestro nginx lo puso el cliente
+    assert ip_cliente(_Request("127.0.0.1", "1.2.3.4, 203.0.113.5")) == "203.0.113.5"
+    assert ip_cliente(_Request("127.0.0.1")) == "127.0.0.1"
+
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_PROXIES", 2)
+    assert ip_cliente(_Request("127.0.0.1", "1.2.3.4, 203.0.113.5, 10.0.0.2")) == "203.0.113.5"
+    # Menos saltos que proxies: la cabecera no es confiable
+    assert ip_cliente(_Request("127.0.0.1", "10.0.0.2")) == "127.0.0.1"
@@ -0,0 +1,132 @@
+"""
+Tokens de sesión (sessions.py): firma, vencimiento, tipo, rotación de
+claves y renovación con el refresh token.
+
+Desde backend/:  python -m pytest tests
+"""
+import pytest
+
+import sessions
+from sessions import ACCESS, REFRESH, InvalidSession, SessionExpired, emitir_sesion, renovar, verificar
+
+
+class _Reloj:
+    """Reemplaza al módulo time dentro de sessions."""
+
+    def __init__(self, ahora):
+        self.ahora = ahora
+
+    def time(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = _Reloj(1_700_000_000)
+    monkeypatch.setattr(sessions, "time", reloj)
+    return reloj
+
+
+def _claves(monkeypatch, *claves):
+    """Como SESSION_KEYS="kid:secreto,...": se firma con la primera y se aceptan todas."""
+    keys = [(kid, secreto.encode("utf-8")) for kid, secreto in claves]
+    monkeypatch.setattr(sessions, "_KEYS", dict(keys))
+    monkeypatch.setattr(sessions, "_ACTIVE_KID", keys[0][0])
+    monkeypatch.setattr(sessions, "_ACTIVE_KEY", keys[0][1])
+
+
+def test_emitir_y_verificar(reloj):
+    tokens = emitir_sesion(42)
+    assert verificar(tokens["access_token"]) == 42
+    assert verificar(tokens["refresh_token"], REFRESH) == 42
+    assert tokens["expires_in"] == sessions.SESSION_ACCESS_TTL
+
+
+def test_tipo_incorrecto(reloj):
+    tokens = emitir_sesion(42)
+    # El refresh no sirve como access ni al revés
+    with pytest.raises(InvalidSession, match="Tipo"):
+        verificar(tokens["refresh_token"], ACCESS)
+    with pytest.raises(InvalidSession, match="Tipo"):
+        renovar(tokens["access_token"])
+
+
+@pytest.mark.parametrize("token", [None, "", "a.b", "a.b.c.d", "k1..", "k1.@@@.###"])
+def test_mal_formado(reloj, token):
+    with pytest.raises(InvalidSession):
+        verificar(token)
+
+
+def test_alterado(reloj):
+    kid, payload, firma = emitir_sesion(42)["access_token"].split(".")
+    # Otro usuario con la firma del original
+    otro = sessions._b64(f"{ACCESS}:43:{reloj.ahora + 3600}".encode("ascii"))
+    with pytest.raises(InvalidSession, match="Firma"):
+        verificar(f"{kid}.{otro}.{firma}")
+    # Firma cambiada
+    falsa = sessions._b64(bytes(16))
+    with pytest.raises(InvalidSession, match="Firma"):
+        verificar(f"{kid}.{payload}.{falsa}")
+    with pytest.raises(InvalidSession, match="Clave"):
+        verificar(f"otra.{payload}.{firma}")
+
+
+def test_vencido(reloj):
+    tokens = emitir_sesion(42)
+    reloj.ahora += sessions.SESSION_ACCESS_TTL
+    assert verificar(tokens["access_token"]) == 42
+    reloj.ahora += 1
+    with pytest.raises(SessionExpired):
+        verificar(tokens["access_token"])
+    # El refresh sigue vigente y da un access nuevo
+    nuevo = renovar(tokens["refresh_token"])
+    assert verificar(nuevo["access_token"]) == 42
+
+    reloj.ahora += sessions.SESSION_REFRESH_TTL
+    with pytest.raises(SessionExpired):
+        renovar(tokens["refresh_token"])
+    # SessionExpired es un InvalidSession (401 igual, con "expired": true)
+    assert issubclass(SessionExpired, InvalidSession)
+
+
+def test_rotacion_de_claves(reloj, monkeypatch):
+    _claves(monkeypatch, ("k1", "viejo"))
+    viejo = emitir_sesion(42)
+
+    # k2 firma, k1 todavía se acepta: las sesiones abiertas siguen andando
+    _claves(monkeypatch, ("k2", "nuevo"), ("k1", "viejo"))
+    assert verificar(viejo["access_token"]) == 42
+    renovado = renovar(viejo["refresh_token"])
+    assert renovado["access_token"].startswith("k2.")
+    assert renovado["refresh_token"].startswith("k2.")
+
+    # Sin k1 los tokens viejos dejan de valer; los renovados no
+    _claves(monkeypatch, ("k2", "nuevo"))
+    with pytest.raises(InvalidSession, match="Clave"):
+        verificar(viejo["access_token"])
+    assert verificar(renovado["access_token"]) == 42
+
+    # Mismo kid con otro secreto: la firma ya no coincide
+    _claves(monkeypatch, ("k2", "otro"))
+    with pytest.raises(InvalidSession, match="Firma"):
+        verificar(renovado["access_token"])
+
+
+def test_refresh_por_http(reloj):
+    import app
+
+    cliente = app.app.test_client()
+    tokens = emitir_sesion(42)
+    r = cliente.post("/api/session/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert r.status_code == 200
+    assert verificar(r.get_json()["access_token"]) == 42
+
+    r = cliente.post("/api/session/refresh", json={"refresh_token": tokens["access_token"]})
+    assert r.status_code == 401
+    assert r.get_json()["expired"] is False
+
+    reloj.ahora += sessions.SESSION_REFRESH_TTL + 1
+    r = cliente.post("/api/session/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert r.status_code == 401
+    assert r.get_json()["expired"] is True
+    assert r.headers["WWW-Authenticate"].startswith("Bearer")
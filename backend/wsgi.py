@@ -0,0 +1,4 @@
+from app import create_app
+
+# Punto de entrada WSGI: gunicorn -c gunicorn.conf.py wsgi:application
+application = create_app()
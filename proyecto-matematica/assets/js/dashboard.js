@@ -31,87 +31,57 @@ function loadUserInfo(user) {
 }
 
 // -------------------- Llamadas al backend --------------------
-async function fetchUserResults(userId) {
+const HISTORY_PAGE_SIZE = 50;
+let historyCursor = null;   // next_before de la última página recibida
+
+// Métricas ya calculadas en el servidor (tabla resumen_usuario_nivel)
+async function fetchUserSummary(userId) {
     try {
-        const res = await fetch(`${API_URL}/api/user-results/${userId}`);
-        if (!res.ok) throw new Error("Error al consultar resultados");
+        const res = await authFetch(`${API_URL}/api/user-summary/${userId}`);
+        if (!res.ok) throw new Error("Error al consultar resumen");
         const data = await res.json();
-        if (!Array.isArray(data)) return [];
-        console.log("Resultados del usuario:", data);
+        console.log("Resumen del usuario:", data);
         return data;
     } catch (err) {
-        console.error("Error cargando resultados:", err);
-        return [];
+        console.error("Error cargando resumen:", err);
+        return null;
     }
 }
 
-// -------------------- Cálculo de métricas globales --------------------
-function computeGlobalMetrics(results) {
-    if (!results || results.length === 0) {
+// Una página del historial (paginado por cursor)
+async function fetchUserResultsPage(userId, before) {
+    try {
+        let url = `${API_URL}/api/user-results/${userId}?limit=${HISTORY_PAGE_SIZE}`;
+        if (before) url += `&before=${encodeURIComponent(before)}`;
+        const res = await authFetch(url);
+        if (!res.ok) throw new Error("Error al consultar resultados");
+        const data = await res.json();
         return {
-            participation: 0,
-            activityCompletion: 0,
-            timeDedication: 0,
-            resourceInteraction: 0,
-            taskAccuracy: 0,
+            results: Array.isArray(data.results) ? data.results : [],
+            nextBefore: data.next_before || null,
         };
+    } catch (err) {
+        console.error("Error cargando resultados:", err);
+        return { results: [], nextBefore: null };
     }
+}
 
-    const n = results.length;
-    const avgScore =
-        results.reduce((sum, r) => sum + (r.puntaje || 0), 0) / n;
-
-    const participation = Math.min(100, n * 15);      // +15 por práctica
-    const timeDedication = Math.min(100, n * 10);     // +10 por práctica
-    const resourceInteraction = Math.min(100, 40 + n * 5); // base 40
-    const activityCompletion = avgScore;
-    const taskAccuracy = avgScore;
-
+// -------------------- Métricas (vienen del servidor) --------------------
+function emptyGlobalMetrics() {
     return {
-        participation: Math.round(participation),
-        activityCompletion: Math.round(activityCompletion),
-        timeDedication: Math.round(timeDedication),
-        resourceInteraction: Math.round(resourceInteraction),
-        taskAccuracy: Math.round(taskAccuracy),
+        participation: 0,
+        activityCompletion: 0,
+        timeDedication: 0,
+        resourceInteraction: 0,
+        taskAccuracy: 0,
     };
 }
 
-// -------------------- Métricas por módulo --------------------
-function computeModuleMetrics(results) {
-    const modules = {
-        quadratic: {
-            label: "Funciones Cuadráticas",
-            count: 0,
-            sumScore: 0,
-            avgScore: 0,
-        },
-        trigonometric: {
-            label: "Funciones Trigonométricas",
-            count: 0,
-            sumScore: 0,
-            avgScore: 0,
-        },
+function emptyModuleMetrics() {
+    return {
+        quadratic: { label: "Funciones Cuadráticas", count: 0, sumScore: 0, avgScore: 0 },
+        trigonometric: { label: "Funciones Trigonométricas", count: 0, sumScore: 0, avgScore: 0 },
     };
-
-    results.forEach((r) => {
-        const nombre = (r.nombre_nivel || "").toLowerCase();
-        const puntaje = r.puntaje || 0;
-
-        let key = null;
-        if (nombre.includes("cuadr")) key = "quadratic";
-        else if (nombre.includes("trigono")) key = "trigonometric";
-
-        if (!key) return;
-
-        modules[key].count += 1;
-        modules[key].sumScore += puntaje;
-    });
-
-    Object.values(modules).forEach((m) => {
-        m.avgScore = m.count > 0 ? Math.round(m.sumScore / m.count) : 0;
-    });
-
-    return modules;
 }
 
 // -------------------- Actualizar tarjetas globales --------------------
@@ -250,11 +220,39 @@ function initializeCharts(metrics) {
 }
 
 // -------------------- Historial de prácticas --------------------
-function loadHistory(results) {
+function historyRow(r) {
+    const fecha = r.fecha
+        ? new Date(r.fecha).toLocaleDateString("es-CL", {
+              year: "numeric",
+              month: "2-digit",
+              day: "2-digit",
+          })
+        : "-";
+
+    const modulo = r.nombre_nivel || r.titulo_ejercicio || "Módulo";
+    const totalPreg = r.total_preguntas || 0;
+    const puntaje = r.puntaje || 0;
+    const correctas = totalPreg
+        ? Math.round((puntaje / 100) * totalPreg)
+        : 0;
+
+    return `
+        <tr>
+            <td>${fecha}</td>
+            <td>${modulo}</td>
+            <td>${totalPreg}</td>
+            <td>${correctas}/${totalPreg} (${puntaje}%)</td>
+            <td>-</td>
+        </tr>
+    `;
+}
+
+// append = true agrega la página al final (botón "Ver más")
+function loadHistory(results, append = false) {
     const historyTable = document.getElementById("historyTable");
     if (!historyTable) return;
 
-    if (!results || results.length === 0) {
+    if (!append && (!results || results.length === 0)) {
         historyTable.innerHTML = `
             <tr>
                 <td colspan="5" class="text-center text-muted">
@@ -265,34 +263,25 @@ function loadHistory(results) {
         return;
     }
 
-    const rows = results.map((r) => {
-        const fecha = r.fecha
-            ? new Date(r.fecha).toLocaleDateString("es-CL", {
-                  year: "numeric",
-                  month: "2-digit",
-                  day: "2-digit",
-              })
-            : "-";
-
-        const modulo = r.nombre_nivel || r.titulo_ejercicio || "Módulo";
-        const totalPreg = r.total_preguntas || 0;
-        const puntaje = r.puntaje || 0;
-        const correctas = totalPreg
-            ? Math.round((puntaje / 100) * totalPreg)
-            : 0;
-
-        return `
-            <tr>
-                <td>${fecha}</td>
-                <td>${modulo}</td>
-                <td>${totalPreg}</td>
-                <td>${correctas}/${totalPreg} (${puntaje}%)</td>
-                <td>-</td>
-            </tr>
-        `;
-    });
+    const rows = results.map(historyRow).join("");
+    if (append) {
+        historyTable.insertAdjacentHTML("beforeend", rows);
+    } else {
+        historyTable.innerHTML = rows;
+    }
+}
 
-    historyTable.innerHTML = rows.join("");
+function updateLoadMoreButton() {
+    const btn = document.getElementById("loadMoreHistory");
+    if (btn) btn.style.display = historyCursor ? "inline-block" : "none";
+}
+
+async function loadMoreHistory(userId) {
+    if (!historyCursor) return;
+    const page = await fetchUserResultsPage(userId, historyCursor);
+    historyCursor = page.nextBefore;
+    loadHistory(page.results, true);
+    updateLoadMoreButton();
 }
 
 // -------------------- Sidebar navegación --------------------
@@ -375,15 +364,26 @@ async function initializeDashboard() {
     setupModuleButtons();
     setupLogout();
 
-    const results = await fetchUserResults(user.id);
+    const [summary, firstPage] = await Promise.all([
+        fetchUserSummary(user.id),
+        fetchUserResultsPage(user.id, null),
+    ]);
 
-    const globalMetrics = computeGlobalMetrics(results);
-    const moduleMetrics = computeModuleMetrics(results);
+    const globalMetrics = summary ? summary.metrics : emptyGlobalMetrics();
+    const moduleMetrics = summary ? summary.modules : emptyModuleMetrics();
 
     updateGlobalCards(globalMetrics);
     updateModuleCards(moduleMetrics);
     initializeCharts(globalMetrics);
-    loadHistory(results);
+
+    historyCursor = firstPage.nextBefore;
+    loadHistory(firstPage.results);
+    updateLoadMoreButton();
+
+    const loadMoreBtn = document.getElementById("loadMoreHistory");
+    if (loadMoreBtn) {
+        loadMoreBtn.addEventListener("click", () => loadMoreHistory(user.id));
+    }
 
     showSection("modules");
 }
@@ -37,7 +37,24 @@ async function loadExercise() {
 
     // Nivel según el usuario (basico / intermedio / avanzado)
     const currentUser = JSON.parse(localStorage.getItem("currentUser")) || {};
-    const nivel = (currentUser.nivel || "intermedio").toLowerCase();
+    let nivel = (currentUser.nivel || "intermedio").toLowerCase();
+
+    // El servidor recomienda el nivel según la precisión reciente (y sube usuario.nivel solo)
+    try {
+        const recRes = await authFetch(
+            `${API_URL}/api/user-recommendation/${currentUser.id}?module=${encodeURIComponent(module)}`
+        );
+        if (recRes.ok) {
+            const rec = await recRes.json();
+            nivel = rec.nivel;
+            // Se relee: authFetch pudo haber renovado los tokens
+            const session = JSON.parse(localStorage.getItem("currentUser")) || {};
+            session.nivel = rec.nivel_usuario;
+            localStorage.setItem("currentUser", JSON.stringify(session));
+        }
+    } catch (err) {
+        console.warn("Sin recomendación de nivel, se usa el guardado:", err);
+    }
 
     console.log("Cargando ejercicio para módulo:", module, "nivel:", nivel);
 
@@ -88,7 +105,8 @@ async function loadExercise() {
     if (moduleEl) moduleEl.textContent = moduleName;
     if (difficultyEl) difficultyEl.textContent = difficulty;
     if (descEl) descEl.textContent = desc;
-    if (imageEl && image) imageEl.src = image;
+    // El gráfico generado llega como ruta de la API (/api/exercise-plot?...)
+    if (imageEl && image) imageEl.src = image.startsWith("/") ? `${API_URL}${image}` : image;
     if (captionEl) captionEl.textContent = imgCaption;
     if (contextEl) contextEl.textContent = contextText;
 
@@ -124,91 +142,37 @@ async function loadExercise() {
     });
 }
 
-// -------------------- Validar respuestas --------------------
-function validateAnswers(userAnswers) {
-    const results = [];
-    let correctCount = 0;
-
-    const questions =
-        currentExercise.questions || currentExercise.preguntas || [];
-
-    questions.forEach((q, index) => {
-        const userAns = userAnswers[index];
-
-        const correct = q.respuesta_correcta ?? q.answer;
-        const unit = q.unidad || q.unit || "";
-        const hint = q.pista || q.hint || "";
-
-        let isCorrect = false;
-
-        const numUser = parseFloat(userAns);
-        const numCorrect = parseFloat(correct);
-
-        if (!isNaN(numUser) && !isNaN(numCorrect)) {
-            isCorrect = Math.abs(numUser - numCorrect) < 0.01;
-        } else {
-            isCorrect =
-                String(userAns).trim().toLowerCase() ===
-                String(correct).trim().toLowerCase();
-        }
-
-        if (isCorrect) correctCount++;
+// -------------------- Corregir respuestas (en el servidor) --------------------
+// El ejercicio llega sin respuestas; el backend lo reconstruye desde el token,
+// lo corrige y guarda el resultado del usuario.
+async function gradeAnswers(userAnswers) {
+    // El usuario sale del token de sesión (Authorization), no del cuerpo
+    const payload = {
+        token: currentExercise.token,
+        answers: userAnswers
+    };
 
-        results.push({
-            question: q.enunciado || q.text || "",
-            userAnswer: userAns,
-            correctAnswer: correct,
-            isCorrect,
-            unit,
-            hint
-        });
+    const res = await authFetch(`${API_URL}/api/exercise-grade`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify(payload)
     });
 
-    const total = questions.length;
-    const score = total > 0 ? Math.round((correctCount / total) * 100) : 0;
-
-    return {
-        results,
-        score,
-        correctCount,
-        totalQuestions: total
-    };
-}
-
-// -------------------- Guardar resultado en backend --------------------
-async function saveResultToBackend(validationResults) {
-    const currentUser = JSON.parse(localStorage.getItem("currentUser"));
-    if (!currentUser) return;
+    const data = await res.json().catch(() => ({}));
+    if (!res.ok) {
+        throw new Error(data.error || "No se pudo corregir el ejercicio");
+    }
 
+    // Las pistas viven en el ejercicio (si el backend las envía)
     const questions =
         currentExercise.questions || currentExercise.preguntas || [];
-    const puntaje = validationResults.score;
-    const total_preguntas = questions.length;
-
-    // 🚨 IMPORTANTE: ahora el backend espera "module", NO id_nivel/id_ejercicio
-    const payload = {
-        id_usuario: currentUser.id,
-        module: currentModule,        // "quadratic" o "trigonometric"
-        puntaje: puntaje,
-        total_preguntas: total_preguntas
-    };
-
-    try {
-        const res = await fetch(`${API_URL}/api/exercise-result`, {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify(payload)
-        });
+    data.results.forEach((r, index) => {
+        const q = questions[index] || {};
+        r.hint = q.pista || q.hint || "";
+    });
 
-        const data = await res.json().catch(() => ({}));
-        if (!res.ok) {
-            console.error("No se pudo guardar resultado:", data);
-        } else {
-            console.log("Resultado guardado correctamente:", data);
-        }
-    } catch (err) {
-        console.error("Error al guardar resultado:", err);
-    }
+    console.log("Resultado corregido y guardado:", data);
+    return data;
 }
 
 // -------------------- Mostrar resultados --------------------
@@ -244,6 +208,11 @@ function showResults(validationResults) {
         <p>Respuestas correctas: ${validationResults.correctCount}/${validationResults.totalQuestions}</p>
     `;
 
+    // Cada ejercicio guarda solo su primera corrección
+    if (validationResults.alreadyGraded) {
+        html += `<p class="text-muted">Este ejercicio ya estaba corregido: este intento no se guardó.</p>`;
+    }
+
     validationResults.results.forEach((res, idx) => {
         html += `
             <div class="results-item ${res.isCorrect ? "correct" : "incorrect"}">
@@ -276,7 +245,7 @@ function showResults(validationResults) {
 }
 
 // -------------------- Submit, reset, init --------------------
-function handleSubmit(e) {
+async function handleSubmit(e) {
     e.preventDefault();
 
     const questions =
@@ -294,9 +263,13 @@ function handleSubmit(e) {
         return;
     }
 
-    const results = validateAnswers(userAnswers);
-    showResults(results);
-    saveResultToBackend(results); // 👈 ahora sí se guarda con el formato correcto
+    try {
+        const results = await gradeAnswers(userAnswers);
+        showResults(results);
+    } catch (err) {
+        console.error("Error al corregir:", err);
+        alert(err.message);
+    }
 }
 
 function resetForm() {
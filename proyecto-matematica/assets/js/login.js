@@ -39,7 +39,10 @@ async function validateLogin(event) {
             username: user.nombre_usuario,
             name: user.nombre_usuario,
             email: user.correo,
-            nivel: user.nivel
+            nivel: user.nivel,
+            // Tokens firmados por el backend: identifican al usuario en cada petición
+            accessToken: data.session.access_token,
+            refreshToken: data.session.refresh_token
         };
 
         localStorage.setItem('currentUser', JSON.stringify(userSession));
@@ -0,0 +1,45 @@
+// =============================================
+// PETICIONES CON SESIÓN (dashboard y ejercicio)
+// =============================================
+// Usa API_URL, que define el script de cada página (se carga después de
+// este, pero las funciones solo se llaman una vez cargada la página).
+
+// Envía el access token y, si expiró, lo renueva una vez con el refresh token.
+async function refreshSession() {
+    const session = JSON.parse(localStorage.getItem("currentUser")) || {};
+    if (!session.refreshToken) return false;
+
+    const res = await fetch(`${API_URL}/api/session/refresh`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ refresh_token: session.refreshToken })
+    });
+    if (!res.ok) return false;
+
+    const tokens = await res.json();
+    session.accessToken = tokens.access_token;
+    session.refreshToken = tokens.refresh_token;
+    localStorage.setItem("currentUser", JSON.stringify(session));
+    return true;
+}
+
+async function authFetch(url, options = {}) {
+    const send = () => {
+        const session = JSON.parse(localStorage.getItem("currentUser")) || {};
+        const headers = { ...(options.headers || {}) };
+        if (session.accessToken) headers.Authorization = `Bearer ${session.accessToken}`;
+        return fetch(url, { ...options, headers });
+    };
+
+    let res = await send();
+    if (res.status === 401) {
+        if (await refreshSession()) {
+            res = await send();
+        } else {
+            // Sesión vencida o de antes de los tokens: volver a iniciar sesión
+            localStorage.removeItem("currentUser");
+            window.location.href = "index.html";
+        }
+    }
+    return res;
+}